@@ -0,0 +1,70 @@
+"""
+Búsqueda de clientes para el autocompletado del POS.
+
+- PostgreSQL: trigramas (pg_trgm) sobre ``lower(nombre || ' ' || apellido ||
+  ' ' || ci)`` con índice GIN (migración 0002); encuentra el texto en cualquier
+  parte y ordena por similitud.
+- Otros motores: prefijo de nombre, apellido o ci como rangos sobre los
+  índices de lower(nombre), lower(apellido) y ci.
+"""
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Cliente
+
+TEXTO_POSTGRES = (
+    "lower(clientes_cliente.nombre || ' ' || clientes_cliente.apellido || ' ' || "
+    "coalesce(clientes_cliente.ci, ''))"
+)
+# Mayor que cualquier carácter: [prefijo, prefijo + FIN) abarca todo lo que
+# empieza por el prefijo y el motor lo resuelve con el índice.
+FIN = "\U0010ffff"
+
+
+def _buscar_postgres(texto):
+    texto = texto.lower()
+    return Cliente.objects.filter(
+        RawSQL(
+            f"({TEXTO_POSTGRES} LIKE %s OR {TEXTO_POSTGRES} %% %s)",
+            ["%" + texto.replace("%", r"\%").replace("_", r"\_") + "%", texto],
+            output_field=BooleanField(),
+        )
+    ).annotate(
+        rango=RawSQL(
+            f"similarity({TEXTO_POSTGRES}, %s)", [texto], output_field=FloatField()
+        )
+    )
+
+
+def _prefijo(campo, valor):
+    return Q(**{f"{campo}__gte": valor, f"{campo}__lt": valor + FIN})
+
+
+def _buscar_prefijo(texto):
+    minusculas = texto.lower()
+    filtro = (
+        _prefijo("nombre_min", minusculas)
+        | _prefijo("apellido_min", minusculas)
+        | _prefijo("ci", texto.upper())
+    )
+    # "maría pér": nombre completo y prefijo del apellido.
+    palabras = minusculas.split()
+    for i in range(1, len(palabras)):
+        filtro |= Q(nombre_min=" ".join(palabras[:i])) & _prefijo(
+            "apellido_min", " ".join(palabras[i:])
+        )
+    return (
+        Cliente.objects.con_nombre_normalizado()
+        .filter(filtro)
+        .annotate(rango=Value(0.0, output_field=FloatField()))
+    )
+
+
+def buscar_clientes(texto):
+    """Queryset de clientes que coinciden con ``texto``, anotado con ``rango``."""
+    texto = texto.strip()
+    if connection.vendor == "postgresql":
+        return _buscar_postgres(texto)
+    return _buscar_prefijo(texto)
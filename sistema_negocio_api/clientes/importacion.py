@@ -0,0 +1,187 @@
+"""
+Importación masiva de clientes desde CSV o JSON Lines sin cargar el archivo
+completo en memoria.
+
+Las filas se validan por lotes con las mismas reglas que CrearCliente. Por
+cada lote, una sola consulta busca los clientes existentes por ci o correo.
+Los nuevos se insertan y los existentes se actualizan, cada grupo con un
+bulk_create(update_conflicts=True).
+"""
+
+import csv
+import io
+import json
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from rest_framework.exceptions import ValidationError
+
+from facturas_y_reportes.cache_facturas import invalidar_facturas_de_clientes
+from .models import Cliente
+from .serializers import ClienteSerializer
+
+TAMANO_LOTE = 1000
+CAMPOS = ("nombre", "apellido", "correo", "telefono", "ci", "direccion")
+
+
+class ClienteImportacionSerializer(ClienteSerializer):
+    class Meta(ClienteSerializer.Meta):
+        # La unicidad de la ci se resuelve por lote, no con una consulta por fila.
+        extra_kwargs = {"ci": {"validators": []}}
+
+
+def leer_clientes_csv(archivo):
+    """Filas de un CSV con encabezado (nombre, apellido, correo, ...)."""
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    yield from csv.DictReader(texto)
+
+
+def leer_clientes_jsonl(archivo):
+    """Filas de un archivo JSON Lines (un objeto por línea)."""
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig")
+    for linea in texto:
+        if linea.strip():
+            try:
+                yield json.loads(linea)
+            except ValueError:
+                # Se rechaza en la validación como fila inválida.
+                yield None
+
+
+def _lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamano)):
+        yield lote
+
+
+def _errores(errores):
+    return {campo: [str(error) for error in lista] for campo, lista in errores.items()}
+
+
+def _existentes(cis, correos):
+    """Una consulta: {ci: id} y {correo en minúsculas: [(id, ci)]}."""
+    filtro = Q()
+    if cis:
+        filtro |= Q(ci__in=cis)
+    if correos:
+        filtro |= Q(correo_min__in=correos)
+    por_ci = {}
+    por_correo = {}
+    if filtro:
+        for id, ci, correo in (
+            Cliente.objects.annotate(correo_min=Lower("correo"))
+            .filter(filtro)
+            .values_list("id", "ci", "correo_min")
+        ):
+            if ci:
+                por_ci[ci] = id
+            por_correo.setdefault(correo, []).append((id, ci))
+    return por_ci, por_correo
+
+
+def importar_clientes(filas, actualizar=True, tamano_lote=TAMANO_LOTE):
+    """
+    Importa ``filas`` (dicts) por lotes, cada lote en su propia transacción.
+    Un cliente existente se reconoce por su ci o, si no trae ci, por su
+    correo. Con ``actualizar`` se reemplazan sus datos; si no, la fila se
+    rechaza.
+
+    Retorna ``(creados, actualizados, rechazados)``. Cada rechazo indica la
+    fila (empezando en 1) y el motivo o los errores de validación.
+    """
+    creados = 0
+    actualizados = 0
+    rechazados = []
+    vistos_ci = set()
+    vistos_correo = set()
+    fila = 0
+    # Un solo serializer para todas las filas, como hace many=True: los campos
+    # se construyen una vez.
+    validador = ClienteImportacionSerializer()
+
+    for lote in _lotes(filas, tamano_lote):
+        validas = []
+        for datos in lote:
+            fila += 1
+            if not isinstance(datos, dict):
+                rechazados.append({"fila": fila, "motivo": "Fila inválida"})
+                continue
+            try:
+                cliente = validador.run_validation(
+                    {campo: datos.get(campo) for campo in CAMPOS if campo in datos}
+                )
+            except ValidationError as e:
+                rechazados.append({"fila": fila, "errores": _errores(e.detail)})
+                continue
+            correo = cliente["correo"].lower()
+            if cliente.get("ci") in vistos_ci or (
+                not cliente.get("ci") and correo in vistos_correo
+            ):
+                rechazados.append(
+                    {"fila": fila, "motivo": "Cliente repetido en la carga"}
+                )
+                continue
+            if cliente.get("ci"):
+                vistos_ci.add(cliente["ci"])
+            vistos_correo.add(correo)
+            validas.append((fila, cliente, correo))
+
+        por_ci, por_correo = _existentes(
+            {cliente["ci"] for _, cliente, _ in validas if cliente.get("ci")},
+            {correo for _, cliente, correo in validas if not cliente.get("ci")},
+        )
+
+        nuevos = []
+        existentes = []
+        for numero_fila, cliente, correo in validas:
+            if cliente.get("ci"):
+                id = por_ci.get(cliente["ci"])
+            else:
+                candidatos = por_correo.get(correo, [])
+                if len(candidatos) > 1:
+                    rechazados.append(
+                        {
+                            "fila": numero_fila,
+                            "motivo": "Hay varios clientes con ese correo, indique la ci",
+                        }
+                    )
+                    continue
+                id = None
+                if candidatos:
+                    # Sin ci en la fila se conserva la que ya tenía el cliente.
+                    id, cliente["ci"] = candidatos[0]
+            if id is None:
+                nuevos.append(Cliente(**cliente))
+            elif actualizar:
+                existentes.append(Cliente(id=id, **cliente))
+            else:
+                rechazados.append(
+                    {"fila": numero_fila, "motivo": "El cliente ya existe"}
+                )
+
+        with transaction.atomic():
+            # Si otra carga creó la misma ci entre la consulta y el INSERT, la
+            # fila se actualiza en lugar de fallar.
+            Cliente.objects.bulk_create(
+                nuevos,
+                update_conflicts=True,
+                unique_fields=["ci"],
+                update_fields=[c for c in CAMPOS if c != "ci"],
+            )
+            Cliente.objects.bulk_create(
+                existentes,
+                update_conflicts=True,
+                unique_fields=["id"],
+                update_fields=list(CAMPOS),
+            )
+            # bulk_create no envía post_save: las facturas cacheadas muestran
+            # el nombre del cliente.
+            if existentes:
+                invalidar_facturas_de_clientes([cliente.id for cliente in existentes])
+        creados += len(nuevos)
+        actualizados += len(existentes)
+
+    rechazados.sort(key=lambda rechazo: rechazo["fila"])
+    return creados, actualizados, rechazados
@@ -0,0 +1,98 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from clientes.busqueda import buscar_clientes
+from clientes.models import Cliente
+
+TAMANO_LOTE = 10_000
+NOMBRES = ["María", "José", "Luis", "Ana", "Carlos", "Rosa", "Pedro", "Carmen"]
+APELLIDOS = ["Pérez", "González", "Rodríguez", "Díaz", "Hernández", "Gómez"]
+
+
+def nombre_de(i):
+    return f"{NOMBRES[i % len(NOMBRES)]} {i}", f"{APELLIDOS[i % len(APELLIDOS)]} {i}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cómo CrearFactura ubica al cliente (búsqueda anterior por nombre "
+        "con iexact contra id/ci/nombre indexados) y la latencia del "
+        "autocompletado de clientes. No deja datos en la BD."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clientes", type=int, default=1_000_000)
+        parser.add_argument("--consultas", type=int, default=200)
+
+    def handle(self, *args, **options):
+        cantidad = options["clientes"]
+        muestra = [random.randrange(cantidad) for _ in range(options["consultas"])]
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            self.preparar(cantidad)
+            self.stdout.write(
+                f"{cantidad} clientes generados en {time.perf_counter() - inicio:.1f}s"
+            )
+
+            def anterior(i):
+                nombre, apellido = nombre_de(i)
+                partes = f"{nombre} {apellido}".split()
+                # Con nombres de dos palabras no lo encuentra: solo se mide.
+                return Cliente.objects.filter(
+                    nombre__iexact=partes[0], apellido__iexact=" ".join(partes[1:])
+                ).first()
+
+            def por_nombre(i):
+                nombre, apellido = nombre_de(i)
+                return Cliente.objects.por_nombre_completo(f"{nombre} {apellido}").get()
+
+            def por_ci(i):
+                return Cliente.objects.get(ci=f"V{i}")
+
+            def busqueda(i):
+                return list(
+                    buscar_clientes(nombre_de(i)[1][:6]).values_list("id", flat=True)[
+                        :10
+                    ]
+                )
+
+            # La búsqueda anterior recorre toda la tabla: se mide con menos consultas.
+            self.medir("Nombre con iexact (anterior)", anterior, muestra[:20])
+            self.medir("Nombre con índice lower()", por_nombre, muestra)
+            self.medir("Ci (índice único)", por_ci, muestra)
+            self.medir("Autocompletado", busqueda, muestra)
+
+            transaction.set_rollback(True)
+
+    def preparar(self, cantidad):
+        for inicio in range(0, cantidad, TAMANO_LOTE):
+            Cliente.objects.bulk_create(
+                Cliente(
+                    nombre=nombre_de(i)[0],
+                    apellido=nombre_de(i)[1],
+                    correo=f"cliente{i}@example.com",
+                    ci=f"V{i}",
+                    direccion="",
+                    telefono="",
+                )
+                for i in range(inicio, min(inicio + TAMANO_LOTE, cantidad))
+            )
+
+    def medir(self, metodo, consulta, muestra):
+        tiempos = []
+        for i in muestra:
+            inicio = time.perf_counter()
+            consulta(i)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        tiempos.sort()
+        p95 = tiempos[max(0, int(len(tiempos) * 0.95) - 1)]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{metodo}: p50 {statistics.median(tiempos):.2f} ms, "
+                f"p95 {p95:.2f} ms ({len(tiempos)} consultas)"
+            )
+        )
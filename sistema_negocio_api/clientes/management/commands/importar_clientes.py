@@ -0,0 +1,79 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clientes.importacion import (
+    TAMANO_LOTE,
+    importar_clientes,
+    leer_clientes_csv,
+    leer_clientes_jsonl,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa clientes desde un archivo CSV (con encabezado) o JSON Lines, "
+        "por lotes. Los existentes (por ci o correo) se actualizan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo")
+        parser.add_argument(
+            "--formato",
+            choices=["csv", "jsonl"],
+            default=None,
+            help="Por defecto se deduce de la extensión del archivo.",
+        )
+        parser.add_argument("--tamano-lote", type=int, default=TAMANO_LOTE)
+        parser.add_argument(
+            "--sin-actualizar",
+            action="store_true",
+            help="Rechazar los clientes que ya existen en vez de actualizarlos.",
+        )
+        parser.add_argument(
+            "--rechazados",
+            default=None,
+            help="Archivo JSON Lines donde guardar las filas rechazadas.",
+        )
+
+    def handle(self, *args, **options):
+        formato = options["formato"]
+        if formato is None:
+            es_jsonl = options["archivo"].lower().endswith((".jsonl", ".ndjson"))
+            formato = "jsonl" if es_jsonl else "csv"
+        leer = leer_clientes_jsonl if formato == "jsonl" else leer_clientes_csv
+
+        try:
+            archivo = open(options["archivo"], "rb")
+        except OSError as e:
+            raise CommandError(f"No se pudo abrir el archivo: {e}")
+
+        with archivo:
+            inicio = time.perf_counter()
+            creados, actualizados, rechazados = importar_clientes(
+                leer(archivo),
+                actualizar=not options["sin_actualizar"],
+                tamano_lote=options["tamano_lote"],
+            )
+            duracion = time.perf_counter() - inicio
+
+        if options["rechazados"]:
+            with open(options["rechazados"], "w", encoding="utf-8") as salida:
+                for rechazo in rechazados:
+                    salida.write(json.dumps(rechazo, ensure_ascii=False) + "\n")
+        else:
+            for rechazo in rechazados[:20]:
+                self.stdout.write(
+                    self.style.WARNING(json.dumps(rechazo, ensure_ascii=False))
+                )
+
+        filas = creados + actualizados + len(rechazados)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{filas} filas en {duracion:.2f}s "
+                f"({filas / duracion if duracion else 0:,.0f} filas/s): "
+                f"{creados} creados, {actualizados} actualizados, "
+                f"{len(rechazados)} rechazados"
+            )
+        )
@@ -0,0 +1,94 @@
+import django.db.models.functions.text
+from django.db import migrations, models
+
+# PostgreSQL: trigramas sobre el texto que usa clientes.busqueda.
+POSTGRES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS clientes_cliente_busqueda_trgm_idx "
+    "ON clientes_cliente USING GIN ("
+    "lower(nombre || ' ' || apellido || ' ' || coalesce(ci, '')) gin_trgm_ops)",
+]
+POSTGRES_REVERSA = [
+    "DROP INDEX IF EXISTS clientes_cliente_busqueda_trgm_idx",
+]
+
+
+def normalizar_ci(apps, schema_editor):
+    """
+    Cédulas en mayúsculas y sin espacios, y "" como NULL, para poder crear el
+    índice único. Si al normalizar una ci queda repetida la migración se
+    detiene con los clientes en conflicto: una cédula real no se descarta
+    sin que alguien decida cuál es la correcta.
+    """
+    Cliente = apps.get_model("clientes", "Cliente")
+    normalizadas = {}
+    por_ci = {}
+    for id, ci in (
+        Cliente.objects.exclude(ci=None).order_by("id").values_list("id", "ci")
+    ):
+        normalizada = ci.strip().upper() or None
+        if normalizada != ci:
+            normalizadas[id] = normalizada
+        if normalizada is not None:
+            por_ci.setdefault(normalizada, []).append(id)
+
+    repetidas = {ci: ids for ci, ids in por_ci.items() if len(ids) > 1}
+    if repetidas:
+        detalle = "; ".join(
+            f"{ci}: clientes {', '.join(map(str, ids))}"
+            for ci, ids in sorted(repetidas.items())
+        )
+        raise RuntimeError(
+            "Hay cédulas repetidas, corríjalas antes de migrar: " + detalle
+        )
+
+    for id, normalizada in normalizadas.items():
+        Cliente.objects.filter(id=id).update(ci=normalizada)
+
+
+def _ejecutar(sentencias_por_motor):
+    def ejecutar(apps, schema_editor):
+        for sentencia in sentencias_por_motor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sentencia)
+
+    return ejecutar
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clientes", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="cliente",
+            name="ci",
+            field=models.CharField(blank=True, max_length=12, null=True),
+        ),
+        migrations.RunPython(normalizar_ci, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="cliente",
+            name="ci",
+            field=models.CharField(blank=True, max_length=12, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name="cliente",
+            index=models.Index(
+                django.db.models.functions.text.Lower("nombre"),
+                django.db.models.functions.text.Lower("apellido"),
+                name="cliente_nombre_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cliente",
+            index=models.Index(
+                django.db.models.functions.text.Lower("apellido"),
+                name="cliente_apellido_lower_idx",
+            ),
+        ),
+        migrations.RunPython(
+            _ejecutar({"postgresql": POSTGRES}),
+            _ejecutar({"postgresql": POSTGRES_REVERSA}),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:21
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clientes", "0002_indices_busqueda"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="cliente",
+            index=models.Index(
+                django.db.models.functions.text.Lower("correo"),
+                name="cliente_correo_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cliente",
+            index=models.Index(fields=["telefono"], name="cliente_telefono_idx"),
+        ),
+    ]
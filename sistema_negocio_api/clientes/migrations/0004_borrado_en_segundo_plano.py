@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clientes", "0003_indices_filtros"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cliente",
+            name="borrando",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,4 +1,66 @@
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+
+def combinaciones_nombre(nombre_completo):
+    """
+    Formas de dividir un nombre completo en (nombre, apellido), en minúsculas:
+    "María José Pérez" -> ("maría", "josé pérez"), ("maría josé", "pérez") y
+    ("maría josé pérez", "").
+    """
+    partes = nombre_completo.lower().split()
+    return [
+        (" ".join(partes[:i]), " ".join(partes[i:])) for i in range(1, len(partes) + 1)
+    ]
+
+
+def normalizar_nombre(nombre_completo):
+    """Nombre completo en minúsculas y con un solo espacio entre palabras."""
+    return " ".join(nombre_completo.lower().split())
+
+
+def referencia_cliente(
+    datos, campo_id="cliente_id", campo_ci="ci", campo_nombre="cliente"
+):
+    """
+    Arma la referencia ``(campo, valor)`` al cliente de una factura por id, ci o
+    nombre completo (en ese orden de preferencia). Id y ci son índices únicos;
+    el nombre usa el índice funcional y puede ser ambiguo. Retorna None si la
+    petición no trae ninguno.
+    """
+    if datos.get(campo_id) not in (None, ""):
+        return ("id", datos[campo_id])
+    if str(datos.get(campo_ci) or "").strip():
+        return ("ci", str(datos[campo_ci]).strip().upper())
+    if str(datos.get(campo_nombre) or "").strip():
+        return ("nombre", normalizar_nombre(str(datos[campo_nombre])))
+    return None
+
+
+class ClienteQuerySet(models.QuerySet):
+    def con_nombre_normalizado(self):
+        # Mismas expresiones que el índice cliente_nombre_lower_idx.
+        return self.alias(nombre_min=Lower("nombre"), apellido_min=Lower("apellido"))
+
+    def filtro_nombre_completo(self, nombre_completo):
+        """Q sobre el índice funcional para todas las divisiones del nombre."""
+        filtro = Q()
+        for nombre, apellido in combinaciones_nombre(nombre_completo):
+            filtro |= Q(nombre_min=nombre, apellido_min=apellido)
+        return filtro
+
+    def por_nombre_completo(self, nombre_completo):
+        filtro = self.filtro_nombre_completo(nombre_completo)
+        if not filtro:
+            return self.none()
+        return self.con_nombre_normalizado().filter(filtro)
+
+
+class ClienteManager(models.Manager.from_queryset(ClienteQuerySet)):
+    def get_queryset(self):
+        # Los que se están borrando en segundo plano no se ven (productos.borrado).
+        return super().get_queryset().filter(borrando=False)
 
 
 # Create your models here.
@@ -6,6 +68,19 @@ class Cliente(models.Model):
     nombre = models.CharField(max_length=200)
     apellido = models.CharField(max_length=200)
     correo = models.EmailField()
-    ci = models.CharField(max_length=12, blank=True)
+    ci = models.CharField(max_length=12, unique=True, null=True, blank=True)
     direccion = models.TextField()
     telefono = models.CharField(max_length=20)
+    borrando = models.BooleanField(default=False)
+
+    objects = ClienteManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                Lower("nombre"), Lower("apellido"), name="cliente_nombre_lower_idx"
+            ),
+            models.Index(Lower("apellido"), name="cliente_apellido_lower_idx"),
+            models.Index(Lower("correo"), name="cliente_correo_lower_idx"),
+            models.Index(fields=["telefono"], name="cliente_telefono_idx"),
+        ]
@@ -7,3 +7,7 @@ class ClienteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Cliente
         fields = ("nombre", "apellido", "correo", "telefono", "ci", "direccion")
+
+    def validate_ci(self, value):
+        # "" se guarda como NULL para no chocar con el índice único.
+        return value.strip().upper() if value and value.strip() else None
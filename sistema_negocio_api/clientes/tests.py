@@ -1,3 +1,302 @@
+import importlib
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from facturas_y_reportes.models import EstadisticasCliente, Factura
+from productos.borrado import procesar_borrados
+from .importacion import importar_clientes
+from .models import Cliente, combinaciones_nombre
+from .serializers import ClienteSerializer
+
+
+def crear_cliente(nombre, apellido, ci=None):
+    return Cliente.objects.create(
+        nombre=nombre,
+        apellido=apellido,
+        correo=f"{nombre.lower()}@example.com",
+        ci=ci,
+        direccion="",
+        telefono="",
+    )
+
+
+class TestNombreCompleto(TestCase):
+    def test_combinaciones(self):
+        self.assertEqual(
+            combinaciones_nombre("María José  Pérez"),
+            [
+                ("maría", "josé pérez"),
+                ("maría josé", "pérez"),
+                ("maría josé pérez", ""),
+            ],
+        )
+        self.assertEqual(combinaciones_nombre("  "), [])
+
+    def test_por_nombre_completo(self):
+        cliente = crear_cliente("María José", "Pérez")
+        crear_cliente("María", "José Pérez Díaz")
+        self.assertEqual(
+            list(Cliente.objects.por_nombre_completo("maría josé PÉREZ")), [cliente]
+        )
+        self.assertFalse(Cliente.objects.por_nombre_completo("").exists())
+
+
+class TestCi(TestCase):
+    def test_ci_vacia_se_guarda_como_null(self):
+        for _ in range(2):
+            serializer = ClienteSerializer(
+                data={
+                    "nombre": "Ana",
+                    "apellido": "Gómez",
+                    "correo": "ana@example.com",
+                    "telefono": "04141234567",
+                    "ci": "",
+                    "direccion": "Caracas",
+                }
+            )
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            serializer.save()
+        self.assertEqual(Cliente.objects.filter(ci=None).count(), 2)
+
+    def test_ci_unica(self):
+        crear_cliente("Ana", "Gómez", ci="V1")
+        with self.assertRaises(IntegrityError):
+            crear_cliente("Luis", "Díaz", ci="V1")
+
+    def test_migracion_no_descarta_cis_repetidas(self):
+        migracion = importlib.import_module("clientes.migrations.0002_indices_busqueda")
+        ana = crear_cliente("Ana", "Gómez", ci="V1")
+        luis = crear_cliente("Luis", "Díaz", ci="V2")
+        Cliente.objects.filter(id=luis.id).update(ci=" v1")
+        with self.assertRaisesMessage(
+            RuntimeError, f"V1: clientes {ana.id}, {luis.id}"
+        ):
+            migracion.normalizar_ci(apps, None)
+        luis.refresh_from_db()
+        self.assertEqual(luis.ci, " v1")
+
+        Cliente.objects.filter(id=luis.id).update(ci=" v2 ")
+        migracion.normalizar_ci(apps, None)
+        luis.refresh_from_db()
+        self.assertEqual(luis.ci, "V2")
+
+
+class TestBuscarClientes(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="cajero", password="clave123")
+        )
+        self.maria = crear_cliente("María José", "Pérez", ci="V123")
+        self.pedro = crear_cliente("Pedro", "Pérez", ci="V456")
+        self.ana = crear_cliente("Ana", "Gómez", ci="E789")
+
+    def buscar(self, texto, **params):
+        return self.client.get("/api/clientes/buscar/", {"q": texto, **params})
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return {cliente["id"] for cliente in response.data["clientes"]}
+
+    def test_por_nombre_apellido_o_ci(self):
+        self.assertEqual(self.ids(self.buscar("pér")), {self.maria.id, self.pedro.id})
+        self.assertEqual(self.ids(self.buscar("MARÍA")), {self.maria.id})
+        self.assertEqual(self.ids(self.buscar("maría josé pé")), {self.maria.id})
+        self.assertEqual(self.ids(self.buscar("e7")), {self.ana.id})
+        self.assertEqual(self.ids(self.buscar("zz")), set())
+
+    def test_limite_y_parametros(self):
+        self.assertEqual(len(self.ids(self.buscar("v", limit=1))), 1)
+        self.assertEqual(self.buscar("").status_code, 400)
+        self.assertEqual(self.buscar("v", limit="x").status_code, 400)
+        self.assertEqual(self.buscar("v", limit=0).status_code, 400)
+
+
+class TestVerClientes(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="cajero", password="clave123")
+        )
+        self.clientes = [
+            crear_cliente(f"Cliente{i}", "Prueba", ci=f"V{i}") for i in range(5)
+        ]
+        Cliente.objects.filter(id=self.clientes[2].id).update(
+            correo="Ana@Example.com", telefono="0414"
+        )
+
+    def ver(self, **params):
+        response = self.client.get("/api/clientes/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_paginacion_por_cursor(self):
+        pagina = self.ver(limit=2, total="true")
+        self.assertEqual(pagina["total"], 5)
+        vistos = [c["id"] for c in pagina["clientes"]]
+        while pagina["siguiente_cursor"]:
+            pagina = self.ver(limit=2, cursor=pagina["siguiente_cursor"])
+            vistos += [c["id"] for c in pagina["clientes"]]
+        self.assertEqual(vistos, [c.id for c in self.clientes])
+
+    def test_campos_no_pedidos_no_se_leen(self):
+        with CaptureQueriesContext(connection) as consultas:
+            datos = self.ver(fields="nombre,ci")
+        self.assertEqual(set(datos["clientes"][0]), {"id", "nombre", "ci"})
+        self.assertNotIn("direccion", consultas.captured_queries[-1]["sql"])
+        self.assertEqual(
+            self.client.get("/api/clientes/", {"fields": "clave"}).status_code, 400
+        )
+
+    def test_filtros(self):
+        esperado = [self.clientes[2].id]
+        for filtro in (
+            {"ci": "v2"},
+            {"correo": "ana@example.COM"},
+            {"telefono": "0414"},
+        ):
+            with self.subTest(filtro=filtro):
+                datos = self.ver(**filtro)
+                self.assertEqual([c["id"] for c in datos["clientes"]], esperado)
+
+
+class TestImportarClientes(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="cajero", password="clave123")
+        )
+        self.existente = crear_cliente("Ana", "Gómez", ci="V1")
+        self.sin_ci = crear_cliente("Luis", "Díaz")
+        Cliente.objects.filter(id=self.sin_ci.id).update(telefono="0", direccion="x")
+
+    def fila(self, nombre, ci="", correo=None):
+        return {
+            "nombre": nombre,
+            "apellido": "Nuevo",
+            "correo": correo or f"{nombre.lower()}@example.com",
+            "telefono": "04141234567",
+            "ci": ci,
+            "direccion": "Caracas",
+        }
+
+    def test_crea_actualiza_y_rechaza(self):
+        filas = [
+            self.fila("Pedro", ci="v2"),
+            self.fila("Ana", ci="V1"),
+            self.fila("Luisito", correo="LUIS@example.com"),
+            self.fila("Repetido", ci="V2"),
+            {"nombre": "Sin correo"},
+            self.fila("Rosa"),
+        ]
+        with CaptureQueriesContext(connection) as consultas:
+            creados, actualizados, rechazados = importar_clientes(filas)
+        self.assertEqual((creados, actualizados), (2, 2))
+        self.assertEqual([r["fila"] for r in rechazados], [4, 5])
+        self.assertIn("correo", rechazados[1]["errores"])
+        # Un lote: búsqueda de existentes e inserciones, sin consultas por fila.
+        self.assertLessEqual(len(consultas), 6)
+
+        self.existente.refresh_from_db()
+        self.assertEqual(self.existente.apellido, "Nuevo")
+        self.sin_ci.refresh_from_db()
+        self.assertEqual((self.sin_ci.nombre, self.sin_ci.ci), ("Luisito", None))
+        self.assertEqual(Cliente.objects.get(ci="V2").nombre, "Pedro")
+        self.assertEqual(Cliente.objects.count(), 4)
+
+    def test_por_lotes_y_sin_actualizar(self):
+        filas = [self.fila(f"Cliente{i}", ci=f"N{i}") for i in range(5)]
+        filas.append(self.fila("Ana", ci="V1"))
+        creados, actualizados, rechazados = importar_clientes(
+            filas, actualizar=False, tamano_lote=2
+        )
+        self.assertEqual((creados, actualizados), (5, 0))
+        self.assertEqual(rechazados, [{"fila": 6, "motivo": "El cliente ya existe"}])
+
+    def test_endpoint_csv_y_jsonl(self):
+        csv_texto = (
+            "nombre,apellido,correo,telefono,ci,direccion\n"
+            "Pedro,Pérez,pedro@example.com,0414,V2,Caracas\n"
+            "Malo,Pérez,no-es-correo,0414,,Caracas\n"
+        )
+        response = self.client.post(
+            "/api/importar_clientes/",
+            {"archivo": SimpleUploadedFile("clientes.csv", csv_texto.encode())},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            (response.data["creados"], len(response.data["rechazados"])), (1, 1)
+        )
+
+        jsonl = "\n".join([json.dumps(self.fila("Rosa", ci="V3")), "{roto", ""])
+        response = self.client.post(
+            "/api/importar_clientes/",
+            {"archivo": SimpleUploadedFile("clientes.jsonl", jsonl.encode())},
+            format="multipart",
+        )
+        self.assertEqual(response.data["creados"], 1)
+        self.assertEqual(
+            response.data["rechazados"], [{"fila": 2, "motivo": "Fila inválida"}]
+        )
+        self.assertEqual(
+            self.client.post("/api/importar_clientes/", {}, format="json").status_code,
+            400,
+        )
+
+    def test_comando(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as archivo:
+            archivo.write(json.dumps(self.fila("Rosa", ci="V3")) + "\n")
+        self.addCleanup(os.remove, archivo.name)
+        salida = StringIO()
+        call_command("importar_clientes", archivo.name, stdout=salida)
+        self.assertIn("1 creados", salida.getvalue())
+        self.assertTrue(Cliente.objects.filter(ci="V3").exists())
+
+
+class TestBorrarCliente(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="cajero", password="clave123")
+        )
+        self.cliente = crear_cliente("Ana", "Gómez", ci="V1")
+        facturas = Factura.objects.bulk_create(
+            Factura(cliente=self.cliente, metodo_pago="dolares", subtotal=1, total=1)
+            for _ in range(5)
+        )
+        EstadisticasCliente.objects.create(cliente=self.cliente, cantidad_facturas=5)
+        self.otra = Factura.objects.create(
+            cliente=crear_cliente("Luis", "Díaz"),
+            metodo_pago="dolares",
+            subtotal=1,
+            total=1,
+        )
+        self.facturas = [factura.id for factura in facturas]
+
+    def test_oculta_y_borra_sus_facturas_por_lotes(self):
+        response = self.client.delete(f"/api/borrar_cliente/{self.cliente.id}/")
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Cliente.objects.filter(id=self.cliente.id).exists())
+        ids = [c["id"] for c in self.client.get("/api/clientes/").data["clientes"]]
+        self.assertNotIn(self.cliente.id, ids)
+        # La ci queda libre para un cliente nuevo.
+        crear_cliente("Ana", "Gómez", ci="V1")
 
-# Create your tests here.
+        (tarea,) = procesar_borrados(tamano_lote=2)
+        self.assertEqual(tarea.detalle["facturas_y_reportes.Factura"], 5)
+        self.assertFalse(Factura.objects.filter(id__in=self.facturas).exists())
+        self.assertTrue(Factura.objects.filter(id=self.otra.id).exists())
+        self.assertFalse(Cliente._base_manager.filter(id=self.cliente.id).exists())
+        self.assertFalse(EstadisticasCliente.objects.exists())
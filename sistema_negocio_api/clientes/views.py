@@ -1,11 +1,24 @@
+import time
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.db.models.functions import Lower
 
+from .busqueda import buscar_clientes
+from .importacion import importar_clientes, leer_clientes_csv, leer_clientes_jsonl
 from .models import Cliente
+from productos.borrado import encolar_borrado
 from .serializers import ClienteSerializer
+from sistema_negocio_api.paginacion import (
+    ParametroInvalido,
+    leer_campos,
+    leer_parametro,
+    paginar_por_cursor,
+    respuesta_paginada,
+)
 
 """
 Para autenticar:
@@ -18,12 +31,44 @@ Para autenticar:
 class VerClientes(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
+    CAMPOS = ("id", "nombre", "apellido", "correo", "telefono", "ci", "direccion")
 
     def get(self, request):
+        """
+        Listado paginado por cursor (orden por id). ``?fields=id,nombre,ci``
+        limita las columnas que se leen de la BD; el id siempre se incluye.
+        Filtros exactos sobre índices: ``ci``, ``correo`` (sin distinguir
+        mayúsculas) y ``telefono``.
+        """
         try:
+            campos = leer_campos(request, self.CAMPOS)
+            if "id" not in campos:
+                campos = ("id", *campos)
             clientes = Cliente.objects.all()
-            serializer = ClienteSerializer(clientes, many=True)
-            return Response({"clientes": serializer.data}, status=status.HTTP_200_OK)
+
+            ci = leer_parametro(request, "ci")
+            if ci is not None:
+                clientes = clientes.filter(ci=ci.strip().upper())
+            correo = leer_parametro(request, "correo")
+            if correo is not None:
+                clientes = clientes.alias(correo_min=Lower("correo")).filter(
+                    correo_min=correo.strip().lower()
+                )
+            telefono = leer_parametro(request, "telefono")
+            if telefono is not None:
+                clientes = clientes.filter(telefono=telefono.strip())
+
+            clientes, siguiente_cursor, total = paginar_por_cursor(
+                clientes.values(*campos), request
+            )
+            return Response(
+                respuesta_paginada("clientes", clientes, siguiente_cursor, total),
+                status=status.HTTP_200_OK,
+            )
+        except ParametroInvalido as e:
+            return Response(
+                {"mensaje_de_error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {
@@ -34,6 +79,46 @@ class VerClientes(APIView):
             )
 
 
+class BuscarClientes(APIView):
+    """Autocompletado del POS: ``?q=`` sobre nombre, apellido o ci."""
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+    LIMITE_MAXIMO = 50
+
+    def get(self, request):
+        try:
+            texto = request.query_params.get("q", "").strip()
+            if not texto:
+                return Response(
+                    {"mensaje_de_error": "Se requiere el parámetro q"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            limite = leer_parametro(request, "limit", int, 10)
+            if limite < 1:
+                raise ParametroInvalido("'limit' debe ser mayor que 0")
+            clientes = (
+                buscar_clientes(texto)
+                .order_by("-rango", "nombre", "apellido", "id")
+                .values("id", "nombre", "apellido", "ci")[
+                    : min(limite, self.LIMITE_MAXIMO)
+                ]
+            )
+            return Response({"clientes": list(clientes)}, status=status.HTTP_200_OK)
+        except ParametroInvalido as e:
+            return Response(
+                {"mensaje_de_error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {
+                    "mensaje_de_error": "No se pudo realizar la búsqueda",
+                    "excepcion": str(e),
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
 class VerCliente(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
@@ -77,6 +162,66 @@ class CrearCliente(APIView):
             )
 
 
+class ImportarClientes(APIView):
+    """
+    Importación masiva de clientes. Acepta un archivo en el campo ``archivo``
+    (CSV con encabezado o JSON Lines, según la extensión ``.jsonl``) o JSON
+    ``{"clientes": [...]}``. Con ``actualizar=false`` los clientes que ya
+    existen (por ci o correo) se rechazan en vez de actualizarse.
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def post(self, request):
+        try:
+            archivo = request.FILES.get("archivo")
+            if archivo is not None:
+                if archivo.name.lower().endswith((".jsonl", ".ndjson")):
+                    filas = leer_clientes_jsonl(archivo.file)
+                else:
+                    filas = leer_clientes_csv(archivo.file)
+            else:
+                filas = request.data.get("clientes")
+                if not isinstance(filas, list) or not filas:
+                    return Response(
+                        {"mensaje_de_error": "Se requiere una lista de clientes"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+            actualizar = str(request.data.get("actualizar", "true")).lower() not in (
+                "0",
+                "false",
+                "no",
+            )
+
+            inicio = time.perf_counter()
+            creados, actualizados, rechazados = importar_clientes(filas, actualizar)
+            duracion = time.perf_counter() - inicio
+            procesadas = creados + actualizados + len(rechazados)
+            return Response(
+                {
+                    "creados": creados,
+                    "actualizados": actualizados,
+                    "rechazados": rechazados,
+                    "duracion": round(duracion, 3),
+                    "filas_por_segundo": (
+                        round(procesadas / duracion) if duracion else None
+                    ),
+                },
+                status=status.HTTP_201_CREATED,
+            )
+        except UnicodeDecodeError:
+            return Response(
+                {"mensaje_de_error": "El archivo debe estar en UTF-8"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Exception as e:
+            return Response(
+                {"mensaje_de_error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
 class EditarCliente(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
@@ -109,10 +254,16 @@ class BorrarCliente(APIView):
     def delete(self, request, id):
         try:
             cliente = Cliente.objects.get(id=id)
-            cliente.delete()
+            # Se oculta ya y sus facturas se borran por lotes en segundo plano.
+            tarea = encolar_borrado(cliente)
+            return Response(
+                {"mensaje": "El cliente se está borrando", "tarea_borrado": tarea.id},
+                status=status.HTTP_202_ACCEPTED,
+            )
+        except Cliente.DoesNotExist:
             return Response(
-                {"mensaje": "El cliente ha sido borrado correctamente"},
-                status=status.HTTP_204_NO_CONTENT,
+                {"mensaje_de_error": "El cliente no existe"},
+                status=status.HTTP_404_NOT_FOUND,
             )
         except Exception as e:
             return Response(
@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class FacturasYReportesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "facturas_y_reportes"
+
+    def ready(self):
+        from clientes.models import Cliente
+        from productos.borrado import lote_por_borrar
+        from productos.models import Producto
+
+        from . import cache_facturas, models
+        from .models import DetalleFactura, Factura
+
+        post_delete.connect(cache_facturas._al_borrar_factura, sender=Factura)
+        post_delete.connect(cache_facturas._al_borrar_detalle, sender=DetalleFactura)
+        post_save.connect(cache_facturas._al_guardar_cliente, sender=Cliente)
+        post_save.connect(cache_facturas._al_guardar_producto, sender=Producto)
+        # El borrado en segundo plano no pasa por las vistas que acumulan.
+        lote_por_borrar.connect(models._al_borrar_lote_detalles, sender=DetalleFactura)
+        lote_por_borrar.connect(models._al_borrar_lote_facturas, sender=Factura)
@@ -0,0 +1,119 @@
+"""
+Representación de una factura para VerFactura, guardada en la cache.
+
+Una factura no cambia después de creada, así que su representación se arma
+una sola vez (con select_related, dos consultas) y las vistas siguientes son
+un solo acceso a la cache. Cada entrada guarda también su ETag para responder
+304 a los clientes que ya la tienen. La entrada se descarta si la factura o
+alguno de sus detalles se borra (por ejemplo en cascada con el cliente), o si
+cambia el nombre del cliente o de alguno de sus productos, que también se
+muestran.
+"""
+
+import hashlib
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import DetalleFactura, Factura
+
+
+def _clave(factura_id):
+    return f"factura:{factura_id}:v1"
+
+
+def construir_factura(factura_id):
+    """Arma la representación de la factura. Lanza Factura.DoesNotExist."""
+    factura = Factura.objects.select_related("cliente", "tasa_cambio").get(
+        id=factura_id
+    )
+    detalles = DetalleFactura.objects.filter(factura_id=factura.id).select_related(
+        "producto"
+    )
+    iva = factura.subtotal * Decimal(0.16)
+    return {
+        "factura": {
+            "id": factura.id,
+            "cliente": f"{factura.cliente.nombre} {factura.cliente.apellido}",
+            "metodo_pago": factura.metodo_pago,
+            "subtotal": factura.subtotal,
+            "IVA": round(iva, 2),
+            "total": factura.total,
+            "fecha_creacion": factura.fecha,
+            "tasa_cambio": factura.tasa_cambio.tasa if factura.tasa_cambio else None,
+        },
+        "detalles_factura": [
+            {
+                "nombre": detalle.producto.nombre,
+                "cantidad": detalle.cantidad,
+                "precio_unitario": detalle.precio_unitario,
+                "total_producto": detalle.total_producto,
+                "seriales": detalle.seriales,
+            }
+            for detalle in detalles
+        ],
+    }
+
+
+def calcular_etag(datos):
+    texto = json.dumps(datos, cls=JSONEncoder, sort_keys=True)
+    return '"' + hashlib.sha256(texto.encode()).hexdigest()[:32] + '"'
+
+
+def cachear_factura(factura_id):
+    """Arma y guarda la representación. Retorna ``(datos, etag)``."""
+    datos = construir_factura(factura_id)
+    etag = calcular_etag(datos)
+    cache.set(_clave(factura_id), (datos, etag), timeout=settings.FACTURA_CACHE_TTL)
+    return datos, etag
+
+
+def obtener_factura(factura_id):
+    """``(datos, etag)`` desde la cache, o armándola si no está."""
+    entrada = cache.get(_clave(factura_id))
+    if entrada is not None:
+        return entrada
+    return cachear_factura(factura_id)
+
+
+def invalidar_factura(factura_id):
+    cache.delete(_clave(factura_id))
+
+
+def invalidar_facturas(factura_ids):
+    cache.delete_many([_clave(factura_id) for factura_id in factura_ids])
+
+
+def invalidar_facturas_de_clientes(cliente_ids):
+    invalidar_facturas(
+        Factura.objects.filter(cliente_id__in=cliente_ids).values_list("id", flat=True)
+    )
+
+
+def _cambia_alguno(update_fields, campos):
+    return update_fields is None or not update_fields.isdisjoint(campos)
+
+
+def _al_borrar_factura(sender, instance, **kwargs):
+    invalidar_factura(instance.id)
+
+
+def _al_borrar_detalle(sender, instance, **kwargs):
+    invalidar_factura(instance.factura_id)
+
+
+def _al_guardar_cliente(sender, instance, created, update_fields=None, **kwargs):
+    if not created and _cambia_alguno(update_fields, ("nombre", "apellido")):
+        invalidar_facturas_de_clientes([instance.id])
+
+
+def _al_guardar_producto(sender, instance, created, update_fields=None, **kwargs):
+    if not created and _cambia_alguno(update_fields, ("nombre",)):
+        invalidar_facturas(
+            DetalleFactura.objects.filter(producto_id=instance.id)
+            .values_list("factura_id", flat=True)
+            .distinct()
+        )
@@ -0,0 +1,124 @@
+import csv
+import os
+import resource
+import sys
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from clientes.models import Cliente
+from facturas_y_reportes.exportacion import exportar
+from facturas_y_reportes.models import DetalleFactura, Factura
+from productos.models import Categoria, Producto
+
+TAMANO_LOTE = 10_000
+
+
+def rss_maximo_mb():
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo reporta en KB, macOS en bytes.
+    return maximo / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la exportación CSV de facturas y líneas por streaming contra "
+        "cargar todo en memoria (tiempo, filas/s y RSS máximo). No deja datos "
+        "en la BD."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--facturas", type=int, default=200_000)
+        parser.add_argument("--lineas", type=int, default=2)
+        parser.add_argument(
+            "--sin-memoria",
+            action="store_true",
+            help="No medir la exportación cargando todo en memoria.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.preparar(options["facturas"], options["lineas"])
+            hoy = timezone.localdate()
+            self.stdout.write(
+                f"RSS máximo tras generar datos: {rss_maximo_mb():.1f} MB"
+            )
+
+            for tipo in ("facturas", "detalles"):
+                inicio = time.perf_counter()
+                with open(os.devnull, "w") as salida:
+                    filas = sum(1 for _ in map(salida.write, exportar(tipo, hoy, hoy)))
+                self.reportar(f"Streaming {tipo}", filas - 1, inicio)
+
+            if not options["sin_memoria"]:
+                # Como hoy: leer todo de una vez y luego escribir.
+                inicio = time.perf_counter()
+                filas = list(
+                    DetalleFactura.objects.filter(factura__fecha=hoy).values_list(
+                        "factura_id",
+                        "factura__fecha",
+                        "producto__nombre",
+                        "cantidad",
+                        "total_producto",
+                        "seriales",
+                    )
+                )
+                with open(os.devnull, "w") as salida:
+                    csv.writer(salida).writerows(filas)
+                self.reportar("En memoria detalles", len(filas), inicio)
+
+            transaction.set_rollback(True)
+
+    def preparar(self, cantidad, lineas):
+        cliente = Cliente.objects.create(
+            nombre="Benchmark",
+            apellido="Exportacion",
+            correo="benchmark-exportacion@example.com",
+            direccion="",
+            telefono="",
+        )
+        categoria = Categoria.objects.create(nombre="benchmark", descripcion="")
+        productos = Producto.objects.bulk_create(
+            Producto(
+                nombre=f"benchmark-{i}",
+                descripcion="",
+                precio_dolares=Decimal("10"),
+                categoria=categoria,
+            )
+            for i in range(10)
+        )
+        for inicio in range(0, cantidad, TAMANO_LOTE):
+            facturas = Factura.objects.bulk_create(
+                Factura(
+                    cliente=cliente,
+                    metodo_pago="dolares",
+                    subtotal=Decimal("20"),
+                    total=Decimal("23.20"),
+                )
+                for _ in range(min(TAMANO_LOTE, cantidad - inicio))
+            )
+            DetalleFactura.objects.bulk_create(
+                DetalleFactura(
+                    factura=factura,
+                    producto=productos[(factura.id + j) % len(productos)],
+                    cantidad=1,
+                    precio_unitario=Decimal("10"),
+                    total_producto=Decimal("10"),
+                    seriales=[f"B-{factura.id}-{j}"],
+                )
+                for factura in facturas
+                for j in range(lineas)
+            )
+
+    def reportar(self, metodo, filas, inicio):
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{metodo}: {filas} filas en {duracion:.2f}s "
+                f"({filas / duracion:,.0f} filas/s), "
+                f"RSS máximo {rss_maximo_mb():.1f} MB"
+            )
+        )
@@ -0,0 +1,113 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from clientes.models import Cliente
+from facturas_y_reportes.views import CrearFactura, SincronizarFacturas
+from productos.models import Categoria, Item, Producto
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la sincronización de ventas sin conexión: una llamada a "
+        "crear_factura por venta contra un solo lote. No deja datos en la BD."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--facturas", type=int, default=300)
+        parser.add_argument("--productos", type=int, default=20)
+        parser.add_argument("--por-factura", type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.preparar(options)
+            ventas_secuenciales = self.ventas("SEC", options)
+            ventas_lote = self.ventas("LOTE", options)
+
+            inicio = time.perf_counter()
+            with CaptureQueriesContext(connection) as consultas:
+                for venta in ventas_secuenciales:
+                    response = self.llamar(CrearFactura, "/api/crear_factura/", venta)
+                    if response.status_code != 201:
+                        raise RuntimeError(response.data)
+            self.reportar("Una por una", len(ventas_secuenciales), consultas, inicio)
+
+            inicio = time.perf_counter()
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.llamar(
+                    SincronizarFacturas,
+                    "/api/sincronizar_facturas/",
+                    {"facturas": ventas_lote},
+                )
+            if response.status_code != 200 or response.data["rechazadas"]:
+                raise RuntimeError(response.data)
+            self.reportar("En lote", len(ventas_lote), consultas, inicio)
+
+            transaction.set_rollback(True)
+
+    def preparar(self, options):
+        self.usuario = User.objects.create_user(username="benchmark-sincronizacion")
+        Cliente.objects.create(
+            nombre="Benchmark",
+            apellido="Sincronizacion",
+            correo="benchmark@example.com",
+            direccion="",
+            telefono="",
+        )
+        categoria = Categoria.objects.create(nombre="benchmark", descripcion="")
+        # Cada producto tiene seriales para las dos corridas.
+        por_producto = 2 * options["facturas"] * options["por_factura"]
+        self.productos = Producto.objects.bulk_create(
+            Producto(
+                nombre=f"benchmark-{i}",
+                descripcion="",
+                precio_dolares=Decimal("10"),
+                precio_bolivares=Decimal("400"),
+                cantidad_en_stock=por_producto,
+                categoria=categoria,
+            )
+            for i in range(options["productos"])
+        )
+        Item.objects.bulk_create(
+            Item(producto=producto, numero_serial=f"B{producto.id}-{j}")
+            for producto in self.productos
+            for j in range(por_producto)
+        )
+        self.siguiente = {producto.id: 0 for producto in self.productos}
+
+    def ventas(self, prefijo, options):
+        ventas = []
+        for i in range(options["facturas"]):
+            producto = self.productos[i % len(self.productos)]
+            seriales = []
+            for _ in range(options["por_factura"]):
+                seriales.append(f"B{producto.id}-{self.siguiente[producto.id]}")
+                self.siguiente[producto.id] += 1
+            ventas.append(
+                {
+                    "referencia": f"{prefijo}-{i}",
+                    "cliente": "Benchmark Sincronizacion",
+                    "metodo_pago": "dolares",
+                    "productos": [{"id": producto.id, "seriales": seriales}],
+                }
+            )
+        return ventas
+
+    def llamar(self, vista, url, datos):
+        request = APIRequestFactory().post(url, datos, format="json")
+        force_authenticate(request, user=self.usuario)
+        return vista.as_view()(request)
+
+    def reportar(self, metodo, cantidad, consultas, inicio):
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{metodo}: {cantidad} facturas en {duracion:.3f}s "
+                f"({cantidad / duracion:,.0f} facturas/s, {len(consultas)} consultas)"
+            )
+        )
@@ -0,0 +1,153 @@
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from clientes.models import Cliente
+from facturas_y_reportes.models import DetalleFactura, Factura
+from facturas_y_reportes.views import MODOS_BLOQUEO, CrearFactura
+from productos.models import Categoria, Item, Producto
+
+
+class Command(BaseCommand):
+    help = (
+        "Lanza muchas facturas concurrentes sobre seriales que se solapan y "
+        "reporta rendimiento, conflictos y deadlocks. Pensado para PostgreSQL; "
+        "los datos generados se borran al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--facturas", type=int, default=500)
+        parser.add_argument("--hilos", type=int, default=16)
+        parser.add_argument("--seriales", type=int, default=300)
+        parser.add_argument("--por-factura", type=int, default=3)
+        parser.add_argument("--modo", choices=list(MODOS_BLOQUEO), default=None)
+        parser.add_argument("--conservar", action="store_true")
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            self.stdout.write(
+                self.style.WARNING(
+                    "SQLite no tiene bloqueo por filas: los resultados no son representativos."
+                )
+            )
+
+        sufijo = f"estres-{int(time.time())}"
+        self.preparar(sufijo, options["seriales"])
+        seriales = [f"{sufijo}-{i}" for i in range(options["seriales"])]
+        pedidos = [
+            random.sample(seriales, options["por_factura"])
+            for _ in range(options["facturas"])
+        ]
+
+        ajustes = {}
+        if options["modo"]:
+            ajustes["FACTURA_BLOQUEO_SERIALES"] = options["modo"]
+        try:
+            with override_settings(**ajustes):
+                inicio = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options["hilos"]) as ejecutor:
+                    resultados = Counter(ejecutor.map(self.vender, pedidos))
+                duracion = time.perf_counter() - inicio
+            self.reportar(resultados, duracion)
+            self.verificar()
+        finally:
+            if not options["conservar"]:
+                self.limpiar()
+
+    def preparar(self, sufijo, cantidad):
+        self.usuario = User.objects.create_user(username=sufijo)
+        self.cliente = Cliente.objects.create(
+            nombre="Estres",
+            apellido=sufijo,
+            correo=f"{sufijo}@example.com",
+            direccion="",
+            telefono="",
+        )
+        self.categoria = Categoria.objects.create(nombre=sufijo, descripcion="")
+        self.producto = Producto.objects.create(
+            nombre=sufijo,
+            descripcion="",
+            precio_dolares=Decimal("10"),
+            cantidad_en_stock=cantidad,
+            categoria=self.categoria,
+        )
+        Item.objects.bulk_create(
+            Item(producto=self.producto, numero_serial=f"{sufijo}-{i}")
+            for i in range(cantidad)
+        )
+
+    def vender(self, seriales):
+        try:
+            request = APIRequestFactory().post(
+                "/api/crear_factura/",
+                {
+                    "cliente": f"{self.cliente.nombre} {self.cliente.apellido}",
+                    "metodo_pago": "dolares",
+                    "productos": [{"id": self.producto.id, "seriales": seriales}],
+                },
+                format="json",
+            )
+            force_authenticate(request, user=self.usuario)
+            response = CrearFactura.as_view()(request)
+            if response.status_code == 201:
+                return "exitosa"
+            if response.status_code == 409:
+                return f"conflicto_{response.data.get('conflicto')}"
+            if response.status_code == 400:
+                return "serial_ya_vendido"
+            return f"error_{response.status_code}"
+        except Exception as e:
+            return f"excepcion_{type(e).__name__}"
+        finally:
+            connection.close()
+
+    def reportar(self, resultados, duracion):
+        total = sum(resultados.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{total} facturas en {duracion:.2f}s ({total / duracion:,.1f}/s), "
+                f"{resultados['exitosa']} exitosas "
+                f"({resultados['exitosa'] / duracion:,.1f}/s)"
+            )
+        )
+        for resultado, cantidad in sorted(resultados.items()):
+            self.stdout.write(f"  {resultado}: {cantidad}")
+        self.stdout.write(f"  deadlocks: {resultados['conflicto_deadlock']}")
+
+    def verificar(self):
+        vendidos = [
+            serial
+            for seriales in DetalleFactura.objects.filter(
+                producto=self.producto
+            ).values_list("seriales", flat=True)
+            for serial in seriales
+        ]
+        self.producto.refresh_from_db()
+        restantes = Item.objects.en_stock().filter(producto=self.producto).count()
+        if len(vendidos) != len(set(vendidos)):
+            self.stdout.write(self.style.ERROR("Hay seriales vendidos dos veces"))
+        elif self.producto.cantidad_en_stock != restantes:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"Stock {self.producto.cantidad_en_stock} distinto de los "
+                    f"{restantes} seriales restantes"
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS("Sin ventas dobles y stock consistente")
+            )
+
+    def limpiar(self):
+        Factura.objects.filter(cliente=self.cliente).delete()
+        self.categoria.delete()
+        self.cliente.delete()
+        self.usuario.delete()
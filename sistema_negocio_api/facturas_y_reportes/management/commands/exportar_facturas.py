@@ -0,0 +1,41 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from facturas_y_reportes.exportacion import TIPOS_EXPORTACION, exportar
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta a CSV las facturas o sus líneas de un rango de fechas, "
+        "escribiendo a medida que se leen de la BD."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tipo", choices=list(TIPOS_EXPORTACION), default="facturas"
+        )
+        parser.add_argument("--desde", type=date.fromisoformat, required=True)
+        parser.add_argument("--hasta", type=date.fromisoformat, required=True)
+        parser.add_argument(
+            "--salida", default="-", help="Archivo de salida ('-' para stdout)."
+        )
+
+    def handle(self, *args, **options):
+        if options["desde"] > options["hasta"]:
+            raise CommandError("--desde no puede ser posterior a --hasta")
+
+        lineas = exportar(options["tipo"], options["desde"], options["hasta"])
+        if options["salida"] == "-":
+            for linea in lineas:
+                self.stdout.write(linea, ending="")
+            return
+
+        filas = -1  # sin contar el encabezado
+        with open(options["salida"], "w", encoding="utf-8", newline="") as archivo:
+            for linea in lineas:
+                archivo.write(linea)
+                filas += 1
+        self.stderr.write(
+            self.style.SUCCESS(f"{filas} filas exportadas a {options['salida']}")
+        )
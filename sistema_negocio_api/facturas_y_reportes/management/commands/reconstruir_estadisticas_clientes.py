@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from facturas_y_reportes.models import EstadisticasCliente
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula las estadísticas de compra de todos los clientes a partir de "
+        "las facturas (por ejemplo después de borrar facturas o de una carga)."
+    )
+
+    def handle(self, *args, **options):
+        filas = EstadisticasCliente.objects.reconstruir()
+        self.stdout.write(
+            self.style.SUCCESS(f"Estadísticas reconstruidas: {filas} clientes")
+        )
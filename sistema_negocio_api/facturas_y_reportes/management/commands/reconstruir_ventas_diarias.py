@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from facturas_y_reportes.models import Factura, VentaDiaria
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula el acumulado VentaDiaria de un rango de fechas a partir de "
+        "las facturas (por ejemplo después de borrar facturas o de una carga)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", type=date.fromisoformat, default=None)
+        parser.add_argument("--hasta", type=date.fromisoformat, default=None)
+        parser.add_argument(
+            "--todo",
+            action="store_true",
+            help="Desde la primera factura registrada.",
+        )
+
+    def handle(self, *args, **options):
+        hasta = options["hasta"] or timezone.localdate()
+        desde = options["desde"]
+        if options["todo"]:
+            desde = (
+                Factura.objects.order_by("fecha")
+                .values_list("fecha", flat=True)
+                .first()
+                or hasta
+            )
+        elif desde is None:
+            desde = hasta - timedelta(days=30)
+        if desde > hasta:
+            raise CommandError("--desde no puede ser posterior a --hasta")
+
+        filas = VentaDiaria.objects.reconstruir(desde, hasta)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Acumulado reconstruido del {desde} al {hasta}: {filas} filas"
+            )
+        )
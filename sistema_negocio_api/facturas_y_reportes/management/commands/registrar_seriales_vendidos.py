@@ -0,0 +1,37 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from facturas_y_reportes.models import DetalleFactura, SerialVendido
+
+
+class Command(BaseCommand):
+    help = (
+        "Llena la tabla de seriales vendidos con los seriales guardados en las "
+        "líneas de factura existentes. Se puede repetir sin duplicar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tamano-lote", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        tamano_lote = options["tamano_lote"]
+        detalles = DetalleFactura.objects.values_list(
+            "id", "factura_id", "seriales"
+        ).iterator(chunk_size=tamano_lote)
+        seriales = (
+            SerialVendido(numero_serial=serial, detalle_id=id, factura_id=factura_id)
+            for id, factura_id, seriales in detalles
+            for serial in seriales or []
+        )
+
+        procesados = 0
+        while lote := list(islice(seriales, tamano_lote)):
+            SerialVendido.objects.bulk_create(lote, ignore_conflicts=True)
+            procesados += len(lote)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{procesados} seriales procesados, "
+                f"{SerialVendido.objects.count()} registrados en total"
+            )
+        )
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("facturas_y_reportes", "0008_alter_factura_subtotal_alter_factura_total"),
+        ("productos", "0008_tasacambio"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="factura",
+            name="tasa_cambio",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="productos.tasacambio",
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("facturas_y_reportes", "0009_factura_tasa_cambio"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="factura",
+            index=models.Index(
+                fields=["fecha", "id"], name="facturas_y__fecha_999958_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="factura",
+            index=models.Index(
+                fields=["cliente", "fecha", "id"], name="facturas_y__cliente_7d0a54_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="factura",
+            index=models.Index(
+                fields=["metodo_pago", "fecha", "id"],
+                name="facturas_y__metodo__f63916_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:06
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Round
+
+
+def llenar_acumulado(apps, schema_editor):
+    """Carga el acumulado con las facturas existentes en un solo GROUP BY."""
+    DetalleFactura = apps.get_model("facturas_y_reportes", "DetalleFactura")
+    VentaDiaria = apps.get_model("facturas_y_reportes", "VentaDiaria")
+    filas = (
+        DetalleFactura.objects.values(
+            "factura__fecha", "producto_id", "factura__metodo_pago"
+        )
+        .annotate(
+            suma_cantidad=Sum("cantidad"),
+            suma_subtotal=Sum("total_producto"),
+            suma_total=Sum(Round(F("total_producto") * Value(Decimal("1.16")), 2)),
+        )
+        .order_by()
+    )
+    VentaDiaria.objects.bulk_create(
+        (
+            VentaDiaria(
+                fecha=fila["factura__fecha"],
+                producto_id=fila["producto_id"],
+                metodo_pago=fila["factura__metodo_pago"],
+                cantidad=fila["suma_cantidad"],
+                subtotal=fila["suma_subtotal"],
+                total=fila["suma_total"],
+            )
+            for fila in filas.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("facturas_y_reportes", "0010_indices_listado_facturas"),
+        ("productos", "0014_reservas"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VentaDiaria",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fecha", models.DateField()),
+                (
+                    "metodo_pago",
+                    models.CharField(
+                        choices=[
+                            ("banco", "Transferencia/Pago Movil"),
+                            ("efectivo", "Efectivo"),
+                            ("pos", "Punto de Venta"),
+                            ("dolares", "Dolares"),
+                            ("otro", "Otro"),
+                        ],
+                        max_length=50,
+                    ),
+                ),
+                ("cantidad", models.IntegerField(default=0)),
+                (
+                    "subtotal",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "producto",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="productos.producto",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["producto", "fecha"],
+                        name="facturas_y__product_cfcade_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="ventadiaria",
+            constraint=models.UniqueConstraint(
+                fields=("fecha", "producto", "metodo_pago"), name="venta_diaria_unica"
+            ),
+        ),
+        migrations.RunPython(llenar_acumulado, migrations.RunPython.noop),
+    ]
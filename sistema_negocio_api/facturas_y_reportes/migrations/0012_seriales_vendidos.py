@@ -0,0 +1,43 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("facturas_y_reportes", "0011_venta_diaria"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SerialVendido",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("numero_serial", models.CharField(max_length=30, unique=True)),
+                (
+                    "detalle",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="facturas_y_reportes.detallefactura",
+                    ),
+                ),
+                (
+                    "factura",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="facturas_y_reportes.factura",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+
+
+def llenar_estadisticas(apps, schema_editor):
+    """Carga las estadísticas con las facturas existentes en un solo GROUP BY."""
+    Factura = apps.get_model("facturas_y_reportes", "Factura")
+    EstadisticasCliente = apps.get_model("facturas_y_reportes", "EstadisticasCliente")
+    filas = (
+        Factura.objects.values("cliente_id")
+        .annotate(
+            suma_facturas=Count("id"),
+            suma_dolares=Sum("total", filter=Q(metodo_pago="dolares")),
+            suma_bolivares=Sum("total", filter=~Q(metodo_pago="dolares")),
+            maxima_fecha=Max("fecha"),
+        )
+        .order_by()
+    )
+    EstadisticasCliente.objects.bulk_create(
+        (
+            EstadisticasCliente(
+                cliente_id=fila["cliente_id"],
+                cantidad_facturas=fila["suma_facturas"],
+                total_dolares=fila["suma_dolares"] or 0,
+                total_bolivares=fila["suma_bolivares"] or 0,
+                ultima_compra=fila["maxima_fecha"],
+            )
+            for fila in filas.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clientes", "0003_indices_filtros"),
+        ("facturas_y_reportes", "0012_seriales_vendidos"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EstadisticasCliente",
+            fields=[
+                (
+                    "cliente",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="estadisticas",
+                        serialize=False,
+                        to="clientes.cliente",
+                    ),
+                ),
+                ("cantidad_facturas", models.IntegerField(default=0)),
+                (
+                    "total_dolares",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "total_bolivares",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                ("ultima_compra", models.DateField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(llenar_estadisticas, migrations.RunPython.noop),
+    ]
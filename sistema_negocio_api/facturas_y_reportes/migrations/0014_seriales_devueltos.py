@@ -0,0 +1,37 @@
+# Generated by Django 5.0.4 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("facturas_y_reportes", "0013_estadisticas_clientes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="serialvendido",
+            name="devuelto_en",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="serialvendido",
+            name="numero_serial",
+            field=models.CharField(max_length=30),
+        ),
+        migrations.AddIndex(
+            model_name="serialvendido",
+            index=models.Index(
+                fields=["numero_serial", "id"], name="facturas_y__numero__1fc03f_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="serialvendido",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("devuelto_en__isnull", True)),
+                fields=("numero_serial",),
+                name="serial_vendido_unico",
+            ),
+        ),
+    ]
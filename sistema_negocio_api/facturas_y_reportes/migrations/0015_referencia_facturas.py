@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("facturas_y_reportes", "0014_seriales_devueltos"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="factura",
+            name="referencia",
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+    ]
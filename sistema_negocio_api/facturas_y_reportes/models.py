@@ -1,7 +1,29 @@
-from django.db import models
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import models, transaction
 from clientes.models import Cliente
-from productos.models import Producto
-from django.db.models import JSONField
+from productos.models import Producto, TasaCambio
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    JSONField,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Round
+
+IVA = Decimal("1.16")
+
+
+def total_con_iva(total_producto):
+    """Total de una línea con IVA, redondeado igual que ROUND() en SQL."""
+    return (total_producto * IVA).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
 
 # Create your models here.
@@ -18,6 +40,21 @@ class Factura(models.Model):
     metodo_pago = models.CharField(choices=METODOS_PAGO, max_length=50)
     subtotal = models.DecimalField(max_digits=12, decimal_places=2)
     total = models.DecimalField(max_digits=12, decimal_places=2)
+    # Tasa con la que se facturó, para poder reproducir los montos en bolívares.
+    tasa_cambio = models.ForeignKey(
+        TasaCambio, on_delete=models.PROTECT, null=True, blank=True
+    )
+    # Referencia de la caja para las ventas sincronizadas (SincronizarFacturas):
+    # un lote reenviado no las vuelve a registrar.
+    referencia = models.CharField(max_length=100, unique=True, null=True, blank=True)
+
+    class Meta:
+        # Sirven al listado paginado por (fecha, id) con y sin filtros.
+        indexes = [
+            models.Index(fields=["fecha", "id"]),
+            models.Index(fields=["cliente", "fecha", "id"]),
+            models.Index(fields=["metodo_pago", "fecha", "id"]),
+        ]
 
 
 class DetalleFactura(models.Model):
@@ -27,3 +64,450 @@ class DetalleFactura(models.Model):
     factura = models.ForeignKey(Factura, on_delete=models.CASCADE)
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
     seriales = JSONField(default=list)
+
+
+class SerialVendido(models.Model):
+    """
+    Índice de seriales vendidos: serial -> línea -> factura -> cliente. Una
+    devolución no borra la fila, la marca con ``devuelto_en``; solo puede
+    haber una venta sin devolver por serial.
+    """
+
+    numero_serial = models.CharField(max_length=30)
+    detalle = models.ForeignKey(DetalleFactura, on_delete=models.CASCADE)
+    factura = models.ForeignKey(Factura, on_delete=models.CASCADE)
+    devuelto_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["numero_serial"],
+                condition=Q(devuelto_en__isnull=True),
+                name="serial_vendido_unico",
+            )
+        ]
+        indexes = [models.Index(fields=["numero_serial", "id"])]
+
+
+def _precio_con_iva(precio):
+    return Round(F(precio) * Value(IVA), 2)
+
+
+def sumas_devueltas_por_dia(seriales):
+    """
+    Lo que restan de VentaDiaria los seriales devueltos ``seriales``
+    (queryset de SerialVendido), con la misma forma que ``sumas_por_dia``:
+    cada serial es una unidad de su línea, con el IVA redondeado por unidad.
+    """
+    filas = (
+        seriales.values(
+            "detalle__factura__fecha",
+            "detalle__producto_id",
+            "detalle__factura__metodo_pago",
+        )
+        .annotate(
+            suma_cantidad=Count("id"),
+            suma_subtotal=Sum("detalle__precio_unitario"),
+            suma_total=Sum(_precio_con_iva("detalle__precio_unitario")),
+        )
+        .order_by()
+    )
+    return {
+        (
+            fila["detalle__factura__fecha"],
+            fila["detalle__producto_id"],
+            fila["detalle__factura__metodo_pago"],
+        ): (fila["suma_cantidad"], fila["suma_subtotal"], fila["suma_total"])
+        for fila in filas
+    }
+
+
+def sumas_devueltas_por_cliente(seriales):
+    """
+    Lo que restan de EstadisticasCliente los seriales devueltos ``seriales``:
+    ``{cliente_id: (0, total_dolares, total_bolivares)}``. La factura sigue
+    contando como compra.
+    """
+    en_dolares = Q(factura__metodo_pago="dolares")
+    filas = (
+        seriales.values("factura__cliente_id")
+        .annotate(
+            suma_dolares=Sum(
+                _precio_con_iva("detalle__precio_unitario"), filter=en_dolares
+            ),
+            suma_bolivares=Sum(
+                _precio_con_iva("detalle__precio_unitario"), filter=~en_dolares
+            ),
+        )
+        .order_by()
+    )
+    return {
+        fila["factura__cliente_id"]: (
+            0,
+            fila["suma_dolares"] or 0,
+            fila["suma_bolivares"] or 0,
+        )
+        for fila in filas
+    }
+
+
+def sumas_por_dia(detalles):
+    """
+    Agrupa las líneas ``detalles`` (queryset de DetalleFactura) con un solo
+    GROUP BY: ``{(fecha, producto_id, metodo_pago): (cantidad, subtotal,
+    total)}``, la forma que usa VentaDiaria, sin los seriales devueltos.
+    """
+    filas = (
+        detalles.values("factura__fecha", "producto_id", "factura__metodo_pago")
+        .annotate(
+            suma_cantidad=Sum("cantidad"),
+            suma_subtotal=Sum("total_producto"),
+            suma_total=Sum(_precio_con_iva("total_producto")),
+        )
+        .order_by()
+    )
+    lineas = {
+        (fila["factura__fecha"], fila["producto_id"], fila["factura__metodo_pago"]): (
+            fila["suma_cantidad"],
+            fila["suma_subtotal"],
+            fila["suma_total"],
+        )
+        for fila in filas
+    }
+    devueltas = sumas_devueltas_por_dia(
+        SerialVendido.objects.filter(detalle__in=detalles, devuelto_en__isnull=False)
+    )
+    for clave, restas in devueltas.items():
+        sumas = tuple(a - b for a, b in zip(lineas[clave], restas))
+        if sumas[0] > 0:
+            lineas[clave] = sumas
+        else:
+            del lineas[clave]
+    return lineas
+
+
+class VentaDiariaQuerySet(models.QuerySet):
+    def _filtro(self, lineas):
+        filtro = Q()
+        for fecha, producto_id, metodo in lineas:
+            filtro |= Q(fecha=fecha, producto_id=producto_id, metodo_pago=metodo)
+        return filtro
+
+    def _sumar(self, lineas, restar=False):
+        def incremento(campo, posicion, tipo):
+            valor = Case(
+                *[
+                    When(
+                        Q(fecha=fecha, producto_id=producto_id, metodo_pago=metodo),
+                        then=Value(valores[posicion]),
+                    )
+                    for (fecha, producto_id, metodo), valores in lineas.items()
+                ],
+                output_field=tipo,
+            )
+            return F(campo) - valor if restar else F(campo) + valor
+
+        todas = self._filtro(lineas)
+        with transaction.atomic():
+            # Bloqueo en orden de id, como descontar_stock: dos ventas del
+            # mismo día y producto no se bloquean mutuamente.
+            list(
+                self.select_for_update()
+                .filter(todas)
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
+            self.filter(todas).update(
+                cantidad=incremento("cantidad", 0, models.IntegerField()),
+                subtotal=incremento(
+                    "subtotal", 1, models.DecimalField(max_digits=14, decimal_places=2)
+                ),
+                total=incremento(
+                    "total", 2, models.DecimalField(max_digits=14, decimal_places=2)
+                ),
+            )
+
+    def acumular(self, lineas):
+        """
+        Suma ``{(fecha, producto_id, metodo_pago): (cantidad, subtotal, total)}``
+        a los acumulados con un número fijo de consultas: crea las filas que
+        falten y las incrementa con un solo UPDATE. Debe llamarse dentro de la
+        transacción de la venta.
+        """
+        if not lineas:
+            return
+        self.bulk_create(
+            [
+                VentaDiaria(fecha=fecha, producto_id=producto_id, metodo_pago=metodo)
+                for fecha, producto_id, metodo in lineas
+            ],
+            ignore_conflicts=True,
+        )
+        self._sumar(lineas)
+
+    def descontar(self, lineas):
+        """
+        Resta ``lineas`` (la misma forma que ``acumular``) de los acumulados,
+        por ejemplo antes de borrar sus facturas. Las filas que quedan sin
+        ventas se eliminan, como si no se hubieran creado.
+        """
+        if not lineas:
+            return
+        with transaction.atomic():
+            self._sumar(lineas, restar=True)
+            self.filter(self._filtro(lineas), cantidad__lte=0).delete()
+
+    def reconstruir(self, desde, hasta):
+        """
+        Recalcula los acumulados de ``desde`` a ``hasta`` (inclusive) desde
+        DetalleFactura con un solo GROUP BY. Retorna la cantidad de filas.
+        """
+        lineas = sumas_por_dia(
+            DetalleFactura.objects.filter(factura__fecha__range=(desde, hasta))
+        )
+        with transaction.atomic():
+            self.filter(fecha__range=(desde, hasta)).delete()
+            creadas = self.bulk_create(
+                VentaDiaria(
+                    fecha=fecha,
+                    producto_id=producto_id,
+                    metodo_pago=metodo,
+                    cantidad=sumas[0],
+                    subtotal=sumas[1],
+                    total=sumas[2],
+                )
+                for (fecha, producto_id, metodo), sumas in lineas.items()
+            )
+        return len(creadas)
+
+
+class VentaDiaria(models.Model):
+    """Acumulado de ventas por día, producto y método de pago."""
+
+    fecha = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
+    metodo_pago = models.CharField(choices=Factura.METODOS_PAGO, max_length=50)
+    cantidad = models.IntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    objects = VentaDiariaQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["fecha", "producto", "metodo_pago"],
+                name="venta_diaria_unica",
+            )
+        ]
+        indexes = [models.Index(fields=["producto", "fecha"])]
+
+
+class EstadisticasClienteQuerySet(models.QuerySet):
+    def acumular(self, por_cliente):
+        """
+        Suma ``{cliente_id: (facturas, total_dolares, total_bolivares,
+        ultima_compra)}`` a las estadísticas con un número fijo de consultas,
+        igual que VentaDiaria.acumular. Debe llamarse dentro de la transacción
+        de la venta.
+        """
+        if not por_cliente:
+            return
+        self.bulk_create(
+            [EstadisticasCliente(cliente_id=cliente_id) for cliente_id in por_cliente],
+            ignore_conflicts=True,
+        )
+
+        def caso(valores, tipo, default):
+            return Case(
+                *[
+                    When(cliente_id=cliente_id, then=Value(valor))
+                    for cliente_id, valor in valores.items()
+                ],
+                default=default,
+                output_field=tipo,
+            )
+
+        def incremento(campo, posicion, tipo):
+            valores = {c: datos[posicion] for c, datos in por_cliente.items()}
+            return F(campo) + caso(valores, tipo, Value(0))
+
+        dinero = models.DecimalField(max_digits=16, decimal_places=2)
+        # La fecha más reciente gana: una venta sincronizada puede ser de un
+        # día anterior a la última compra registrada.
+        ultima = {c: datos[3] for c, datos in por_cliente.items()}
+        nueva_ultima = caso(ultima, models.DateField(), F("ultima_compra"))
+
+        with transaction.atomic():
+            list(
+                self.select_for_update()
+                .filter(cliente_id__in=por_cliente)
+                .order_by("cliente_id")
+                .values_list("cliente_id", flat=True)
+            )
+            self.filter(cliente_id__in=por_cliente).update(
+                cantidad_facturas=incremento(
+                    "cantidad_facturas", 0, models.IntegerField()
+                ),
+                total_dolares=incremento("total_dolares", 1, dinero),
+                total_bolivares=incremento("total_bolivares", 2, dinero),
+                ultima_compra=Case(
+                    When(
+                        Q(ultima_compra__isnull=True)
+                        | Q(ultima_compra__lt=nueva_ultima),
+                        then=nueva_ultima,
+                    ),
+                    default=F("ultima_compra"),
+                    output_field=models.DateField(),
+                ),
+            )
+
+    def _sumas(self, facturas):
+        return (
+            facturas.values("cliente_id")
+            .annotate(
+                suma_facturas=Count("id"),
+                suma_dolares=Sum("total", filter=Q(metodo_pago="dolares")),
+                suma_bolivares=Sum("total", filter=~Q(metodo_pago="dolares")),
+                maxima_fecha=Max("fecha"),
+            )
+            .order_by()
+        )
+
+    def descontar(self, por_cliente):
+        """
+        Resta ``{cliente_id: (facturas, total_dolares, total_bolivares)}`` de
+        las estadísticas en un solo UPDATE, por ejemplo al devolver seriales.
+        Debe llamarse dentro de la transacción que los devuelve.
+        """
+        if not por_cliente:
+            return
+
+        def resta(campo, posicion, tipo):
+            return F(campo) - Case(
+                *[
+                    When(cliente_id=cliente_id, then=Value(datos[posicion]))
+                    for cliente_id, datos in por_cliente.items()
+                ],
+                default=Value(0),
+                output_field=tipo,
+            )
+
+        dinero = models.DecimalField(max_digits=16, decimal_places=2)
+        with transaction.atomic():
+            list(
+                self.select_for_update()
+                .filter(cliente_id__in=por_cliente)
+                .order_by("cliente_id")
+                .values_list("cliente_id", flat=True)
+            )
+            self.filter(cliente_id__in=por_cliente).update(
+                cantidad_facturas=resta("cantidad_facturas", 0, models.IntegerField()),
+                total_dolares=resta("total_dolares", 1, dinero),
+                total_bolivares=resta("total_bolivares", 2, dinero),
+            )
+
+    def _sumas_netas(self, facturas):
+        """
+        ``{cliente_id: (facturas, total_dolares, total_bolivares, ultima)}``
+        de ``facturas``, sin los seriales devueltos.
+        """
+        por_cliente = {
+            fila["cliente_id"]: (
+                fila["suma_facturas"],
+                fila["suma_dolares"] or 0,
+                fila["suma_bolivares"] or 0,
+                fila["maxima_fecha"],
+            )
+            for fila in self._sumas(facturas).iterator()
+        }
+        devueltas = sumas_devueltas_por_cliente(
+            SerialVendido.objects.filter(
+                factura__in=facturas, devuelto_en__isnull=False
+            )
+        )
+        for cliente_id, (_, dolares, bolivares) in devueltas.items():
+            cantidad, total_dolares, total_bolivares, ultima = por_cliente[cliente_id]
+            por_cliente[cliente_id] = (
+                cantidad,
+                total_dolares - dolares,
+                total_bolivares - bolivares,
+                ultima,
+            )
+        return por_cliente
+
+    def descontar_facturas(self, factura_ids):
+        """
+        Resta las facturas ``factura_ids`` de las estadísticas de sus clientes
+        antes de borrarlas, y recalcula la última compra con las que quedan
+        (una consulta indexada por cliente y fecha).
+        """
+        por_cliente = self._sumas_netas(Factura.objects.filter(id__in=factura_ids))
+        if not por_cliente:
+            return
+        ultima = (
+            Factura.objects.filter(cliente_id=OuterRef("cliente_id"))
+            .exclude(id__in=factura_ids)
+            .order_by("-fecha")
+            .values("fecha")[:1]
+        )
+        with transaction.atomic():
+            self.descontar({c: datos[:3] for c, datos in por_cliente.items()})
+            self.filter(cliente_id__in=por_cliente).update(
+                ultima_compra=Subquery(ultima)
+            )
+
+    def reconstruir(self):
+        """
+        Recalcula las estadísticas de todos los clientes desde Factura con un
+        solo GROUP BY (y otro para los seriales devueltos). Retorna la
+        cantidad de filas.
+        """
+        por_cliente = self._sumas_netas(Factura.objects.all())
+        with transaction.atomic():
+            self.all().delete()
+            creadas = self.bulk_create(
+                (
+                    EstadisticasCliente(
+                        cliente_id=cliente_id,
+                        cantidad_facturas=datos[0],
+                        total_dolares=datos[1],
+                        total_bolivares=datos[2],
+                        ultima_compra=datos[3],
+                    )
+                    for cliente_id, datos in por_cliente.items()
+                ),
+                batch_size=1000,
+            )
+        return len(creadas)
+
+
+class EstadisticasCliente(models.Model):
+    """
+    Historial de compras de un cliente, acumulado al vender. Los totales van
+    en la moneda de la factura: las pagadas en dólares y el resto (bolívares)
+    por separado.
+    """
+
+    cliente = models.OneToOneField(
+        Cliente,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="estadisticas",
+    )
+    cantidad_facturas = models.IntegerField(default=0)
+    total_dolares = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total_bolivares = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    ultima_compra = models.DateField(null=True, blank=True)
+
+    objects = EstadisticasClienteQuerySet.as_manager()
+
+
+def _al_borrar_lote_detalles(sender, ids, **kwargs):
+    VentaDiaria.objects.descontar(
+        sumas_por_dia(DetalleFactura.objects.filter(id__in=ids))
+    )
+
+
+def _al_borrar_lote_facturas(sender, ids, **kwargs):
+    EstadisticasCliente.objects.descontar_facturas(ids)
@@ -8,13 +8,36 @@ from productos.models import Producto
 class FacturaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Factura
-        fields = ("id", "fecha", "total", "subtotal", "cliente", "metodo_pago")
+        fields = (
+            "id",
+            "fecha",
+            "total",
+            "subtotal",
+            "cliente",
+            "metodo_pago",
+            "tasa_cambio",
+        )
+        read_only_fields = ("tasa_cambio",)
 
     cliente = serializers.SlugRelatedField(
         slug_field="id", queryset=Cliente.objects.all()
     )
 
 
+class FacturaListaSerializer(serializers.ModelSerializer):
+    """Representación liviana para el listado; requiere select_related("cliente")."""
+
+    class Meta:
+        model = Factura
+        fields = ("id", "fecha", "cliente", "cliente_nombre", "metodo_pago", "total")
+
+    cliente = serializers.IntegerField(source="cliente_id")
+    cliente_nombre = serializers.SerializerMethodField()
+
+    def get_cliente_nombre(self, factura):
+        return f"{factura.cliente.nombre} {factura.cliente.apellido}".strip()
+
+
 class DetalleFacturaSerializer(serializers.ModelSerializer):
     class Meta:
         model = DetalleFactura
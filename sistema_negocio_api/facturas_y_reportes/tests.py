@@ -1,3 +1,973 @@
-from django.test import TestCase
+import csv
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from io import StringIO
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from clientes.importacion import importar_clientes
+from clientes.models import Cliente
+from productos import precio_dolar
+from productos.borrado import procesar_borrados
+from productos.models import Categoria, Item, Producto, Reserva, TasaCambio
+from productos.reservas import reservar_seriales
+from .models import (
+    DetalleFactura,
+    EstadisticasCliente,
+    Factura,
+    SerialVendido,
+    VentaDiaria,
+)
+from .views import SincronizarFacturas
+
+
+class FacturaTestCase(TestCase):
+    def setUp(self):
+        precio_dolar.invalidar_tasa()
+        self.addCleanup(precio_dolar.invalidar_tasa)
+        # Sin tasa registrada no se debe consultar el monitor (red) en las pruebas.
+        refresco = patch("productos.precio_dolar._refrescar_en_segundo_plano")
+        refresco.start()
+        self.addCleanup(refresco.stop)
+        # Las facturas cacheadas de una prueba no deben verse en la siguiente.
+        cache.clear()
+        self.user = User.objects.create_user(username="cajero", password="clave123")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.cliente = Cliente.objects.create(
+            nombre="Juan",
+            apellido="Pérez",
+            correo="juan@example.com",
+            ci="V12345678",
+            direccion="Caracas",
+            telefono="04141234567",
+        )
+        self.categoria = Categoria.objects.create(nombre="Laptops", descripcion="")
+        self.producto = self.crear_producto("Laptop HP", ["SN-1", "SN-2", "SN-3"])
+
+    def crear_producto(self, nombre, seriales, precio_dolares=Decimal("116")):
+        producto = Producto.objects.create(
+            nombre=nombre,
+            descripcion="",
+            precio_dolares=precio_dolares,
+            precio_bolivares=precio_dolares * 10,
+            cantidad_en_stock=len(seriales),
+            categoria=self.categoria,
+        )
+        Item.objects.bulk_create(
+            Item(producto=producto, numero_serial=serial) for serial in seriales
+        )
+        return producto
+
+    def crear_factura(
+        self, productos, metodo_pago="banco", cliente="Juan Pérez", reserva=None
+    ):
+        return self.client.post(
+            "/api/crear_factura/",
+            {
+                "cliente": cliente,
+                "metodo_pago": metodo_pago,
+                "productos": productos,
+                "reserva": reserva,
+            },
+            format="json",
+        )
+
+
+class TestCrearFactura(FacturaTestCase):
+    def test_descuenta_stock_y_marca_vendidos(self):
+        response = self.crear_factura([{"nombre": "Laptop HP", "seriales": ["SN-1"]}])
+        self.assertEqual(response.status_code, 201)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.cantidad_en_stock, 2)
+        detalle = DetalleFactura.objects.get()
+        self.assertEqual(detalle.seriales, ["SN-1"])
+        item = Item.objects.get(numero_serial="SN-1")
+        self.assertEqual((item.estado, item.detalle), (Item.VENDIDO, detalle))
+
+        # Un serial vendido no se puede volver a vender.
+        response = self.crear_factura([{"nombre": "Laptop HP", "seriales": ["SN-1"]}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_consultas_no_dependen_de_la_cantidad_de_lineas(self):
+        for i in range(20):
+            self.crear_producto(f"Producto {i}", [f"P{i}-1", f"P{i}-2"])
+
+        def consultas(lineas):
+            with CaptureQueriesContext(connection) as capturadas:
+                response = self.crear_factura(lineas)
+            self.assertEqual(response.status_code, 201)
+            return len(capturadas)
+
+        una_linea = consultas([{"nombre": "Laptop HP", "seriales": ["SN-1"]}])
+        veinte_lineas = consultas(
+            [
+                {"nombre": f"Producto {i}", "seriales": [f"P{i}-1", f"P{i}-2"]}
+                for i in range(20)
+            ]
+        )
+        self.assertEqual(una_linea, veinte_lineas)
+        self.assertEqual(DetalleFactura.objects.count(), 21)
+        self.assertEqual(Producto.objects.get(nombre="Producto 7").cantidad_en_stock, 0)
+
+    def test_lineas_por_id_y_sku(self):
+        otro = self.crear_producto("Mouse", ["M-1"])
+        Producto.objects.filter(id=otro.id).update(sku="MOU-1")
+        response = self.crear_factura(
+            [
+                {"id": self.producto.id, "seriales": ["SN-1", "SN-2"]},
+                {"sku": "MOU-1", "seriales": ["M-1"]},
+            ]
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [d["cantidad"] for d in response.data["detalles_factura"]], [2, 1]
+        )
+
+    def test_serial_de_otro_producto_o_repetido(self):
+        self.crear_producto("Mouse", ["M-1"])
+        for lineas in (
+            [{"nombre": "Laptop HP", "seriales": ["M-1"]}],
+            [
+                {"nombre": "Laptop HP", "seriales": ["SN-1"]},
+                {"nombre": "Laptop HP", "seriales": ["SN-1"]},
+            ],
+        ):
+            self.assertEqual(self.crear_factura(lineas).status_code, 400)
+        self.assertEqual(self.crear_factura([{"nombre": "No existe"}]).status_code, 404)
+        self.assertFalse(Factura.objects.exists())
+
+    def test_seriales_bloqueados_por_otra_venta(self):
+        with patch(
+            "facturas_y_reportes.views.CrearFactura.bloquear_seriales",
+            side_effect=OperationalError("could not obtain lock"),
+        ):
+            response = self.crear_factura(
+                [{"nombre": "Laptop HP", "seriales": ["SN-1"]}]
+            )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["conflicto"], "bloqueo")
+
+        # skip_locked: el serial existe pero no fue devuelto por estar bloqueado.
+        with patch(
+            "facturas_y_reportes.views.CrearFactura.bloquear_seriales",
+            return_value={},
+        ):
+            response = self.crear_factura(
+                [{"nombre": "Laptop HP", "seriales": ["SN-1"]}]
+            )
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Factura.objects.exists())
+
+    def test_convierte_reservas_de_la_sesion(self):
+        reservar_seriales("caja-1", ["SN-1", "SN-2"])
+        reservar_seriales("caja-2", ["SN-3"])
+
+        response = self.crear_factura(
+            [{"nombre": "Laptop HP", "seriales": ["SN-1", "SN-3"]}], reserva="caja-1"
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["conflicto"], "reservado")
+        self.assertEqual(response.data["seriales"], ["SN-3"])
+
+        response = self.crear_factura(
+            [{"nombre": "Laptop HP", "seriales": ["SN-1", "SN-2"]}], reserva="caja-1"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            list(Reserva.objects.values_list("sesion", flat=True)), ["caja-2"]
+        )
+
+    @override_settings(PRECIOS_BS_EN_LECTURA=True)
+    def test_factura_registra_la_tasa_usada(self):
+        tasa = TasaCambio.objects.create(tasa=Decimal("40"))
+        response = self.crear_factura([{"nombre": "Laptop HP", "seriales": ["SN-1"]}])
+        self.assertEqual(response.status_code, 201)
+        factura = Factura.objects.get()
+        self.assertEqual(factura.tasa_cambio, tasa)
+        # 116 $ * 40 Bs/$ sin IVA
+        self.assertEqual(DetalleFactura.objects.get().precio_unitario, Decimal("4000"))
+
+    @override_settings(PRECIOS_BS_EN_LECTURA=False)
+    def test_sin_precios_en_lectura_no_registra_tasa(self):
+        # Las líneas salen de precio_bolivares (calculado con la tasa de la
+        # última actualización), no de la tasa vigente: no se registra.
+        TasaCambio.objects.create(tasa=Decimal("40"))
+        response = self.crear_factura([{"nombre": "Laptop HP", "seriales": ["SN-1"]}])
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(Factura.objects.get().tasa_cambio)
+
+
+class TestClienteDeLaFactura(FacturaTestCase):
+    def crear(self, **cliente):
+        return self.client.post(
+            "/api/crear_factura/",
+            {
+                **cliente,
+                "metodo_pago": "banco",
+                "productos": [{"nombre": "Laptop HP", "seriales": ["SN-1"]}],
+            },
+            format="json",
+        )
+
+    def test_por_id_ci_o_nombre(self):
+        Cliente.objects.filter(id=self.cliente.id).update(
+            nombre="María José", apellido="Pérez Díaz"
+        )
+        for referencia in (
+            {"cliente_id": self.cliente.id},
+            {"ci": "v12345678"},
+            {"cliente": "  maría josé PÉREZ   díaz "},
+        ):
+            with self.subTest(referencia=referencia):
+                response = self.crear(**referencia)
+                self.assertEqual(response.status_code, 201)
+                Factura.objects.all().delete()
+                Item.objects.update(estado=Item.DISPONIBLE, detalle=None)
+                SerialVendido.objects.all().delete()
+
+    def test_cliente_inexistente_o_ambiguo(self):
+        self.assertEqual(self.crear().status_code, 400)
+        self.assertEqual(self.crear(cliente_id="x").status_code, 404)
+        self.assertEqual(self.crear(ci="V0").status_code, 404)
+        Cliente.objects.create(
+            nombre="Juan Pérez",
+            apellido="",
+            correo="otro@example.com",
+            direccion="",
+            telefono="",
+        )
+        response = self.crear(cliente="Juan Pérez")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ci", response.data["mensaje_de_error"])
+        self.assertFalse(Factura.objects.exists())
+
+
+class TestSincronizarFacturas(FacturaTestCase):
+    def sincronizar(self, facturas):
+        return self.client.post(
+            "/api/sincronizar_facturas/", {"facturas": facturas}, format="json"
+        )
+
+    def venta(self, referencia, seriales, cliente="Juan Pérez", **extra):
+        return {
+            "referencia": referencia,
+            "cliente": cliente,
+            "metodo_pago": "banco",
+            "productos": [{"nombre": "Laptop HP", "seriales": seriales}],
+            **extra,
+        }
+
+    def test_resultados_por_factura(self):
+        reservar_seriales("caja-2", ["SN-3"])
+        response = self.sincronizar(
+            [
+                self.venta("a", ["SN-1"], fecha="2024-01-15"),
+                self.venta("b", ["SN-1"]),
+                self.venta("c", ["SN-2"], cliente="Nadie Conocido"),
+                self.venta("d", ["SN-3"]),
+                self.venta("e", ["SN-2"], metodo_pago="cripto"),
+                self.venta("f", ["SN-2"]),
+            ]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [
+                (r["referencia"], r["estado"], r.get("motivo"))
+                for r in response.data["resultados"]
+            ],
+            [
+                ("a", "aceptada", None),
+                ("b", "rechazada", "conflicto_serial"),
+                ("c", "rechazada", "cliente_desconocido"),
+                ("d", "rechazada", "conflicto_serial"),
+                ("e", "rechazada", "datos_invalidos"),
+                ("f", "aceptada", None),
+            ],
+        )
+        self.assertEqual(response.data["aceptadas"], 2)
+        self.assertEqual(
+            str(
+                Factura.objects.get(
+                    id=response.data["resultados"][0]["factura_id"]
+                ).fecha
+            ),
+            "2024-01-15",
+        )
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.cantidad_en_stock, 1)
+        self.assertEqual(
+            list(Item.objects.en_stock().values_list("numero_serial", flat=True)),
+            ["SN-3"],
+        )
+
+    def test_clientes_por_id_ci_o_nombre(self):
+        response = self.sincronizar(
+            [
+                self.venta("a", ["SN-1"], cliente=None, cliente_id=self.cliente.id),
+                self.venta("b", ["SN-2"], cliente=None, ci="V12345678"),
+                self.venta("c", ["SN-3"], cliente="juan  pérez"),
+                self.venta("d", ["SN-3"], cliente=None, ci="V0"),
+            ]
+        )
+        self.assertEqual(
+            [r.get("motivo") for r in response.data["resultados"]],
+            [None, None, None, "cliente_desconocido"],
+        )
+        self.assertEqual(Factura.objects.filter(cliente=self.cliente).count(), 3)
+
+    def test_consultas_no_dependen_del_tamano_del_lote(self):
+        for i in range(20):
+            self.crear_producto(f"Producto {i}", [f"P{i}-1", f"P{i}-2"])
+
+        def consultas(facturas):
+            with CaptureQueriesContext(connection) as capturadas:
+                response = self.sincronizar(facturas)
+            self.assertEqual(response.data["aceptadas"], len(facturas))
+            return len(capturadas)
+
+        una = consultas([self.venta("a", ["SN-1"])])
+        veinte = consultas(
+            [
+                {
+                    "referencia": i,
+                    "cliente": "Juan Pérez",
+                    "metodo_pago": "dolares",
+                    "productos": [
+                        {"nombre": f"Producto {i}", "seriales": [f"P{i}-1", f"P{i}-2"]}
+                    ],
+                }
+                for i in range(20)
+            ]
+        )
+        self.assertEqual(una, veinte)
+        self.assertEqual(DetalleFactura.objects.count(), 21)
+
+    def test_stock_vendido_por_otra_caja_rechaza_solo_esa_factura(self):
+        buscar_productos = SincronizarFacturas.buscar_productos
+
+        def vender_en_otra_caja(vista, referencias):
+            # Otra venta descuenta stock después de leer los productos.
+            encontrados = buscar_productos(vista, referencias)
+            Producto.objects.filter(id=self.producto.id).update(cantidad_en_stock=1)
+            return encontrados
+
+        with patch.object(SincronizarFacturas, "buscar_productos", vender_en_otra_caja):
+            response = self.sincronizar(
+                [self.venta("a", ["SN-1"]), self.venta("b", ["SN-2"])]
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [r.get("motivo") for r in response.data["resultados"]], [None, "stock"]
+        )
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.cantidad_en_stock, 0)
+
+    def test_reenvio_del_lote(self):
+        lote = [self.venta("a", ["SN-1"]), self.venta("b", ["SN-2"])]
+        primera = self.sincronizar(lote)
+        self.assertEqual(primera.data["aceptadas"], 2)
+
+        # La respuesta se perdió y la caja reenvía el lote con una venta más.
+        segunda = self.sincronizar(lote + [self.venta("c", ["SN-3"])])
+        self.assertEqual(segunda.status_code, 200)
+        self.assertEqual(
+            (
+                segunda.data["aceptadas"],
+                segunda.data["ya_sincronizadas"],
+                segunda.data["rechazadas"],
+            ),
+            (1, 2, 0),
+        )
+        for antes, ahora in zip(primera.data["resultados"], segunda.data["resultados"]):
+            self.assertEqual(ahora["estado"], "ya_sincronizada")
+            self.assertEqual(ahora["factura_id"], antes["factura_id"])
+        self.assertEqual(Factura.objects.count(), 3)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.cantidad_en_stock, 0)
+
+        response = self.sincronizar(
+            [self.venta("d", ["SN-4"]), self.venta("d", ["SN-5"])]
+        )
+        self.assertEqual(
+            [r.get("motivo") for r in response.data["resultados"]],
+            ["conflicto_serial", "datos_invalidos"],
+        )
+
+    def test_lote_invalido(self):
+        self.assertEqual(self.sincronizar([]).status_code, 400)
+        with override_settings(SINCRONIZACION_MAXIMO_FACTURAS=1):
+            response = self.sincronizar(
+                [self.venta("a", ["SN-1"]), self.venta("b", ["SN-2"])]
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Factura.objects.exists())
+
+
+class TestVerFacturas(FacturaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.otro = Cliente.objects.create(
+            nombre="Ana",
+            apellido="Gómez",
+            correo="ana@example.com",
+            ci="V1",
+            direccion="",
+            telefono="",
+        )
+        facturas = Factura.objects.bulk_create(
+            Factura(
+                cliente=self.cliente if i % 2 else self.otro,
+                metodo_pago="dolares" if i % 3 else "banco",
+                subtotal=Decimal(i * 10),
+                total=Decimal(i * 10),
+            )
+            for i in range(12)
+        )
+        for i, factura in enumerate(facturas):
+            Factura.objects.filter(id=factura.id).update(fecha=date(2024, 1, 1 + i))
+
+    def test_paginado_de_la_mas_reciente(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/facturas/", {"limit": 5})
+        facturas = response.data["facturas"]
+        self.assertEqual(facturas[0]["fecha"], "2024-01-12")
+        self.assertEqual(facturas[0]["cliente_nombre"], "Juan Pérez")
+        self.assertEqual(facturas[1]["cliente_nombre"], "Ana Gómez")
+
+        fechas = [f["fecha"] for f in facturas]
+        cursor = response.data["siguiente_cursor"]
+        while cursor:
+            response = self.client.get("/api/facturas/", {"limit": 5, "cursor": cursor})
+            fechas += [f["fecha"] for f in response.data["facturas"]]
+            cursor = response.data["siguiente_cursor"]
+        self.assertEqual(len(fechas), 12)
+        self.assertEqual(fechas, sorted(fechas, reverse=True))
+
+    def test_filtros(self):
+        response = self.client.get(
+            "/api/facturas/",
+            {
+                "desde": "2024-01-03",
+                "hasta": "2024-01-10",
+                "cliente": self.cliente.id,
+                "metodo_pago": "dolares",
+                "total_min": "40",
+                "total": "true",
+            },
+        )
+        # i impar, no múltiplo de 3, entre 2 y 9, total >= 40: 5 y 7
+        self.assertEqual(
+            [f["fecha"] for f in response.data["facturas"]],
+            ["2024-01-08", "2024-01-06"],
+        )
+        self.assertEqual(response.data["total"], 2)
+        self.assertEqual(
+            self.client.get("/api/facturas/", {"desde": "ayer"}).status_code, 400
+        )
+
+
+class TestVerFactura(FacturaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_producto("Mouse", ["M-1"])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.crear_factura(
+                [
+                    {"nombre": "Laptop HP", "seriales": ["SN-1", "SN-2"]},
+                    {"nombre": "Mouse", "seriales": ["M-1"]},
+                ]
+            )
+        self.url = f"/api/factura/{response.data['factura_creada']['id']}/"
+
+    def test_cacheada_al_crear_y_revalidable(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["factura"]["cliente"], "Juan Pérez")
+        self.assertEqual(
+            [d["nombre"] for d in response.data["detalles_factura"]],
+            ["Laptop HP", "Mouse"],
+        )
+
+        etag = response["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"otra", W/{etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_se_arma_una_vez_y_se_descarta_al_borrar(self):
+        cache.clear()
+        with self.assertNumQueries(2):
+            primera = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            segunda = self.client.get(self.url)
+        self.assertEqual(primera.data, segunda.data)
+        self.assertEqual(primera["ETag"], segunda["ETag"])
+
+        Factura.objects.all().delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_se_descarta_al_renombrar_cliente_o_producto(self):
+        self.cliente.nombre = "Juana"
+        self.cliente.save()
+        self.assertEqual(
+            self.client.get(self.url).data["factura"]["cliente"], "Juana Pérez"
+        )
+
+        self.producto.nombre = "Laptop HP 14"
+        self.producto.save()
+        self.assertEqual(
+            [d["nombre"] for d in self.client.get(self.url).data["detalles_factura"]],
+            ["Laptop HP 14", "Mouse"],
+        )
+
+        # Guardar otros campos no descarta la entrada.
+        self.producto.save(update_fields=["precio_bolivares"])
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        _, actualizados, _ = importar_clientes(
+            [
+                {
+                    "nombre": "Juana María",
+                    "apellido": "Pérez",
+                    "correo": "juan@example.com",
+                    "telefono": "04141234567",
+                    "ci": "V12345678",
+                    "direccion": "Caracas",
+                }
+            ]
+        )
+        self.assertEqual(actualizados, 1)
+        self.assertEqual(
+            self.client.get(self.url).data["factura"]["cliente"], "Juana María Pérez"
+        )
+
+
+class TestVentaDiaria(FacturaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mouse = self.crear_producto("Mouse", ["M-1", "M-2"], Decimal("11.60"))
+        self.crear_factura(
+            [
+                {"nombre": "Laptop HP", "seriales": ["SN-1", "SN-2"]},
+                {"nombre": "Mouse", "seriales": ["M-1"]},
+            ],
+            metodo_pago="dolares",
+        )
+        self.crear_factura([{"nombre": "Laptop HP", "seriales": ["SN-3"]}], "dolares")
+        self.client.post(
+            "/api/sincronizar_facturas/",
+            {
+                "facturas": [
+                    {
+                        "cliente": "Juan Pérez",
+                        "metodo_pago": "efectivo",
+                        "fecha": "2024-03-01",
+                        "productos": [{"nombre": "Mouse", "seriales": ["M-2"]}],
+                    }
+                ]
+            },
+            format="json",
+        )
+
+    def acumulado(self):
+        return sorted(
+            VentaDiaria.objects.values_list(
+                "fecha",
+                "producto__nombre",
+                "metodo_pago",
+                "cantidad",
+                "subtotal",
+                "total",
+            )
+        )
+
+    def test_acumula_en_cada_venta(self):
+        hoy = timezone.localdate()
+        self.assertEqual(
+            self.acumulado(),
+            [
+                (
+                    date(2024, 3, 1),
+                    "Mouse",
+                    "efectivo",
+                    1,
+                    Decimal("100"),
+                    Decimal("116"),
+                ),
+                (hoy, "Laptop HP", "dolares", 3, Decimal("300"), Decimal("348")),
+                (hoy, "Mouse", "dolares", 1, Decimal("10"), Decimal("11.60")),
+            ],
+        )
+
+    def test_reconstruir_da_lo_mismo(self):
+        incremental = self.acumulado()
+        VentaDiaria.objects.update(cantidad=0)
+        call_command("reconstruir_ventas_diarias", "--todo", stdout=StringIO())
+        self.assertEqual(self.acumulado(), incremental)
+
+    def test_borrado_en_segundo_plano_descuenta(self):
+        ana = Cliente.objects.create(
+            nombre="Ana", apellido="Gómez", correo="ana@example.com", ci="V1"
+        )
+        self.crear_producto("Teclado", ["T-1", "T-2"], Decimal("11.60"))
+        self.crear_factura([{"nombre": "Teclado", "seriales": ["T-1"]}], "dolares")
+        self.crear_factura(
+            [{"nombre": "Teclado", "seriales": ["T-2"]}], "dolares", "Ana Gómez"
+        )
+
+        def estadisticas():
+            return sorted(
+                EstadisticasCliente.objects.values_list(
+                    "cliente_id",
+                    "cantidad_facturas",
+                    "total_dolares",
+                    "total_bolivares",
+                    "ultima_compra",
+                )
+            )
+
+        self.assertEqual(
+            self.client.delete(f"/api/borrar_cliente/{self.cliente.id}/").status_code,
+            202,
+        )
+        procesar_borrados(tamano_lote=1)
+        self.assertEqual(
+            self.acumulado(),
+            [
+                (
+                    timezone.localdate(),
+                    "Teclado",
+                    "dolares",
+                    1,
+                    Decimal("10"),
+                    Decimal("11.60"),
+                )
+            ],
+        )
+        incremental = estadisticas()
+        self.assertEqual(incremental[0][:2], (ana.id, 1))
+        EstadisticasCliente.objects.reconstruir()
+        self.assertEqual(estadisticas(), incremental)
+
+        # Facturas borradas de un cliente que sigue existiendo.
+        EstadisticasCliente.objects.descontar_facturas(
+            Factura.objects.filter(cliente=ana).values_list("id", flat=True)
+        )
+        self.assertEqual(
+            estadisticas(), [(ana.id, 0, Decimal("0"), Decimal("0"), None)]
+        )
+
+    def test_reportes_desde_el_acumulado(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/ventas_por_dia/", {"dias": 7})
+        self.assertEqual(len(response.data["ventas"]), 1)
+        self.assertEqual(response.data["ventas"][0]["cantidad"], 4)
+        self.assertEqual(response.data["ventas"][0]["total"], Decimal("359.60"))
+
+        response = self.client.get("/api/ventas_por_producto/", {"desde": "2024-01-01"})
+        self.assertEqual(
+            [(p["nombre"], p["cantidad"]) for p in response.data["productos"]],
+            [("Laptop HP", 3), ("Mouse", 2)],
+        )
+        self.assertEqual(
+            self.client.get("/api/ventas_por_dia/", {"dias": 0}).status_code, 400
+        )
+
+
+class TestFacturasCliente(FacturaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_producto("Mouse", ["M-1"], Decimal("11.60"))
+        self.crear_factura([{"nombre": "Laptop HP", "seriales": ["SN-1"]}], "dolares")
+        self.crear_factura([{"nombre": "Mouse", "seriales": ["M-1"]}], "dolares")
+        self.client.post(
+            "/api/sincronizar_facturas/",
+            {
+                "facturas": [
+                    {
+                        "cliente_id": self.cliente.id,
+                        "metodo_pago": "efectivo",
+                        "fecha": "2024-03-01",
+                        "productos": [{"nombre": "Laptop HP", "seriales": ["SN-2"]}],
+                    }
+                ]
+            },
+            format="json",
+        )
+
+    def estadisticas(self):
+        return EstadisticasCliente.objects.values_list(
+            "cliente_id",
+            "cantidad_facturas",
+            "total_dolares",
+            "total_bolivares",
+            "ultima_compra",
+        ).get()
+
+    def test_estadisticas_al_vender(self):
+        self.assertEqual(
+            self.estadisticas(),
+            (
+                self.cliente.id,
+                3,
+                Decimal("127.60"),
+                Decimal("1160"),
+                timezone.localdate(),
+            ),
+        )
+        incremental = self.estadisticas()
+        call_command("reconstruir_estadisticas_clientes", stdout=StringIO())
+        self.assertEqual(self.estadisticas(), incremental)
+
+    def test_historial_paginado(self):
+        url = f"/api/cliente/{self.cliente.id}/facturas/"
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {"limit": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["cliente"]["cantidad_facturas"], 3)
+        self.assertEqual(len(response.data["facturas"]), 2)
+        siguiente = self.client.get(
+            url, {"limit": 2, "cursor": response.data["siguiente_cursor"]}
+        )
+        self.assertEqual(
+            [f["fecha"] for f in siguiente.data["facturas"]], [date(2024, 3, 1)]
+        )
+        self.assertIsNone(siguiente.data["siguiente_cursor"])
+        self.assertEqual(self.client.get("/api/cliente/999/facturas/").status_code, 404)
+
+
+class TestExportarFacturas(FacturaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_factura([{"nombre": "Laptop HP", "seriales": ["SN-1", "SN-2"]}])
+        self.crear_factura([{"nombre": "Laptop HP", "seriales": ["SN-3"]}], "dolares")
+        self.hoy = timezone.localdate().isoformat()
+
+    def exportar(self, **parametros):
+        response = self.client.get("/api/exportar_facturas/", parametros)
+        self.assertTrue(response.streaming)
+        contenido = b"".join(response.streaming_content).decode()
+        return list(csv.reader(StringIO(contenido)))
+
+    def test_facturas_y_detalles(self):
+        filas = self.exportar(desde=self.hoy, hasta=self.hoy)
+        self.assertEqual(filas[0][:3], ["id", "fecha", "cliente_id"])
+        self.assertEqual([f[3] for f in filas[1:]], ["Juan Pérez", "Juan Pérez"])
+        self.assertEqual([f[5] for f in filas[1:]], ["banco", "dolares"])
+
+        filas = self.exportar(tipo="detalles")
+        self.assertEqual(filas[1][4:6], ["Laptop HP", "2"])
+        self.assertEqual(filas[1][-1], "SN-1;SN-2")
+        self.assertEqual(len(filas), 3)
+
+        self.assertEqual(len(self.exportar(desde="2020-01-01", hasta="2020-01-31")), 1)
+        response = self.client.get("/api/exportar_facturas/", {"tipo": "otro"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_comando(self):
+        salida = StringIO()
+        call_command(
+            "exportar_facturas", "--desde", self.hoy, "--hasta", self.hoy, stdout=salida
+        )
+        filas = list(csv.reader(StringIO(salida.getvalue())))
+        self.assertEqual(len(filas), 3)
+        self.assertEqual(filas[0][:3], ["id", "fecha", "cliente_id"])
+
+
+class TestSerialesVendidos(FacturaTestCase):
+    def test_registrados_al_vender_y_consultables(self):
+        response = self.crear_factura(
+            [{"nombre": "Laptop HP", "seriales": ["SN-1", "SN-2"]}]
+        )
+        factura_id = response.data["factura_creada"]["id"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                "/api/seriales_vendidos/", {"seriales": "SN-2, NO-EXISTE,SN-1"}
+            )
+        self.assertEqual(
+            [v["serial"] for v in response.data["vendidos"]], ["SN-2", "SN-1"]
+        )
+        vendido = response.data["vendidos"][0]
+        self.assertEqual(vendido["factura_id"], factura_id)
+        self.assertEqual(vendido["cliente"], "Juan Pérez")
+        self.assertEqual(vendido["producto"], "Laptop HP")
+        self.assertEqual(response.data["no_encontrados"], ["NO-EXISTE"])
+        self.assertEqual(self.client.get("/api/seriales_vendidos/").status_code, 400)
+
+    def test_comando_de_carga_inicial(self):
+        self.crear_factura([{"nombre": "Laptop HP", "seriales": ["SN-1", "SN-2"]}])
+        SerialVendido.objects.filter(numero_serial="SN-2").delete()
+        call_command("registrar_seriales_vendidos", stdout=StringIO())
+        call_command("registrar_seriales_vendidos", stdout=StringIO())
+        self.assertEqual(
+            sorted(SerialVendido.objects.values_list("numero_serial", flat=True)),
+            ["SN-1", "SN-2"],
+        )
+
+
+class TestDevolverSeriales(FacturaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_factura([{"nombre": "Laptop HP", "seriales": ["SN-1", "SN-2"]}])
+
+    def devolver(self, seriales, reintegrar=True):
+        return self.client.post(
+            "/api/devolver_seriales/",
+            {"seriales": seriales, "reintegrar": reintegrar},
+            format="json",
+        )
+
+    def test_reintegra_en_bloque(self):
+        # Un número fijo de sentencias (con los savepoints de cada paso):
+        # bloqueo, estado, marca de las ventas, resta de los acumulados y stock.
+        with self.assertNumQueries(20):
+            response = self.devolver(["SN-1", "SN-2", "SN-3"])
+        self.assertEqual(response.data["devueltos"], ["SN-1", "SN-2"])
+        self.assertEqual(response.data["rechazados"][0]["serial"], "SN-3")
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.cantidad_en_stock, 3)
+        self.assertEqual(Item.objects.en_stock().count(), 3)
+        self.assertFalse(SerialVendido.objects.filter(devuelto_en=None).exists())
+
+        # Se puede volver a vender; la garantía responde la venta nueva.
+        response = self.crear_factura([{"nombre": "Laptop HP", "seriales": ["SN-1"]}])
+        self.assertEqual(response.status_code, 201)
+        (venta,) = self.client.get(
+            "/api/seriales_vendidos/", {"seriales": "SN-1"}
+        ).data["vendidos"]
+        self.assertEqual(
+            (venta["factura_id"], venta["devuelto_en"]),
+            (response.data["factura_creada"]["id"], None),
+        )
+        self.assertEqual(SerialVendido.objects.filter(numero_serial="SN-1").count(), 2)
+
+    def test_devuelto_sin_reintegrar(self):
+        response = self.devolver(["SN-1"], reintegrar=False)
+        self.assertEqual(response.data["estado"], Item.DEVUELTO)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.cantidad_en_stock, 1)
+        response = self.crear_factura([{"nombre": "Laptop HP", "seriales": ["SN-1"]}])
+        self.assertEqual(response.status_code, 400)
+
+        # La garantía sigue ubicando la factura que vendió el serial.
+        response = self.client.get("/api/seriales_vendidos/", {"seriales": "SN-1"})
+        self.assertEqual(response.status_code, 200)
+        (venta,) = response.data["vendidos"]
+        self.assertEqual(venta["serial"], "SN-1")
+        self.assertIsNotNone(venta["devuelto_en"])
+        # Reintegrarlo después no lo vuelve a descontar.
+        self.devolver(["SN-1"])
+        self.assertEqual(VentaDiaria.objects.get().cantidad, 1)
+
+    def test_descuenta_de_los_acumulados(self):
+        def acumulados():
+            return (
+                list(VentaDiaria.objects.values_list("cantidad", "subtotal", "total")),
+                list(
+                    EstadisticasCliente.objects.values_list(
+                        "cantidad_facturas", "total_bolivares"
+                    )
+                ),
+            )
+
+        self.devolver(["SN-1"])
+        incremental = acumulados()
+        self.assertEqual(
+            incremental,
+            (
+                [(1, Decimal("1000"), Decimal("1160"))],
+                [(1, Decimal("1160"))],
+            ),
+        )
+        VentaDiaria.objects.reconstruir(date(2000, 1, 1), timezone.localdate())
+        EstadisticasCliente.objects.reconstruir()
+        self.assertEqual(acumulados(), incremental)
+
+        self.devolver(["SN-2"])
+        self.assertEqual(acumulados(), ([], [(1, Decimal("0"))]))
+
+
+@skipUnless(
+    connection.vendor == "postgresql",
+    "SQLite no admite escrituras concurrentes de varios hilos",
+)
+class TestStockConcurrente(TransactionTestCase):
+    ALTAS = 200
+    VENTAS = 100
+
+    def setUp(self):
+        refresco = patch("productos.precio_dolar._refrescar_en_segundo_plano")
+        refresco.start()
+        self.addCleanup(refresco.stop)
+        self.user = User.objects.create_user(username="cajero", password="clave123")
+        Cliente.objects.create(
+            nombre="Juan",
+            apellido="Pérez",
+            correo="juan@example.com",
+            direccion="Caracas",
+            telefono="04141234567",
+        )
+        categoria = Categoria.objects.create(nombre="Laptops", descripcion="")
+        self.producto = Producto.objects.create(
+            nombre="Laptop HP",
+            descripcion="",
+            precio_dolares=Decimal("100"),
+            cantidad_en_stock=self.VENTAS,
+            categoria=categoria,
+        )
+        Item.objects.bulk_create(
+            Item(producto=self.producto, numero_serial=f"V-{i}")
+            for i in range(self.VENTAS)
+        )
+
+    def peticion(self, metodo, url, datos):
+        try:
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            return getattr(client, metodo)(url, datos, format="json").status_code
+        finally:
+            connection.close()
+
+    def test_altas_y_ventas_en_paralelo(self):
+        peticiones = [
+            (
+                "post",
+                "/api/crear_item/",
+                {"producto": "Laptop HP", "numero_serial": f"A-{i}"},
+            )
+            for i in range(self.ALTAS)
+        ] + [
+            (
+                "post",
+                "/api/crear_factura/",
+                {
+                    "cliente": "Juan Pérez",
+                    "metodo_pago": "dolares",
+                    "productos": [{"nombre": "Laptop HP", "seriales": [f"V-{i}"]}],
+                },
+            )
+            for i in range(self.VENTAS)
+        ]
+        with ThreadPoolExecutor(max_workers=32) as ejecutor:
+            estados = list(ejecutor.map(lambda p: self.peticion(*p), peticiones))
+
+        self.assertEqual(estados.count(201), self.ALTAS + self.VENTAS)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.cantidad_en_stock, self.ALTAS)
+        self.assertEqual(
+            Item.objects.filter(producto=self.producto).count(), self.ALTAS
+        )
@@ -4,53 +4,216 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.core.exceptions import ValidationError
-from django.db import transaction
-from .models import Factura, DetalleFactura
-from productos.models import Producto, Item
-from clientes.models import Cliente
-from .serializers import FacturaSerializer, DetalleFacturaSerializer
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from .models import (
+    Factura,
+    DetalleFactura,
+    EstadisticasCliente,
+    SerialVendido,
+    VentaDiaria,
+    sumas_devueltas_por_cliente,
+    sumas_devueltas_por_dia,
+    total_con_iva,
+)
+from productos.models import Producto, Item, Reserva, referencia_producto
+from productos.precio_dolar import obtener_tasa_cambio, precios_en_lectura
+from productos.reservas import reservas_activas
+from clientes.models import Cliente, normalizar_nombre, referencia_cliente
+from .serializers import (
+    FacturaSerializer,
+    FacturaListaSerializer,
+    DetalleFacturaSerializer,
+)
+from .cache_facturas import cachear_factura, obtener_factura
+from .exportacion import TIPOS_EXPORTACION, exportar
+from sistema_negocio_api.paginacion import (
+    ParametroInvalido,
+    leer_parametro,
+    paginar_por_cursor,
+    respuesta_paginada,
+)
+from datetime import date, timedelta
 from decimal import Decimal
 
+MODOS_BLOQUEO = {
+    "espera": {},
+    "nowait": {"nowait": True},
+    "skip_locked": {"skip_locked": True},
+}
+CODIGO_DEADLOCK = "40P01"  # PostgreSQL
+
 
 class CrearFactura(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
 
-    def calcular_precio_unitario(self, producto, metodo_pago):
+    def calcular_precio_unitario(self, producto, metodo_pago, tasa=None):
         if metodo_pago == "dolares":
             return producto.precio_dolares / Decimal(1.16)
+        if tasa is not None:
+            return producto.precio_dolares * tasa / Decimal(1.16)
         return producto.precio_bolivares / Decimal(1.16)
 
-    def dividir_nombre_completo(self, nombre_completo):
-        partes_nombre = nombre_completo.strip().split()
+    def resolver_cliente(self, referencia):
+        """
+        Ubica al cliente de la factura por id o ci (índices únicos) o por
+        nombre completo sobre el índice de lower(nombre), lower(apellido).
+        Lanza Cliente.DoesNotExist o Cliente.MultipleObjectsReturned.
+        """
+        campo, valor = referencia
+        if campo == "id":
+            try:
+                return Cliente.objects.get(id=int(valor))
+            except (TypeError, ValueError):
+                raise Cliente.DoesNotExist
+        if campo == "ci":
+            return Cliente.objects.get(ci=valor)
+        return Cliente.objects.por_nombre_completo(valor).get()
+
+    def bloquear_seriales(self, seriales, modo=None):
+        """
+        Bloquea las filas Item de los seriales (SELECT ... FOR UPDATE) en orden
+        de id, para que ventas concurrentes siempre bloqueen en el mismo orden.
+        Retorna {numero_serial: producto_id}. El modo se configura con
+        FACTURA_BLOQUEO_SERIALES: "espera", "nowait" o "skip_locked".
+        """
+        modo = modo or getattr(settings, "FACTURA_BLOQUEO_SERIALES", "nowait")
+        return dict(
+            Item.objects.select_for_update(**MODOS_BLOQUEO[modo])
+            .en_stock()
+            .filter(numero_serial__in=seriales)
+            .order_by("id")
+            .values_list("numero_serial", "producto_id")
+        )
+
+    def referencias_productos(self, productos_data):
+        """
+        Retorna la referencia ``(campo, valor)`` del producto de cada línea
+        (indicado por id, sku o nombre).
+        """
+        referencias = []
+        for producto_data in productos_data:
+            referencia = referencia_producto(producto_data)
+            if referencia is None:
+                raise Producto.DoesNotExist
+            ((campo, valor),) = referencia.items()
+            if campo == "id":
+                try:
+                    valor = int(valor)
+                except (TypeError, ValueError):
+                    raise Producto.DoesNotExist
+            referencias.append((campo, valor))
+        return referencias
+
+    def buscar_productos(self, referencias):
+        """Busca en una sola consulta: {(campo, valor): producto}."""
+        valores = {"id": set(), "sku": set(), "nombre": set()}
+        for campo, valor in referencias:
+            valores[campo].add(valor)
 
-        if len(partes_nombre) == 0:
-            raise ValueError("El nombre no puede estar vacío")
+        filtro = Q()
+        for campo, conjunto in valores.items():
+            if conjunto:
+                filtro |= Q(**{f"{campo}__in": conjunto})
+        if not filtro:
+            return {}
 
-        if len(partes_nombre) == 1:
-            return partes_nombre[0], ""
+        encontrados = {}
+        for producto in Producto.objects.filter(filtro):
+            for campo in valores:
+                encontrados[(campo, getattr(producto, campo))] = producto
+        return encontrados
 
-        if len(partes_nombre) == 2:
-            return partes_nombre[0], partes_nombre[1]
+    def resolver_productos(self, productos_data):
+        """
+        Retorna el producto de cada línea buscándolos todos en una sola
+        consulta.
+        """
+        referencias = self.referencias_productos(productos_data)
+        encontrados = self.buscar_productos(referencias)
+        try:
+            return [encontrados[referencia] for referencia in referencias]
+        except KeyError:
+            raise Producto.DoesNotExist
 
-        if len(partes_nombre) >= 3:
-            nombre = partes_nombre[0]
-            apellido = " ".join(partes_nombre[1:])
-            return nombre, apellido
+    def acumular_ventas(self, facturas_y_detalles):
+        """Suma las líneas vendidas al acumulado diario (VentaDiaria)."""
+        lineas = {}
+        for factura, detalles in facturas_y_detalles:
+            for detalle in detalles:
+                clave = (factura.fecha, detalle.producto_id, factura.metodo_pago)
+                cantidad, subtotal, total = lineas.get(clave, (0, 0, 0))
+                lineas[clave] = (
+                    cantidad + detalle.cantidad,
+                    subtotal + detalle.total_producto,
+                    total + total_con_iva(detalle.total_producto),
+                )
+        VentaDiaria.objects.acumular(lineas)
+
+    def acumular_clientes(self, facturas):
+        """Suma las facturas a las estadísticas de sus clientes."""
+        por_cliente = {}
+        for factura in facturas:
+            cantidad, dolares, bolivares, ultima = por_cliente.get(
+                factura.cliente_id, (0, 0, 0, factura.fecha)
+            )
+            if factura.metodo_pago == "dolares":
+                dolares += factura.total
+            else:
+                bolivares += factura.total
+            por_cliente[factura.cliente_id] = (
+                cantidad + 1,
+                dolares,
+                bolivares,
+                max(ultima, factura.fecha),
+            )
+        EstadisticasCliente.objects.acumular(por_cliente)
+
+    def marcar_vendidos(self, detalles):
+        """
+        Marca como vendidos los items de ``detalles`` con un solo UPDATE,
+        enlazando cada uno con su línea de factura, y borra sus reservas.
+        """
+        seriales = [serial for detalle in detalles for serial in detalle.seriales]
+        Reserva.objects.filter(item__numero_serial__in=seriales).delete()
+        Item.objects.filter(numero_serial__in=seriales).update(
+            estado=Item.VENDIDO,
+            detalle_id=Case(
+                *[
+                    When(numero_serial__in=detalle.seriales, then=Value(detalle.id))
+                    for detalle in detalles
+                ],
+                output_field=IntegerField(),
+            ),
+        )
+
+    def registrar_seriales_vendidos(self, detalles):
+        """Un solo INSERT con los seriales de las líneas vendidas."""
+        SerialVendido.objects.bulk_create(
+            SerialVendido(
+                numero_serial=serial, detalle=detalle, factura_id=detalle.factura_id
+            )
+            for detalle in detalles
+            for serial in detalle.seriales
+        )
 
-    @transaction.atomic
     def post(self, request):
         METODOS_PAGO_VALIDOS = ["dolares", "otro", "banco", "pos", "efectivo"]
 
         try:
             data = request.data
-            cliente_nombre = data.get("cliente")
+            referencia_del_cliente = referencia_cliente(data)
             metodo_pago = data.get("metodo_pago")
             productos_data = data.get("productos", [])
+            reserva = data.get("reserva")
 
-            if not cliente_nombre:
+            if referencia_del_cliente is None:
                 return Response(
-                    {"mensaje_de_error": "Se requiere el nombre del cliente"},
+                    {"mensaje_de_error": "Se requiere el cliente (id, ci o nombre)"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
@@ -67,117 +230,171 @@ class CrearFactura(APIView):
                 )
 
             try:
-                nombre, apellido = self.dividir_nombre_completo(cliente_nombre)
-                cliente = Cliente.objects.get(
-                    nombre__iexact=nombre, apellido__iexact=apellido
-                )
+                cliente = self.resolver_cliente(referencia_del_cliente)
             except Cliente.DoesNotExist:
                 return Response(
                     {"mensaje_de_error": "El cliente no existe"},
                     status=status.HTTP_404_NOT_FOUND,
                 )
+            except Cliente.MultipleObjectsReturned:
+                return Response(
+                    {
+                        "mensaje_de_error": "Hay varios clientes con ese nombre, "
+                        "indique el id o la ci"
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
-            productos = []
-            productos_a_actualizar = []
-            subtotal = 0
-            cantidad_total = 0
+            tasa_cambio = obtener_tasa_cambio(esperar=False)
+            tasa = None
+            if precios_en_lectura() and metodo_pago != "dolares":
+                if tasa_cambio is None:
+                    return Response(
+                        {"mensaje_de_error": "No hay una tasa de cambio disponible"},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    )
+                tasa = tasa_cambio["tasa"]
 
             try:
-                for producto_data in productos_data:
-                    producto_nombre = producto_data.get("nombre")
-                    seriales = producto_data.get("seriales", [])
+                productos = self.resolver_productos(productos_data)
+            except Producto.DoesNotExist:
+                return Response(
+                    {"mensaje_de_error": "el (o los) producto(s) no existe(n)"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+
+            # La validación previa queda fuera de la transacción: solo el
+            # bloqueo de seriales y las escrituras mantienen filas bloqueadas.
+            with transaction.atomic():
+                # Todos los seriales de la factura se validan con una sola consulta.
+                seriales_por_linea = [
+                    producto_data.get("seriales", [])
+                    for producto_data in productos_data
+                ]
+                todos_los_seriales = [
+                    s for seriales in seriales_por_linea for s in seriales
+                ]
+                producto_de_serial = self.bloquear_seriales(todos_los_seriales)
+                repetidos = len(todos_los_seriales) != len(set(todos_los_seriales))
 
-                    producto = Producto.objects.get(nombre=producto_nombre)
-                    items = Item.objects.filter(
-                        numero_serial__in=seriales, producto=producto
+                # Los seriales apartados por otra caja no se pueden vender; las
+                # reservas de esta sesión se borran en cascada con los items.
+                reservados_por_otra = [
+                    serial
+                    for serial, sesion in reservas_activas(todos_los_seriales).items()
+                    if sesion != reserva
+                ]
+                if reservados_por_otra:
+                    return Response(
+                        {
+                            "mensaje_de_error": "Algunos seriales están reservados por otra caja",
+                            "conflicto": "reservado",
+                            "seriales": reservados_por_otra,
+                        },
+                        status=status.HTTP_409_CONFLICT,
                     )
 
-                    if items.count() < len(seriales):
+                lineas = []
+                cantidades_vendidas = {}
+                subtotal = 0
+
+                for producto, seriales in zip(productos, seriales_por_linea):
+                    if repetidos or any(
+                        producto_de_serial.get(serial) != producto.id
+                        for serial in seriales
+                    ):
+                        faltantes = [
+                            s for s in todos_los_seriales if s not in producto_de_serial
+                        ]
+                        # Con skip_locked los seriales bloqueados por otra venta no
+                        # se devuelven: existen, pero no están disponibles.
+                        if (
+                            faltantes
+                            and Item.objects.en_stock()
+                            .filter(numero_serial__in=faltantes)
+                            .exists()
+                        ):
+                            return Response(
+                                {
+                                    "mensaje_de_error": "Algunos seriales están siendo vendidos en otra factura",
+                                    "conflicto": "bloqueo",
+                                },
+                                status=status.HTTP_409_CONFLICT,
+                            )
                         return Response(
                             {
-                                "mensaje_de_error": f"Algunos seriales no son válidos o no están asociados al producto {producto_nombre}"
+                                "mensaje_de_error": f"Algunos seriales no son válidos o no están asociados al producto {producto.nombre}"
                             },
                             status=status.HTTP_400_BAD_REQUEST,
                         )
 
                     cantidad = len(seriales)
-
-                    if producto.cantidad_en_stock < cantidad:
+                    cantidades_vendidas[producto.id] = (
+                        cantidades_vendidas.get(producto.id, 0) + cantidad
+                    )
+                    if producto.cantidad_en_stock < cantidades_vendidas[producto.id]:
                         return Response(
                             {
-                                "mensaje_de_error": f"Stock insuficiente para el producto {producto_nombre}"
+                                "mensaje_de_error": f"Stock insuficiente para el producto {producto.nombre}"
                             },
                             status=status.HTTP_400_BAD_REQUEST,
                         )
 
                     precio_unitario = self.calcular_precio_unitario(
-                        producto, metodo_pago
+                        producto, metodo_pago, tasa
                     )
                     total_producto = precio_unitario * cantidad
-
-                    productos.append(
-                        {
-                            "producto": producto.id,
-                            "cantidad": cantidad,
-                            "precio_unitario": precio_unitario,
-                            "total_producto": total_producto,
-                            "seriales": seriales,
-                        }
-                    )
-
                     subtotal += total_producto
-                    cantidad_total += cantidad
+                    lineas.append(
+                        (producto, cantidad, precio_unitario, total_producto, seriales)
+                    )
 
-                    producto.cantidad_en_stock -= cantidad
-                    productos_a_actualizar.append(producto)
+                impuesto = subtotal * Decimal(0.16)
+                total = subtotal + impuesto
 
-            except Producto.DoesNotExist:
-                return Response(
-                    {"mensaje_de_error": "el (o los) producto(s) no existe(n)"},
-                    status=status.HTTP_404_NOT_FOUND,
+                factura = Factura.objects.create(
+                    cliente=cliente,
+                    metodo_pago=metodo_pago,
+                    subtotal=round(subtotal, 2),
+                    total=round(total, 2),
+                    # Solo la tasa con la que se calcularon las líneas; sin
+                    # PRECIOS_BS_EN_LECTURA salen de precio_bolivares, que la
+                    # última actualización pudo calcular con otra tasa.
+                    tasa_cambio_id=tasa_cambio["id"] if tasa is not None else None,
                 )
 
-            impuesto = subtotal * Decimal(0.16)
-            total = subtotal + impuesto
-            print(total)
-
-            factura_data = {
-                "cliente": cliente.id,
-                "metodo_pago": metodo_pago,
-                "subtotal": round(subtotal, 2),
-                "total": round(total, 2),
-            }
-
-            serializer = FacturaSerializer(data=factura_data)
-            if serializer.is_valid():
-                factura = serializer.save()
-            else:
-                raise ValidationError(serializer.errors)
-
-            detalles_factura = []
-            for producto_data in productos:
-                detalle_factura_data = {
-                    "factura": factura.id,
-                    "producto": producto_data["producto"],
-                    "cantidad": producto_data["cantidad"],
-                    "precio_unitario": round(producto_data["precio_unitario"], 2),
-                    "total_producto": round(producto_data["total_producto"], 2),
-                    "seriales": producto_data["seriales"],
-                }
-
-                detalle_serializer = DetalleFacturaSerializer(data=detalle_factura_data)
-                if detalle_serializer.is_valid():
-                    detalle_factura = detalle_serializer.save()
-                    detalles_factura.append(detalle_factura)
-                else:
-                    raise ValidationError(detalle_serializer.errors)
+                detalles_factura = DetalleFactura.objects.bulk_create(
+                    [
+                        DetalleFactura(
+                            factura=factura,
+                            producto=producto,
+                            cantidad=cantidad,
+                            precio_unitario=round(precio_unitario, 2),
+                            total_producto=round(total_producto, 2),
+                            seriales=seriales,
+                        )
+                        for producto, cantidad, precio_unitario, total_producto, seriales in lineas
+                    ]
+                )
 
-            Producto.objects.bulk_update(productos_a_actualizar, ["cantidad_en_stock"])
+                # El stock se descuenta en la BD solo si alcanza (otra venta
+                # concurrente pudo haberlo consumido después de la validación).
+                if not Producto.objects.descontar_stock(cantidades_vendidas):
+                    transaction.set_rollback(True)
+                    return Response(
+                        {
+                            "mensaje_de_error": "Stock insuficiente para completar la venta",
+                            "conflicto": "stock",
+                        },
+                        status=status.HTTP_409_CONFLICT,
+                    )
 
-            for producto_data in productos_data:
-                seriales = producto_data.get("seriales", [])
-                items = Item.objects.filter(numero_serial__in=seriales)
-                items.delete()
+                self.acumular_ventas([(factura, detalles_factura)])
+                self.acumular_clientes([factura])
+                self.registrar_seriales_vendidos(detalles_factura)
+                self.marcar_vendidos(detalles_factura)
+                # La representación para VerFactura queda lista para reimprimir.
+                transaction.on_commit(lambda: cachear_factura(factura.id), robust=True)
 
             detalles_factura_serializados = DetalleFacturaSerializer(
                 detalles_factura, many=True
@@ -193,22 +410,490 @@ class CrearFactura(APIView):
 
         except ValidationError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except OperationalError as e:
+            # nowait: otra venta tiene bloqueados los seriales; o deadlock.
+            deadlock = getattr(e.__cause__, "pgcode", None) == CODIGO_DEADLOCK
+            return Response(
+                {
+                    "mensaje_de_error": "La venta entró en conflicto con otra, intente de nuevo",
+                    "conflicto": "deadlock" if deadlock else "bloqueo",
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+        except Exception as e:
+            return Response(
+                {"mensaje_de_error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class SincronizarFacturas(CrearFactura):
+    """
+    Recibe en un solo lote las ventas que una caja registró sin conexión:
+    ``{"facturas": [{"referencia", "cliente_id" | "ci" | "cliente",
+    "metodo_pago", "productos", "fecha" (opcional, AAAA-MM-DD), "reserva"
+    (opcional)}, ...]}``.
+
+    Clientes, productos y seriales de todo el lote se resuelven con un número
+    fijo de consultas y las facturas se escriben con bulk_create. Cada factura
+    se acepta o rechaza por separado: una venta inválida no hace fallar el lote.
+    La ``referencia`` se guarda en la factura: si el lote se reenvía (por
+    ejemplo porque se perdió la respuesta), las ya registradas se responden
+    como ``ya_sincronizada`` con su factura, sin volver a validarlas.
+    """
+
+    METODOS_PAGO_VALIDOS = ["dolares", "otro", "banco", "pos", "efectivo"]
+
+    def rechazo(self, motivo, mensaje):
+        return {"estado": "rechazada", "motivo": motivo, "mensaje_de_error": mensaje}
+
+    def leer_fecha(self, valor):
+        if valor in (None, ""):
+            return None
+        fecha = date.fromisoformat(str(valor))
+        if fecha > timezone.localdate():
+            raise ValueError("La fecha de la venta no puede ser futura")
+        return fecha
+
+    def resolver_clientes(self, referencias):
+        """
+        Busca en una sola consulta los clientes de ``referencias`` (pares
+        ``(campo, valor)`` de referencia_cliente). Retorna
+        {(campo, valor): [clientes]}; por nombre puede haber más de uno.
+        """
+        ids = set()
+        cis = set()
+        filtro = Q()
+        for campo, valor in referencias:
+            if campo == "id":
+                ids.add(valor)
+            elif campo == "ci":
+                cis.add(valor)
+            else:
+                filtro |= Cliente.objects.filtro_nombre_completo(valor)
+        if ids:
+            filtro |= Q(id__in=ids)
+        if cis:
+            filtro |= Q(ci__in=cis)
+        clientes = {}
+        if filtro:
+            for cliente in Cliente.objects.con_nombre_normalizado().filter(filtro):
+                claves = [
+                    ("id", cliente.id),
+                    (
+                        "nombre",
+                        normalizar_nombre(f"{cliente.nombre} {cliente.apellido}"),
+                    ),
+                ]
+                if cliente.ci:
+                    claves.append(("ci", cliente.ci))
+                for clave in claves:
+                    clientes.setdefault(clave, []).append(cliente)
+        return clientes
+
+    def preparar(self, factura_data):
+        """Valida la forma de una factura del lote sin consultar la BD."""
+        if not isinstance(factura_data, dict):
+            raise ValueError("Cada factura debe ser un objeto")
+        referencia = factura_data.get("referencia")
+        if referencia is not None:
+            referencia = str(referencia)
+            if len(referencia) > Factura._meta.get_field("referencia").max_length:
+                raise ValueError("La referencia es demasiado larga")
+        if factura_data.get("metodo_pago") not in self.METODOS_PAGO_VALIDOS:
+            raise ValueError("Método de pago no válido")
+        cliente = referencia_cliente(factura_data)
+        if cliente is None:
+            raise ValueError("Se requiere el cliente (id, ci o nombre)")
+        if cliente[0] == "id":
+            cliente = ("id", int(cliente[1]))
+        productos_data = factura_data.get("productos")
+        if not isinstance(productos_data, list) or not productos_data:
+            raise ValueError("Se requiere al menos un producto")
+        seriales_por_linea = []
+        for producto_data in productos_data:
+            seriales = producto_data.get("seriales", [])
+            if not isinstance(seriales, list) or not seriales:
+                raise ValueError("Cada producto requiere al menos un serial")
+            seriales_por_linea.append([str(serial) for serial in seriales])
+        return {
+            "referencia": referencia,
+            "metodo_pago": factura_data["metodo_pago"],
+            "cliente": cliente,
+            "referencias": self.referencias_productos(productos_data),
+            "seriales": seriales_por_linea,
+            "fecha": self.leer_fecha(factura_data.get("fecha")),
+            "reserva": factura_data.get("reserva"),
+        }
+
+    def post(self, request):
+        try:
+            facturas_data = request.data.get("facturas")
+            if not isinstance(facturas_data, list) or not facturas_data:
+                return Response(
+                    {"mensaje_de_error": "Se requiere una lista de facturas"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            maximo = settings.SINCRONIZACION_MAXIMO_FACTURAS
+            if len(facturas_data) > maximo:
+                return Response(
+                    {"mensaje_de_error": f"El lote admite hasta {maximo} facturas"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            resultados = []
+            pendientes = []
+            for factura_data in facturas_data:
+                referencia = (
+                    factura_data.get("referencia")
+                    if isinstance(factura_data, dict)
+                    else None
+                )
+                resultados.append({"referencia": referencia})
+                try:
+                    pendientes.append((resultados[-1], self.preparar(factura_data)))
+                except Producto.DoesNotExist:
+                    resultados[-1].update(
+                        self.rechazo(
+                            "producto_desconocido", "Referencia de producto inválida"
+                        )
+                    )
+                except (AttributeError, TypeError, ValueError) as e:
+                    resultados[-1].update(self.rechazo("datos_invalidos", str(e)))
+
+            # Facturas ya registradas por un envío anterior del lote.
+            sincronizadas = {
+                referencia: (id, fecha, total)
+                for referencia, id, fecha, total in Factura.objects.filter(
+                    referencia__in={
+                        venta["referencia"]
+                        for _, venta in pendientes
+                        if venta["referencia"] is not None
+                    }
+                ).values_list("referencia", "id", "fecha", "total")
+            }
+            nuevas = []
+            referencias = set()
+            for resultado, venta in pendientes:
+                referencia = venta["referencia"]
+                if referencia in sincronizadas:
+                    id, fecha, total = sincronizadas[referencia]
+                    resultado.update(
+                        {
+                            "estado": "ya_sincronizada",
+                            "factura_id": id,
+                            "fecha": fecha,
+                            "total": total,
+                        }
+                    )
+                elif referencia is not None and referencia in referencias:
+                    resultado.update(
+                        self.rechazo(
+                            "datos_invalidos", "Referencia repetida en el lote"
+                        )
+                    )
+                else:
+                    referencias.add(referencia)
+                    nuevas.append((resultado, venta))
+            pendientes = nuevas
+
+            # Clientes y productos de todo el lote: una consulta para cada uno.
+            clientes = self.resolver_clientes(
+                {venta["cliente"] for _, venta in pendientes}
+            )
+            productos = self.buscar_productos(
+                [r for _, venta in pendientes for r in venta["referencias"]]
+            )
+            tasa_cambio = obtener_tasa_cambio(esperar=False)
+            en_lectura = precios_en_lectura()
+
+            validas = []
+            for resultado, venta in pendientes:
+                candidatos = clientes.get(venta["cliente"], [])
+                if len(candidatos) != 1:
+                    resultado.update(
+                        self.rechazo(
+                            "cliente_desconocido",
+                            "El cliente no existe o su nombre es ambiguo",
+                        )
+                    )
+                elif any(r not in productos for r in venta["referencias"]):
+                    resultado.update(
+                        self.rechazo(
+                            "producto_desconocido",
+                            "el (o los) producto(s) no existe(n)",
+                        )
+                    )
+                elif (
+                    en_lectura and venta["metodo_pago"] != "dolares" and not tasa_cambio
+                ):
+                    resultado.update(
+                        self.rechazo("sin_tasa", "No hay una tasa de cambio disponible")
+                    )
+                else:
+                    venta["cliente"] = candidatos[0]
+                    venta["productos"] = [productos[r] for r in venta["referencias"]]
+                    validas.append((resultado, venta))
+
+            tasa = tasa_cambio["tasa"] if en_lectura and tasa_cambio else None
+            with transaction.atomic():
+                todos_los_seriales = [
+                    serial
+                    for _, venta in validas
+                    for seriales in venta["seriales"]
+                    for serial in seriales
+                ]
+                # skip_locked: un serial bloqueado por otra venta solo rechaza
+                # la factura que lo contiene, no el lote completo.
+                producto_de_serial = self.bloquear_seriales(
+                    todos_los_seriales, modo="skip_locked"
+                )
+                reservas = reservas_activas(todos_los_seriales)
+                # El stock se valida con las filas bloqueadas (en orden de id,
+                # como descontar_stock): otra venta no puede cambiarlo antes
+                # del descuento, que entonces no rechaza el lote completo.
+                stock = dict(
+                    Producto.objects.select_for_update()
+                    .filter(
+                        id__in={
+                            producto.id
+                            for _, venta in validas
+                            for producto in venta["productos"]
+                        }
+                    )
+                    .order_by("id")
+                    .values_list("id", "cantidad_en_stock")
+                )
+                for producto in productos.values():
+                    producto.cantidad_en_stock = stock.get(producto.id, 0)
+
+                vendidos = set()
+                cantidades_vendidas = {}
+                aceptadas = []
+                for resultado, venta in validas:
+                    rechazo = self.validar_venta(
+                        venta,
+                        producto_de_serial,
+                        reservas,
+                        vendidos,
+                        cantidades_vendidas,
+                    )
+                    if rechazo:
+                        resultado.update(rechazo)
+                        continue
+
+                    subtotal = 0
+                    detalles = []
+                    for producto, seriales in zip(
+                        venta["productos"], venta["seriales"]
+                    ):
+                        cantidad = len(seriales)
+                        precio_unitario = self.calcular_precio_unitario(
+                            producto, venta["metodo_pago"], tasa
+                        )
+                        total_producto = precio_unitario * cantidad
+                        subtotal += total_producto
+                        cantidades_vendidas[producto.id] = (
+                            cantidades_vendidas.get(producto.id, 0) + cantidad
+                        )
+                        vendidos.update(seriales)
+                        detalles.append(
+                            DetalleFactura(
+                                producto=producto,
+                                cantidad=cantidad,
+                                precio_unitario=round(precio_unitario, 2),
+                                total_producto=round(total_producto, 2),
+                                seriales=seriales,
+                            )
+                        )
+                    total = subtotal + subtotal * Decimal(0.16)
+                    factura = Factura(
+                        cliente=venta["cliente"],
+                        metodo_pago=venta["metodo_pago"],
+                        subtotal=round(subtotal, 2),
+                        total=round(total, 2),
+                        tasa_cambio_id=(
+                            tasa_cambio["id"]
+                            if tasa is not None and venta["metodo_pago"] != "dolares"
+                            else None
+                        ),
+                        referencia=venta["referencia"],
+                    )
+                    aceptadas.append((resultado, factura, detalles, venta["fecha"]))
+
+                Factura.objects.bulk_create([factura for _, factura, _, _ in aceptadas])
+                for _, factura, detalles, _ in aceptadas:
+                    for detalle in detalles:
+                        detalle.factura = factura
+                DetalleFactura.objects.bulk_create(
+                    [detalle for _, _, detalles, _ in aceptadas for detalle in detalles]
+                )
+
+                # auto_now_add pisa la fecha: las ventas de días anteriores se
+                # corrigen con un UPDATE por fecha distinta.
+                por_fecha = {}
+                for _, factura, _, fecha in aceptadas:
+                    if fecha and fecha != factura.fecha:
+                        por_fecha.setdefault(fecha, []).append(factura.id)
+                        factura.fecha = fecha
+                for fecha, ids in por_fecha.items():
+                    Factura.objects.filter(id__in=ids).update(fecha=fecha)
+
+                if not Producto.objects.descontar_stock(cantidades_vendidas):
+                    transaction.set_rollback(True)
+                    return Response(
+                        {
+                            "mensaje_de_error": "Stock insuficiente para completar el lote, intente de nuevo",
+                            "conflicto": "stock",
+                        },
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                self.acumular_ventas(
+                    [(factura, detalles) for _, factura, detalles, _ in aceptadas]
+                )
+                self.acumular_clientes([factura for _, factura, _, _ in aceptadas])
+                self.registrar_seriales_vendidos(
+                    [detalle for _, _, detalles, _ in aceptadas for detalle in detalles]
+                )
+                self.marcar_vendidos(
+                    [detalle for _, _, detalles, _ in aceptadas for detalle in detalles]
+                )
+
+            for resultado, factura, _, _ in aceptadas:
+                resultado.update(
+                    {
+                        "estado": "aceptada",
+                        "factura_id": factura.id,
+                        "fecha": factura.fecha,
+                        "total": factura.total,
+                    }
+                )
+            ya_sincronizadas = sum(
+                resultado.get("estado") == "ya_sincronizada" for resultado in resultados
+            )
+            return Response(
+                {
+                    "aceptadas": len(aceptadas),
+                    "ya_sincronizadas": ya_sincronizadas,
+                    "rechazadas": len(resultados) - len(aceptadas) - ya_sincronizadas,
+                    "resultados": resultados,
+                },
+                status=status.HTTP_200_OK,
+            )
+
+        except IntegrityError:
+            # Otro envío del mismo lote registró una de las referencias entre
+            # la consulta y el INSERT: al reintentar se responde como
+            # ya sincronizada.
+            return Response(
+                {
+                    "mensaje_de_error": "El lote se está registrando en otro envío, intente de nuevo",
+                    "conflicto": "referencia",
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+        except OperationalError as e:
+            deadlock = getattr(e.__cause__, "pgcode", None) == CODIGO_DEADLOCK
+            return Response(
+                {
+                    "mensaje_de_error": "El lote entró en conflicto con otra venta, intente de nuevo",
+                    "conflicto": "deadlock" if deadlock else "bloqueo",
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
         except Exception as e:
             return Response(
                 {"mensaje_de_error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    def validar_venta(
+        self, venta, producto_de_serial, reservas, vendidos, cantidades_vendidas
+    ):
+        """
+        Revisa seriales y stock de una venta contra lo ya aceptado en el lote.
+        Retorna el rechazo o None si la venta se puede registrar.
+        """
+        seriales = [s for seriales in venta["seriales"] for s in seriales]
+        if len(seriales) != len(set(seriales)) or vendidos.intersection(seriales):
+            return self.rechazo(
+                "conflicto_serial", "Algunos seriales ya fueron vendidos en el lote"
+            )
+        for producto, seriales_linea in zip(venta["productos"], venta["seriales"]):
+            if any(producto_de_serial.get(s) != producto.id for s in seriales_linea):
+                return self.rechazo(
+                    "conflicto_serial",
+                    f"Algunos seriales no están disponibles o no están asociados al producto {producto.nombre}",
+                )
+        if any(reservas.get(s, venta["reserva"]) != venta["reserva"] for s in seriales):
+            return self.rechazo(
+                "conflicto_serial", "Algunos seriales están reservados por otra caja"
+            )
+
+        cantidades = {}
+        for producto, seriales_linea in zip(venta["productos"], venta["seriales"]):
+            cantidades[producto] = cantidades.get(producto, 0) + len(seriales_linea)
+        for producto, cantidad in cantidades.items():
+            vendida = cantidades_vendidas.get(producto.id, 0)
+            if producto.cantidad_en_stock < vendida + cantidad:
+                return self.rechazo(
+                    "stock", f"Stock insuficiente para el producto {producto.nombre}"
+                )
+        return None
+
 
 class VerFacturas(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
 
     def get(self, request):
+        """
+        Listado paginado por cursor, de la más reciente a la más antigua.
+        Filtros: ``desde``/``hasta`` (AAAA-MM-DD), ``cliente`` (id),
+        ``metodo_pago``, ``total_min`` y ``total_max``.
+        """
         try:
-            facturas = Factura.objects.all()
-            serializer = FacturaSerializer(facturas, many=True)
-            return Response({"facturas": serializer.data}, status=status.HTTP_200_OK)
+            facturas = Factura.objects.select_related("cliente").only(
+                "fecha",
+                "metodo_pago",
+                "total",
+                "cliente__nombre",
+                "cliente__apellido",
+            )
+
+            desde = leer_parametro(request, "desde", date.fromisoformat)
+            if desde is not None:
+                facturas = facturas.filter(fecha__gte=desde)
+            hasta = leer_parametro(request, "hasta", date.fromisoformat)
+            if hasta is not None:
+                facturas = facturas.filter(fecha__lte=hasta)
+            cliente = leer_parametro(request, "cliente", int)
+            if cliente is not None:
+                facturas = facturas.filter(cliente_id=cliente)
+            metodo_pago = leer_parametro(request, "metodo_pago")
+            if metodo_pago is not None:
+                facturas = facturas.filter(metodo_pago=metodo_pago)
+            total_min = leer_parametro(request, "total_min", Decimal)
+            if total_min is not None:
+                facturas = facturas.filter(total__gte=total_min)
+            total_max = leer_parametro(request, "total_max", Decimal)
+            if total_max is not None:
+                facturas = facturas.filter(total__lte=total_max)
+
+            facturas, siguiente_cursor, total = paginar_por_cursor(
+                facturas, request, orden=("-fecha", "-id")
+            )
+            serializer = FacturaListaSerializer(facturas, many=True)
+            return Response(
+                respuesta_paginada(
+                    "facturas", serializer.data, siguiente_cursor, total
+                ),
+                status=status.HTTP_200_OK,
+            )
+        except ParametroInvalido as e:
+            return Response(
+                {"mensaje_de_error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {
@@ -219,45 +904,104 @@ class VerFacturas(APIView):
             )
 
 
-class VerFactura(APIView):
+class VerFacturasCliente(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
 
-    def get(self, request, factura_id):
+    def get(self, request, id):
+        """
+        Historial de compras del cliente, paginado por cursor sobre el índice
+        (cliente, fecha, id), con sus estadísticas ya acumuladas.
+        """
         try:
-            factura = Factura.objects.get(id=factura_id)
-            detalles_factura = DetalleFactura.objects.filter(
-                factura=factura
-            )  # Usar filter, no get
-
-            productos_data = []
-            for detalle in detalles_factura:
-                producto = detalle.producto
-                seriales = detalle.seriales
-                productos_data.append(
+            cliente = Cliente.objects.only("nombre", "apellido").get(id=id)
+            estadisticas = (
+                EstadisticasCliente.objects.filter(cliente_id=id)
+                .values(
+                    "cantidad_facturas",
+                    "total_dolares",
+                    "total_bolivares",
+                    "ultima_compra",
+                )
+                .first()
+            ) or {
+                "cantidad_facturas": 0,
+                "total_dolares": Decimal("0.00"),
+                "total_bolivares": Decimal("0.00"),
+                "ultima_compra": None,
+            }
+            facturas = Factura.objects.filter(cliente_id=id).only(
+                "fecha", "metodo_pago", "subtotal", "total", "cliente_id"
+            )
+            desde = leer_parametro(request, "desde", date.fromisoformat)
+            if desde is not None:
+                facturas = facturas.filter(fecha__gte=desde)
+            hasta = leer_parametro(request, "hasta", date.fromisoformat)
+            if hasta is not None:
+                facturas = facturas.filter(fecha__lte=hasta)
+
+            facturas, siguiente_cursor, total = paginar_por_cursor(
+                facturas, request, orden=("-fecha", "-id")
+            )
+            respuesta = respuesta_paginada(
+                "facturas",
+                [
                     {
-                        "nombre": producto.nombre,
-                        "cantidad": detalle.cantidad,  # La cantidad está en DetalleFactura
-                        "precio_unitario": detalle.precio_unitario,  # Calculado
-                        "total_producto": detalle.total_producto,
-                        "seriales": seriales,
+                        "id": factura.id,
+                        "fecha": factura.fecha,
+                        "metodo_pago": factura.metodo_pago,
+                        "subtotal": factura.subtotal,
+                        "total": factura.total,
                     }
-                )
-            iva = factura.subtotal * Decimal(0.16)
-            response_data = {
-                "factura": {
-                    "id": factura.id,
-                    "cliente": f"{factura.cliente.nombre} {factura.cliente.apellido}",
-                    "metodo_pago": factura.metodo_pago,
-                    "subtotal": factura.subtotal,
-                    "IVA": round(iva, 2),
-                    "total": factura.total,
-                    "fecha_creacion": factura.fecha,
-                },
-                "detalles_factura": productos_data,  # Lista de productos con sus detalles
+                    for factura in facturas
+                ],
+                siguiente_cursor,
+                total,
+            )
+            respuesta["cliente"] = {
+                "id": cliente.id,
+                "nombre": f"{cliente.nombre} {cliente.apellido}",
+                **estadisticas,
             }
+            return Response(respuesta, status=status.HTTP_200_OK)
+        except ParametroInvalido as e:
+            return Response(
+                {"mensaje_de_error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except Cliente.DoesNotExist:
+            return Response(
+                {"mensaje_de_error": "El cliente no existe"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception as e:
+            return Response(
+                {
+                    "mensaje_de_error": "No se pudieron obtener las facturas del cliente",
+                    "excepcion": str(e),
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class VerFactura(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
 
-            return Response(response_data, status=status.HTTP_200_OK)
+    def get(self, request, factura_id):
+        try:
+            datos, etag = obtener_factura(factura_id)
+            # If-None-Match puede traer varias etiquetas, o débiles (W/"...").
+            etiquetas = {
+                etiqueta.strip().removeprefix("W/")
+                for etiqueta in request.headers.get("If-None-Match", "").split(",")
+            }
+            if etag in etiquetas or "*" in etiquetas:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = Response(datos, status=status.HTTP_200_OK)
+            response["ETag"] = etag
+            response["Cache-Control"] = "private, no-cache"
+            return response
 
         except Factura.DoesNotExist:
             return Response(
@@ -269,3 +1013,280 @@ class VerFactura(APIView):
                 {"mensaje_de_error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+def leer_periodo(request):
+    """
+    Período de los reportes: ``desde``/``hasta`` (AAAA-MM-DD) o los últimos
+    ``dias`` (30 por defecto) hasta hoy.
+    """
+    hasta = leer_parametro(request, "hasta", date.fromisoformat, timezone.localdate())
+    dias = leer_parametro(request, "dias", int, 30)
+    if dias < 1:
+        raise ParametroInvalido("'dias' debe ser mayor que 0")
+    desde = leer_parametro(
+        request, "desde", date.fromisoformat, hasta - timedelta(days=dias - 1)
+    )
+    return desde, hasta
+
+
+def filtrar_ventas_diarias(request):
+    desde, hasta = leer_periodo(request)
+    ventas = VentaDiaria.objects.filter(fecha__range=(desde, hasta))
+    producto = leer_parametro(request, "producto", int)
+    if producto is not None:
+        ventas = ventas.filter(producto_id=producto)
+    metodo_pago = leer_parametro(request, "metodo_pago")
+    if metodo_pago is not None:
+        ventas = ventas.filter(metodo_pago=metodo_pago)
+    return ventas, desde, hasta
+
+
+class VerVentasPorDia(APIView):
+    """Ventas por día del período, leídas del acumulado VentaDiaria."""
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request):
+        try:
+            ventas, desde, hasta = filtrar_ventas_diarias(request)
+            dias = (
+                ventas.values("fecha")
+                .annotate(
+                    cantidad=Sum("cantidad"),
+                    subtotal=Sum("subtotal"),
+                    total=Sum("total"),
+                )
+                .order_by("fecha")
+            )
+            return Response(
+                {"desde": desde, "hasta": hasta, "ventas": list(dias)},
+                status=status.HTTP_200_OK,
+            )
+        except ParametroInvalido as e:
+            return Response(
+                {"mensaje_de_error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {"mensaje_de_error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class VerVentasPorProducto(APIView):
+    """Productos más vendidos del período (por total), desde VentaDiaria."""
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request):
+        try:
+            ventas, desde, hasta = filtrar_ventas_diarias(request)
+            limite = leer_parametro(request, "limit", int, 50)
+            if limite < 1:
+                raise ParametroInvalido("'limit' debe ser mayor que 0")
+            productos = (
+                ventas.values("producto_id", nombre=F("producto__nombre"))
+                .annotate(
+                    cantidad=Sum("cantidad"),
+                    subtotal=Sum("subtotal"),
+                    total=Sum("total"),
+                )
+                .order_by("-total", "producto_id")[: min(limite, 500)]
+            )
+            return Response(
+                {"desde": desde, "hasta": hasta, "productos": list(productos)},
+                status=status.HTTP_200_OK,
+            )
+        except ParametroInvalido as e:
+            return Response(
+                {"mensaje_de_error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {"mensaje_de_error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class ExportarFacturas(APIView):
+    """
+    Descarga en CSV las facturas (``tipo=facturas``) o sus líneas
+    (``tipo=detalles``) del período, generadas a medida que se envían.
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request):
+        try:
+            tipo = leer_parametro(request, "tipo", por_defecto="facturas")
+            if tipo not in TIPOS_EXPORTACION:
+                raise ParametroInvalido(f"Valor no válido para 'tipo': {tipo}")
+            desde, hasta = leer_periodo(request)
+            response = StreamingHttpResponse(
+                exportar(tipo, desde, hasta), content_type="text/csv; charset=utf-8"
+            )
+            response["Content-Disposition"] = (
+                f'attachment; filename="{tipo}_{desde}_{hasta}.csv"'
+            )
+            return response
+        except ParametroInvalido as e:
+            return Response(
+                {"mensaje_de_error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {"mensaje_de_error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class BuscarSerialesVendidos(APIView):
+    """
+    Garantías: ``?seriales=A,B,C`` responde en qué factura, a qué cliente y
+    cuándo se vendió cada serial (y si se devolvió), con búsquedas por el
+    índice de numero_serial.
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+    MAXIMO_SERIALES = 500
+
+    def get(self, request):
+        try:
+            seriales = list(
+                dict.fromkeys(
+                    serial.strip()
+                    for serial in request.query_params.get("seriales", "").split(",")
+                    if serial.strip()
+                )
+            )
+            if not seriales:
+                raise ParametroInvalido("Se requiere al menos un serial en 'seriales'")
+            if len(seriales) > self.MAXIMO_SERIALES:
+                raise ParametroInvalido(
+                    f"Se admiten hasta {self.MAXIMO_SERIALES} seriales por consulta"
+                )
+
+            # Un serial devuelto y vuelto a vender tiene varias ventas: se
+            # responde la más reciente (la última por id).
+            vendidos = {
+                fila["serial"]: fila
+                for fila in SerialVendido.objects.filter(numero_serial__in=seriales)
+                .order_by("numero_serial", "id")
+                .values(
+                    "factura_id",
+                    "devuelto_en",
+                    serial=F("numero_serial"),
+                    fecha=F("factura__fecha"),
+                    metodo_pago=F("factura__metodo_pago"),
+                    cliente_id=F("factura__cliente_id"),
+                    cliente_nombre=F("factura__cliente__nombre"),
+                    cliente_apellido=F("factura__cliente__apellido"),
+                    producto_id=F("detalle__producto_id"),
+                    producto=F("detalle__producto__nombre"),
+                    precio_unitario=F("detalle__precio_unitario"),
+                )
+            }
+            for venta in vendidos.values():
+                venta["cliente"] = (
+                    f"{venta.pop('cliente_nombre')} {venta.pop('cliente_apellido')}"
+                ).strip()
+            return Response(
+                {
+                    "vendidos": [vendidos[s] for s in seriales if s in vendidos],
+                    "no_encontrados": [s for s in seriales if s not in vendidos],
+                },
+                status=status.HTTP_200_OK,
+            )
+        except ParametroInvalido as e:
+            return Response(
+                {"mensaje_de_error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {"mensaje_de_error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class DevolverSeriales(APIView):
+    """
+    Devoluciones: ``{"seriales": [...], "reintegrar": true}`` vuelve los
+    seriales vendidos a disponibles y suma el stock; con ``reintegrar`` en
+    false quedan como devueltos (fuera de la venta). La venta se marca como
+    devuelta y se resta de VentaDiaria y EstadisticasCliente. Todo en pocas
+    sentencias, sin importar la cantidad de seriales.
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def post(self, request):
+        try:
+            seriales = request.data.get("seriales")
+            if not isinstance(seriales, list) or not seriales:
+                return Response(
+                    {"mensaje_de_error": "Se requiere una lista de seriales"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            seriales = list(dict.fromkeys(str(serial).strip() for serial in seriales))
+            reintegrar = request.data.get("reintegrar", True) in (True, "true", "1", 1)
+            if reintegrar:
+                estado, desde = Item.DISPONIBLE, (Item.VENDIDO, Item.DEVUELTO)
+            else:
+                estado, desde = Item.DEVUELTO, (Item.VENDIDO,)
+
+            with transaction.atomic():
+                items = list(
+                    Item.objects.select_for_update()
+                    .filter(numero_serial__in=seriales, estado__in=desde)
+                    .order_by("id")
+                    .values_list("id", "numero_serial", "producto_id")
+                )
+                Item.objects.filter(id__in=[id for id, _, _ in items]).update(
+                    estado=estado
+                )
+                devueltos = {serial for _, serial, _ in items}
+                # La venta se conserva para la garantía, marcada como devuelta
+                # (así el serial se puede volver a vender), y deja de contar
+                # en los acumulados.
+                ventas = list(
+                    SerialVendido.objects.filter(
+                        numero_serial__in=devueltos, devuelto_en__isnull=True
+                    ).values_list("id", flat=True)
+                )
+                SerialVendido.objects.filter(id__in=ventas).update(
+                    devuelto_en=timezone.now()
+                )
+                ventas = SerialVendido.objects.filter(id__in=ventas)
+                VentaDiaria.objects.descontar(sumas_devueltas_por_dia(ventas))
+                EstadisticasCliente.objects.descontar(
+                    sumas_devueltas_por_cliente(ventas)
+                )
+                if reintegrar:
+                    cantidades = {}
+                    for _, _, producto_id in items:
+                        cantidades[producto_id] = cantidades.get(producto_id, 0) + 1
+                    Producto.objects.reintegrar_stock(cantidades)
+
+            return Response(
+                {
+                    "estado": estado,
+                    "devueltos": [s for s in seriales if s in devueltos],
+                    "rechazados": [
+                        {"serial": s, "motivo": "El serial no está vendido"}
+                        for s in seriales
+                        if s not in devueltos
+                    ],
+                },
+                status=status.HTTP_200_OK,
+            )
+        except Exception as e:
+            return Response(
+                {"mensaje_de_error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
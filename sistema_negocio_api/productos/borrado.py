@@ -0,0 +1,171 @@
+"""
+Borrado en segundo plano de registros con muchos dependientes (una categoría
+con sus productos, seriales y líneas de factura; un cliente con sus facturas).
+
+Al encolar, el registro y sus hijos ocultables se marcan ``borrando`` (los
+managers por defecto los ocultan) y sus campos únicos se liberan, todo en la
+misma petición. La tarea
+periódica recorre después las relaciones en cascada desde las hojas y borra
+en lotes de ``BORRADO_TAMANO_LOTE`` filas, cada lote en su propia
+transacción, guardando el avance en TareaBorrado. Así nunca se cargan en
+memoria todos los dependientes como hace ``Model.delete()``.
+"""
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Value
+from django.db.models.functions import Cast, Concat, Left
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import TareaBorrado
+
+# Se envía antes de borrar cada lote (sender: el modelo, ids: sus pk), dentro
+# de su transacción, para que otras apps descuenten sus acumulados.
+lote_por_borrar = Signal()
+
+
+def _liberar_unicos(modelo):
+    """
+    Valores para los campos únicos de las filas ocultas de ``modelo``: NULL si
+    el campo lo admite, o el valor con " (borrado <id>)" para que el original
+    se pueda volver a usar mientras termina el borrado. Son expresiones, así
+    un solo UPDATE libera todas las filas, cada una con su propio id.
+    """
+    sufijo = len(" (borrado )") + 20
+    cambios = {}
+    for campo in modelo._meta.concrete_fields:
+        if not campo.unique or campo.primary_key:
+            continue
+        if campo.null:
+            cambios[campo.name] = None
+        elif isinstance(campo, models.CharField):
+            cambios[campo.name] = Concat(
+                Left(campo.name, campo.max_length - sufijo),
+                Value(" (borrado "),
+                Cast("pk", models.CharField()),
+                Value(")"),
+                output_field=models.CharField(),
+            )
+    return cambios
+
+
+def _relaciones(modelo):
+    """Relaciones inversas que el borrado tiene que resolver antes del padre."""
+    return [
+        relacion
+        for relacion in modelo._meta.related_objects
+        if relacion.on_delete in (models.CASCADE, models.SET_NULL)
+    ]
+
+
+def encolar_borrado(instancia):
+    """
+    Oculta ``instancia`` (y sus hijos directos que también se ocultan, como
+    los productos de una categoría) y encola su borrado. Retorna la tarea.
+    """
+    modelo = type(instancia)
+    with transaction.atomic():
+        modelo._base_manager.filter(pk=instancia.pk).update(
+            borrando=True, **_liberar_unicos(modelo)
+        )
+        for relacion in _relaciones(modelo):
+            hijo = relacion.related_model
+            if relacion.on_delete is models.CASCADE and any(
+                campo.name == "borrando" for campo in hijo._meta.concrete_fields
+            ):
+                hijo._base_manager.filter(**{relacion.field.name: instancia}).update(
+                    borrando=True, **_liberar_unicos(hijo)
+                )
+        return TareaBorrado.objects.create(
+            modelo=modelo._meta.label,
+            objeto_id=instancia.pk,
+            descripcion=str(getattr(instancia, "nombre", instancia))[:255],
+        )
+
+
+def borrar_por_lotes(queryset, tamano_lote, al_borrar):
+    """
+    Borra las filas de ``queryset`` y todo lo que depende de ellas en lotes
+    de ``tamano_lote``: primero los hijos (recursivamente), luego el lote del
+    padre con ``QuerySet.delete()``, que ya no encuentra dependientes y sigue
+    enviando las señales (por ejemplo la invalidación de facturas en cache).
+    Antes de cada lote se envía ``lote_por_borrar``.
+    ``al_borrar`` recibe el conteo por modelo de cada lote.
+    """
+    modelo = queryset.model
+    while ids := list(
+        queryset.order_by("pk").values_list("pk", flat=True)[:tamano_lote]
+    ):
+        for relacion in _relaciones(modelo):
+            hijos = relacion.related_model._base_manager.filter(
+                **{f"{relacion.field.name}__in": ids}
+            )
+            if relacion.on_delete is models.CASCADE:
+                borrar_por_lotes(hijos, tamano_lote, al_borrar)
+            else:
+                while pks := list(hijos.values_list("pk", flat=True)[:tamano_lote]):
+                    relacion.related_model._base_manager.filter(pk__in=pks).update(
+                        **{relacion.field.name: None}
+                    )
+        with transaction.atomic():
+            lote_por_borrar.send(sender=modelo, ids=ids)
+            _, conteo = modelo._base_manager.filter(pk__in=ids).delete()
+        al_borrar(conteo)
+
+
+def ejecutar_tarea(tarea, tamano_lote=None, al_avanzar=None):
+    """Borra el registro de ``tarea`` guardando el avance después de cada lote."""
+    modelo = apps.get_model(tarea.modelo)
+
+    def al_borrar(conteo):
+        for etiqueta, cantidad in conteo.items():
+            if cantidad:
+                tarea.detalle[etiqueta] = tarea.detalle.get(etiqueta, 0) + cantidad
+                tarea.filas_borradas += cantidad
+        tarea.save(update_fields=["detalle", "filas_borradas"])
+        if al_avanzar is not None:
+            al_avanzar(tarea)
+
+    try:
+        borrar_por_lotes(
+            modelo._base_manager.filter(pk=tarea.objeto_id),
+            tamano_lote or settings.BORRADO_TAMANO_LOTE,
+            al_borrar,
+        )
+        tarea.estado = TareaBorrado.TERMINADA
+    except Exception as e:
+        tarea.estado = TareaBorrado.ERROR
+        tarea.error = str(e)
+    tarea.fecha_fin = timezone.now()
+    tarea.save(update_fields=["estado", "error", "fecha_fin"])
+    return tarea
+
+
+def procesar_borrados(tamano_lote=None, al_avanzar=None):
+    """
+    Ejecuta las tareas pendientes en orden. Cada tarea se toma con un UPDATE
+    condicional, así dos procesos simultáneos no ejecutan la misma.
+    Retorna las tareas ejecutadas.
+    """
+    ejecutadas = []
+    pendientes = TareaBorrado.objects.filter(estado=TareaBorrado.PENDIENTE)
+    for tarea_id in pendientes.order_by("id").values_list("id", flat=True):
+        if not pendientes.filter(id=tarea_id).update(estado=TareaBorrado.EN_PROCESO):
+            continue
+        tarea = TareaBorrado.objects.get(id=tarea_id)
+        ejecutadas.append(ejecutar_tarea(tarea, tamano_lote, al_avanzar))
+    return ejecutadas
+
+
+def borrar_pendientes():
+    """Tarea periódica (CRONJOBS)."""
+    try:
+        for tarea in procesar_borrados():
+            print(
+                f"Borrado {tarea.id} ({tarea.modelo} {tarea.objeto_id}): "
+                f"{tarea.estado}, {tarea.filas_borradas} filas"
+            )
+    except Exception as e:
+        print(f"Error en la función borrar_pendientes: {e}")
@@ -0,0 +1,80 @@
+"""
+Búsqueda de productos por nombre y descripción con ranking.
+
+- PostgreSQL: texto completo (tsvector, índice GIN) más similitud por
+  trigramas sobre el nombre (pg_trgm), ver productos.busqueda_sql.
+- SQLite: tabla FTS5 ``productos_producto_fts`` (ProductoBusqueda) mantenida
+  por triggers.
+- Otros motores: icontains sin ranking.
+"""
+
+import re
+
+from django.db import connection
+from decimal import Decimal
+
+from django.db.models import BooleanField, DecimalField, F, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Round
+
+from .models import Producto
+
+VECTOR_POSTGRES = (
+    "to_tsvector('spanish', coalesce(productos_producto.nombre, '') || ' ' || "
+    "coalesce(productos_producto.descripcion, ''))"
+)
+CONSULTA_POSTGRES = "websearch_to_tsquery('spanish', %s)"
+
+# ``rango`` se redondea en SQL a un decimal fijo: va en el cursor de
+# paginación (JSON) y al volver debe compararse igual con el de la base; un
+# float4/double no sobrevive ese viaje y las páginas saltarían o repetirían
+# filas empatadas.
+DECIMALES_RANGO = 10
+CAMPO_RANGO = DecimalField(max_digits=20, decimal_places=DECIMALES_RANGO)
+
+
+def _consulta_fts5(texto):
+    # Cada palabra entre comillas (sin operadores FTS5) y como prefijo.
+    palabras = re.findall(r"\w+", texto)
+    return " ".join(f'"{palabra}"*' for palabra in palabras)
+
+
+def _buscar_postgres(texto):
+    return Producto.objects.filter(
+        RawSQL(
+            f"({VECTOR_POSTGRES} @@ {CONSULTA_POSTGRES} "
+            "OR productos_producto.nombre %% %s)",
+            [texto, texto],
+            output_field=BooleanField(),
+        )
+    ).annotate(
+        rango=RawSQL(
+            f"round((ts_rank({VECTOR_POSTGRES}, {CONSULTA_POSTGRES}) "
+            "+ similarity(productos_producto.nombre, %s))::numeric, "
+            f"{DECIMALES_RANGO})",
+            [texto, texto],
+            output_field=CAMPO_RANGO,
+        )
+    )
+
+
+def _buscar_sqlite(texto):
+    consulta = _consulta_fts5(texto)
+    if not consulta:
+        return Producto.objects.none()
+    # rank (bm25) es menor mientras más relevante; se invierte para ordenar desc.
+    return Producto.objects.filter(busqueda__texto__match=consulta).annotate(
+        rango=Cast(Round(-F("busqueda__rank"), DECIMALES_RANGO), CAMPO_RANGO)
+    )
+
+
+def buscar_productos(texto):
+    """Queryset de productos que coinciden con ``texto``, anotado con ``rango``."""
+    texto = texto.strip()
+    if connection.vendor == "postgresql":
+        return _buscar_postgres(texto)
+    if connection.vendor == "sqlite":
+        return _buscar_sqlite(texto)
+    return Producto.objects.filter(
+        Q(nombre__icontains=texto) | Q(descripcion__icontains=texto)
+    ).annotate(rango=Value(Decimal(0), output_field=CAMPO_RANGO))
@@ -0,0 +1,64 @@
+"""
+DDL de la búsqueda de productos (ver productos.busqueda), compartido por las
+migraciones.
+
+En SQLite, cualquier migración que reconstruya productos_producto (AddField,
+AlterField, ...) borra los triggers que mantienen la tabla FTS5, y tiene que
+terminar con ``RunPython(ejecutar({"sqlite": SQLITE}))`` para recrearlos.
+Las sentencias son idempotentes.
+"""
+
+# PostgreSQL: índices GIN para texto completo (tsvector) y trigramas (pg_trgm).
+POSTGRES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS productos_producto_busqueda_idx "
+    "ON productos_producto USING GIN ("
+    "to_tsvector('spanish', coalesce(nombre, '') || ' ' || coalesce(descripcion, '')))",
+    "CREATE INDEX IF NOT EXISTS productos_producto_nombre_trgm_idx "
+    "ON productos_producto USING GIN (nombre gin_trgm_ops)",
+]
+POSTGRES_REVERSA = [
+    "DROP INDEX IF EXISTS productos_producto_nombre_trgm_idx",
+    "DROP INDEX IF EXISTS productos_producto_busqueda_idx",
+]
+
+# SQLite: tabla FTS5 sombra de productos_producto, sincronizada con triggers.
+SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS productos_producto_fts USING fts5("
+    "nombre, descripcion, content='productos_producto', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS productos_producto_fts_ai "
+    "AFTER INSERT ON productos_producto BEGIN "
+    "INSERT INTO productos_producto_fts(rowid, nombre, descripcion) "
+    "VALUES (new.id, new.nombre, new.descripcion); END",
+    "CREATE TRIGGER IF NOT EXISTS productos_producto_fts_ad "
+    "AFTER DELETE ON productos_producto BEGIN "
+    "INSERT INTO productos_producto_fts(productos_producto_fts, rowid, nombre, descripcion) "
+    "VALUES ('delete', old.id, old.nombre, old.descripcion); END",
+    "CREATE TRIGGER IF NOT EXISTS productos_producto_fts_au "
+    "AFTER UPDATE OF nombre, descripcion ON productos_producto BEGIN "
+    "INSERT INTO productos_producto_fts(productos_producto_fts, rowid, nombre, descripcion) "
+    "VALUES ('delete', old.id, old.nombre, old.descripcion); "
+    "INSERT INTO productos_producto_fts(rowid, nombre, descripcion) "
+    "VALUES (new.id, new.nombre, new.descripcion); END",
+    "INSERT INTO productos_producto_fts(productos_producto_fts) VALUES ('rebuild')",
+    # El nombre pesa 10 veces más que la descripción en el ranking (columna rank).
+    "INSERT INTO productos_producto_fts(productos_producto_fts, rank) "
+    "VALUES ('rank', 'bm25(10.0, 1.0)')",
+]
+SQLITE_REVERSA = [
+    "DROP TRIGGER IF EXISTS productos_producto_fts_au",
+    "DROP TRIGGER IF EXISTS productos_producto_fts_ad",
+    "DROP TRIGGER IF EXISTS productos_producto_fts_ai",
+    "DROP TABLE IF EXISTS productos_producto_fts",
+]
+
+
+def ejecutar(sentencias_por_motor):
+    """Función para RunPython que ejecuta las sentencias del motor en uso."""
+
+    def ejecutar(apps, schema_editor):
+        for sentencia in sentencias_por_motor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sentencia)
+
+    return ejecutar
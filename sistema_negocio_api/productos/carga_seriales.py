@@ -0,0 +1,110 @@
+import csv
+import io
+from itertools import islice
+
+from django.db import transaction
+
+from facturas_y_reportes.models import SerialVendido
+from .models import Item, Producto
+
+TAMANO_LOTE = 1000
+LONGITUD_MAXIMA = Item._meta.get_field("numero_serial").max_length
+
+
+def leer_seriales_csv(archivo):
+    """
+    Lee un CSV subido (una fila por serial, primera columna) sin cargarlo
+    completo en memoria. La fila de encabezado ``numero_serial`` es opcional.
+    """
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    for numero_fila, fila in enumerate(csv.reader(texto), start=1):
+        if numero_fila == 1 and fila and fila[0].strip() == "numero_serial":
+            continue
+        yield fila[0] if fila else ""
+
+
+def seriales_vendidos(seriales):
+    """
+    Los de ``seriales`` con una venta sin devolver (SerialVendido): no se
+    pueden registrar otra vez como items.
+    """
+    return set(
+        SerialVendido.objects.filter(
+            numero_serial__in=seriales, devuelto_en__isnull=True
+        ).values_list("numero_serial", flat=True)
+    )
+
+
+def _lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamano)):
+        yield lote
+
+
+def cargar_seriales(producto, seriales, tamano_lote=TAMANO_LOTE):
+    """
+    Registra los seriales de ``producto`` por lotes: por cada lote una
+    consulta busca los ya existentes en el índice único de numero_serial,
+    otra los ya vendidos (SerialVendido), y los nuevos se insertan con
+    bulk_create. El stock se actualiza una vez al final.
+
+    Retorna ``(creados, rechazados)`` donde cada rechazo indica la fila
+    (empezando en 1), el serial y el motivo.
+    """
+    creados = 0
+    rechazados = []
+    vistos = set()
+    fila = 0
+
+    with transaction.atomic():
+        for lote in _lotes(seriales, tamano_lote):
+            candidatos = {}
+            for serial in lote:
+                fila += 1
+                serial = str(serial).strip()
+                if not serial:
+                    motivo = "Serial vacío"
+                elif len(serial) > LONGITUD_MAXIMA:
+                    motivo = f"El serial supera los {LONGITUD_MAXIMA} caracteres"
+                elif serial in vistos:
+                    motivo = "Serial repetido en la carga"
+                else:
+                    vistos.add(serial)
+                    candidatos[serial] = fila
+                    continue
+                rechazados.append(
+                    {"fila": fila, "numero_serial": serial, "motivo": motivo}
+                )
+
+            existentes = Item.objects.filter(numero_serial__in=candidatos).values_list(
+                "numero_serial", flat=True
+            )
+            for serial in existentes:
+                rechazados.append(
+                    {
+                        "fila": candidatos.pop(serial),
+                        "numero_serial": serial,
+                        "motivo": "El serial ya existe",
+                    }
+                )
+
+            for serial in seriales_vendidos(candidatos):
+                rechazados.append(
+                    {
+                        "fila": candidatos.pop(serial),
+                        "numero_serial": serial,
+                        "motivo": "El serial ya fue vendido",
+                    }
+                )
+
+            Item.objects.bulk_create(
+                [Item(producto=producto, numero_serial=s) for s in candidatos],
+                batch_size=tamano_lote,
+            )
+            creados += len(candidatos)
+
+        if creados:
+            Producto.objects.sumar_stock(producto.id, creados)
+
+    rechazados.sort(key=lambda rechazo: rechazo["fila"])
+    return creados, rechazados
@@ -0,0 +1,77 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from productos.busqueda import buscar_productos
+from productos.models import Categoria, Producto
+
+MARCAS = ["hp", "dell", "lenovo", "asus", "acer", "logitech", "samsung", "lg"]
+TIPOS = ["laptop", "monitor", "mouse", "teclado", "impresora", "tablet", "router"]
+ADJETIVOS = ["inalámbrico", "gamer", "portátil", "profesional", "compacto", "usb"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia de la búsqueda de productos sobre un catálogo "
+        "generado. No deja datos en la BD."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--productos", type=int, default=100_000)
+        parser.add_argument("--consultas", type=int, default=200)
+        parser.add_argument("--limite", type=int, default=50)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.generar_catalogo(options["productos"])
+
+            duraciones = []
+            for _ in range(options["consultas"]):
+                texto = f"{random.choice(TIPOS)} {random.choice(MARCAS)[:3]}"
+                inicio = time.perf_counter()
+                list(
+                    buscar_productos(texto).order_by("-rango", "id")[
+                        : options["limite"]
+                    ]
+                )
+                duraciones.append((time.perf_counter() - inicio) * 1000)
+
+            duraciones.sort()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{options['consultas']} búsquedas sobre {options['productos']} "
+                    f"productos: promedio {statistics.mean(duraciones):.1f} ms, "
+                    f"p50 {duraciones[len(duraciones) // 2]:.1f} ms, "
+                    f"p95 {duraciones[int(len(duraciones) * 0.95) - 1]:.1f} ms"
+                )
+            )
+
+            transaction.set_rollback(True)
+
+    def generar_catalogo(self, cantidad):
+        inicio = time.perf_counter()
+        categoria = Categoria.objects.create(
+            nombre="benchmark-busqueda", descripcion=""
+        )
+        Producto.objects.bulk_create(
+            (
+                Producto(
+                    nombre=(
+                        f"{random.choice(TIPOS)} {random.choice(MARCAS)} "
+                        f"{random.choice(ADJETIVOS)} {i}"
+                    ),
+                    descripcion=" ".join(random.choices(ADJETIVOS + TIPOS, k=8)),
+                    precio_dolares=Decimal(random.randint(100, 100_000)) / 100,
+                    categoria=categoria,
+                )
+                for i in range(cantidad)
+            ),
+            batch_size=5000,
+        )
+        self.stdout.write(
+            f"Catálogo de {cantidad} productos generado en "
+            f"{time.perf_counter() - inicio:.3f}s"
+        )
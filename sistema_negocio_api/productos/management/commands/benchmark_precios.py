@@ -0,0 +1,71 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from productos.models import Categoria, Producto
+from productos.precio_dolar import formatear_resumen, repreciar_productos
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la actualización de precios fila por fila contra el UPDATE por "
+        "conjuntos sobre un catálogo generado. No deja datos en la BD."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--productos", type=int, default=100_000)
+        parser.add_argument("--tamano-lote", type=int, default=None)
+        parser.add_argument("--tasa", type=Decimal, default=Decimal("36.5"))
+        parser.add_argument(
+            "--sin-legado",
+            action="store_true",
+            help="No medir el método anterior (save() por producto).",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.generar_catalogo(options["productos"])
+
+            if not options["sin_legado"]:
+                inicio = time.perf_counter()
+                for producto in Producto.objects.all():
+                    producto.precio_bolivares = (
+                        producto.precio_dolares * options["tasa"]
+                    )
+                    producto.save()
+                self.stdout.write(
+                    f"save() por producto: {time.perf_counter() - inicio:.3f}s"
+                )
+                # Se regresa a un estado con precios distintos a la nueva tasa.
+                repreciar_productos(options["tasa"] / 2)
+
+            resumen = repreciar_productos(
+                options["tasa"], tamano_lote=options["tamano_lote"]
+            )
+            self.stdout.write(self.style.SUCCESS(formatear_resumen(resumen)))
+
+            transaction.set_rollback(True)
+
+    def generar_catalogo(self, cantidad):
+        inicio = time.perf_counter()
+        categoria = Categoria.objects.create(
+            nombre="benchmark", descripcion="Categoria generada para benchmark"
+        )
+        Producto.objects.bulk_create(
+            (
+                Producto(
+                    nombre=f"producto-benchmark-{i}",
+                    descripcion="",
+                    precio_dolares=Decimal(random.randint(100, 100_000)) / 100,
+                    categoria=categoria,
+                )
+                for i in range(cantidad)
+            ),
+            batch_size=5000,
+        )
+        self.stdout.write(
+            f"Catálogo de {cantidad} productos generado en "
+            f"{time.perf_counter() - inicio:.3f}s"
+        )
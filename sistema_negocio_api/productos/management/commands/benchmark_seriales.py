@@ -0,0 +1,68 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from productos.carga_seriales import cargar_seriales
+from productos.models import Categoria, Item, Producto
+from productos.serializers import ItemSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la carga de seriales uno por uno (como CrearItem) contra la carga "
+        "masiva por lotes. No deja datos en la BD."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seriales", type=int, default=20_000)
+        parser.add_argument("--tamano-lote", type=int, default=1000)
+        parser.add_argument(
+            "--sin-legado",
+            action="store_true",
+            help="No medir la carga uno por uno.",
+        )
+
+    def handle(self, *args, **options):
+        cantidad = options["seriales"]
+        with transaction.atomic():
+            categoria = Categoria.objects.create(nombre="benchmark", descripcion="")
+            producto = Producto.objects.create(
+                nombre="producto-benchmark",
+                descripcion="",
+                precio_dolares=Decimal("10"),
+                categoria=categoria,
+            )
+
+            if not options["sin_legado"]:
+                inicio = time.perf_counter()
+                for i in range(cantidad):
+                    serializer = ItemSerializer(data={"numero_serial": f"LEG-{i}"})
+                    serializer.is_valid(raise_exception=True)
+                    Item(**serializer.validated_data, producto=producto).save()
+                    producto.cantidad_en_stock += 1
+                    producto.save()
+                self.reportar("Uno por uno", cantidad, time.perf_counter() - inicio)
+
+            seriales = [f"LOTE-{i}" for i in range(cantidad)]
+            # Un 1% de repetidos para medir también los rechazos.
+            seriales += seriales[: cantidad // 100]
+            inicio = time.perf_counter()
+            creados, rechazados = cargar_seriales(
+                producto, seriales, tamano_lote=options["tamano_lote"]
+            )
+            self.reportar(
+                f"Por lotes ({len(rechazados)} rechazados)",
+                creados,
+                time.perf_counter() - inicio,
+            )
+
+            transaction.set_rollback(True)
+
+    def reportar(self, metodo, cantidad, duracion):
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{metodo}: {cantidad} seriales en {duracion:.3f}s "
+                f"({cantidad / duracion:,.0f} seriales/s)"
+            )
+        )
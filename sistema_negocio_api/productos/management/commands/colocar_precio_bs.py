@@ -1,8 +1,9 @@
 from django.core.management.base import BaseCommand
-from pyDolarVenezuela.pages import AlCambio
-from pyDolarVenezuela import Monitor
-from productos.models import Producto  # Ajusta la importación según tu estructura
-from decimal import Decimal
+from productos.precio_dolar import (
+    formatear_resumen,
+    obtener_precio_dolar,
+    repreciar_productos,
+)
 
 
 class Command(BaseCommand):
@@ -10,8 +11,16 @@ class Command(BaseCommand):
         "Actualiza los precios de los productos en bolívares según el precio del dólar."
     )
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tamano-lote",
+            type=int,
+            default=None,
+            help="Actualiza por lotes de este tamaño en vez de un solo UPDATE.",
+        )
+
     def handle(self, *args, **kwargs):
-        precio_dolar = self.obtener_precio_dolar()
+        precio_dolar = obtener_precio_dolar()
 
         if precio_dolar is None:
             self.stdout.write(
@@ -21,44 +30,12 @@ class Command(BaseCommand):
             )
             return
 
-        self.actualizar_precios(precio_dolar)
-
-    def obtener_precio_dolar(self):
-        try:
-            monitor = Monitor(AlCambio, "USD")
-            bcv = monitor.get_value_monitors("bcv")
-            if bcv is None:
-                raise ValueError(
-                    "No se pudo obtener el valor del dólar desde el monitor."
-                )
-            precio_dolar = bcv.price
-            return precio_dolar
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(f"Error al obtener el precio del dólar: {e}")
-            )
-            return None
+        self.actualizar_precios(precio_dolar, kwargs["tamano_lote"])
 
-    def actualizar_precios(self, precio_bolivares):
+    def actualizar_precios(self, precio_bolivares, tamano_lote=None):
         try:
-            productos = Producto.objects.all()
-            for producto in productos:
-                try:
-                    nuevo_precio = producto.precio_dolares * Decimal(precio_bolivares)
-                    producto.precio_bolivares = nuevo_precio
-                    producto.save()
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f"Precio actualizado para el producto {producto.id}"
-                        )
-                    )
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f"Error al actualizar el producto {producto.id}: {e}"
-                        )
-                    )
-                    continue
+            resumen = repreciar_productos(precio_bolivares, tamano_lote=tamano_lote)
+            self.stdout.write(self.style.SUCCESS(formatear_resumen(resumen)))
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f"Error en la función actualizar_precios: {e}")
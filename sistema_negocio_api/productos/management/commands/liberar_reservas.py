@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from productos.reservas import borrar_reservas_vencidas
+
+
+class Command(BaseCommand):
+    help = "Libera las reservas de seriales cuyo tiempo de espera ya venció."
+
+    def handle(self, *args, **kwargs):
+        borradas = borrar_reservas_vencidas()
+        self.stdout.write(
+            self.style.SUCCESS(f"Reservas vencidas liberadas: {borradas}")
+        )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from productos.borrado import procesar_borrados
+from productos.models import TareaBorrado
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta los borrados en segundo plano pendientes (categorías, "
+        "productos y clientes con sus dependientes), mostrando el avance."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tamano-lote", type=int, default=None)
+        parser.add_argument(
+            "--reintentar",
+            action="store_true",
+            help="Vuelve a encolar las tareas con error o interrumpidas.",
+        )
+
+    def handle(self, *args, **options):
+        if options["reintentar"]:
+            reintentadas = TareaBorrado.objects.filter(
+                estado__in=[TareaBorrado.ERROR, TareaBorrado.EN_PROCESO]
+            ).update(estado=TareaBorrado.PENDIENTE, error="")
+            self.stdout.write(f"Tareas reencoladas: {reintentadas}")
+
+        def al_avanzar(tarea):
+            self.stdout.write(
+                f"Borrado {tarea.id} ({tarea.descripcion}): "
+                f"{tarea.filas_borradas} filas"
+            )
+
+        for tarea in procesar_borrados(options["tamano_lote"], al_avanzar):
+            if tarea.estado == TareaBorrado.TERMINADA:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Borrado {tarea.id} terminado: {tarea.filas_borradas} filas"
+                    )
+                )
+            else:
+                self.stdout.write(
+                    self.style.ERROR(f"Borrado {tarea.id} falló: {tarea.error}")
+                )
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("productos", "0007_alter_producto_precio_bolivares_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TasaCambio",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("tasa", models.DecimalField(decimal_places=8, max_digits=20)),
+                ("fuente", models.CharField(default="bcv", max_length=50)),
+                ("fecha_obtencion", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["fuente", "fecha_obtencion"],
+                        name="productos_t_fuente_3d82fc_idx",
+                    )
+                ],
+            },
+        ),
+    ]
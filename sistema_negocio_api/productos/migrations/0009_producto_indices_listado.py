@@ -0,0 +1,31 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("productos", "0008_tasacambio"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="producto",
+            index=models.Index(
+                fields=["categoria", "id"], name="productos_p_categor_2949d6_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="producto",
+            index=models.Index(
+                fields=["precio_dolares"], name="productos_p_precio__9d6917_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="producto",
+            index=models.Index(
+                fields=["cantidad_en_stock"], name="productos_p_cantida_8d1656_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("productos", "0009_producto_indices_listado"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                fields=["producto", "id"], name="productos_i_product_5a4d10_idx"
+            ),
+        ),
+    ]
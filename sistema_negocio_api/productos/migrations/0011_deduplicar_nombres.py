@@ -0,0 +1,43 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def deduplicar(modelo):
+    """
+    Deja el nombre original en el registro más antiguo y agrega " (<id>)" a
+    los demás, para poder crear el índice único sin perder datos.
+    """
+    max_length = modelo._meta.get_field("nombre").max_length
+    repetidos = (
+        modelo.objects.values("nombre")
+        .annotate(cantidad=Count("id"))
+        .filter(cantidad__gt=1)
+        .values_list("nombre", flat=True)
+    )
+    for nombre in repetidos:
+        ids = list(
+            modelo.objects.filter(nombre=nombre)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        for id in ids[1:]:
+            sufijo = f" ({id})"
+            modelo.objects.filter(id=id).update(
+                nombre=nombre[: max_length - len(sufijo)] + sufijo
+            )
+
+
+def deduplicar_nombres(apps, schema_editor):
+    deduplicar(apps.get_model("productos", "Categoria"))
+    deduplicar(apps.get_model("productos", "Producto"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("productos", "0010_item_producto_id"),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicar_nombres, migrations.RunPython.noop),
+    ]
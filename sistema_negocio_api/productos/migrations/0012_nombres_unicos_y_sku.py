@@ -0,0 +1,28 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("productos", "0011_deduplicar_nombres"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="producto",
+            name="sku",
+            field=models.CharField(blank=True, max_length=50, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name="categoria",
+            name="nombre",
+            field=models.CharField(max_length=200, unique=True),
+        ),
+        migrations.AlterField(
+            model_name="producto",
+            name="nombre",
+            field=models.CharField(max_length=200, unique=True),
+        ),
+    ]
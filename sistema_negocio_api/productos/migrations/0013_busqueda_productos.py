@@ -0,0 +1,51 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+import productos.models
+from productos import busqueda_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("productos", "0012_nombres_unicos_y_sku"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductoBusqueda",
+            fields=[
+                (
+                    "producto",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="busqueda",
+                        serialize=False,
+                        to="productos.producto",
+                    ),
+                ),
+                (
+                    "texto",
+                    productos.models.CampoFTS(db_column="productos_producto_fts"),
+                ),
+                ("rank", models.FloatField()),
+            ],
+            options={
+                "db_table": "productos_producto_fts",
+                "managed": False,
+            },
+        ),
+        migrations.RunPython(
+            busqueda_sql.ejecutar(
+                {"postgresql": busqueda_sql.POSTGRES, "sqlite": busqueda_sql.SQLITE}
+            ),
+            busqueda_sql.ejecutar(
+                {
+                    "postgresql": busqueda_sql.POSTGRES_REVERSA,
+                    "sqlite": busqueda_sql.SQLITE_REVERSA,
+                }
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("productos", "0013_busqueda_productos"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Reserva",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sesion", models.CharField(max_length=100)),
+                ("expira_en", models.DateTimeField()),
+                ("fecha_creacion", models.DateTimeField(auto_now_add=True)),
+                (
+                    "item",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reserva",
+                        to="productos.item",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["expira_en"], name="productos_r_expira__354675_idx"
+                    ),
+                    models.Index(
+                        fields=["sesion"], name="productos_r_sesion_05658a_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def marcar_reservados(apps, schema_editor):
+    """Los items con una reserva pendiente quedan como reservados."""
+    Item = apps.get_model("productos", "Item")
+    Item.objects.filter(reserva__isnull=False).update(estado="reservado")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("facturas_y_reportes", "0012_seriales_vendidos"),
+        ("productos", "0014_reservas"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="detalle",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="items",
+                to="facturas_y_reportes.detallefactura",
+            ),
+        ),
+        migrations.AddField(
+            model_name="item",
+            name="estado",
+            field=models.CharField(
+                choices=[
+                    ("disponible", "Disponible"),
+                    ("reservado", "Reservado"),
+                    ("vendido", "Vendido"),
+                    ("devuelto", "Devuelto"),
+                ],
+                default="disponible",
+                max_length=20,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                condition=models.Q(("estado__in", ["disponible", "reservado"])),
+                fields=["producto", "id"],
+                name="item_en_stock_idx",
+            ),
+        ),
+        migrations.RunPython(marcar_reservados, migrations.RunPython.noop),
+    ]
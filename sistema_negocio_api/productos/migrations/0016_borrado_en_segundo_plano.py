@@ -0,0 +1,73 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+from productos import busqueda_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("productos", "0015_estado_items"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="categoria",
+            name="borrando",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="producto",
+            name="borrando",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name="TareaBorrado",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("modelo", models.CharField(max_length=100)),
+                ("objeto_id", models.IntegerField()),
+                ("descripcion", models.CharField(max_length=255)),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("pendiente", "Pendiente"),
+                            ("en_proceso", "En proceso"),
+                            ("terminada", "Terminada"),
+                            ("error", "Error"),
+                        ],
+                        default="pendiente",
+                        max_length=20,
+                    ),
+                ),
+                ("filas_borradas", models.IntegerField(default=0)),
+                ("detalle", models.JSONField(default=dict)),
+                ("error", models.TextField(blank=True)),
+                ("fecha_creacion", models.DateTimeField(auto_now_add=True)),
+                ("fecha_fin", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["estado", "id"], name="productos_t_estado_55a72c_idx"
+                    )
+                ],
+            },
+        ),
+        # En SQLite AddField reconstruye productos_producto y se pierden los
+        # triggers de la búsqueda: se vuelven a crear.
+        migrations.RunPython(
+            busqueda_sql.ejecutar({"sqlite": busqueda_sql.SQLITE}),
+            migrations.RunPython.noop,
+        ),
+    ]
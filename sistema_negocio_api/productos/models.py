@@ -1,21 +1,284 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, Round
+
+
+def precio_bolivares_con_tasa(tasa):
+    """Expresión SQL de precio_dolares * tasa redondeado a 2 decimales."""
+    return Round(
+        F("precio_dolares") * Value(tasa, output_field=DecimalField()),
+        2,
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+class CategoriaQuerySet(models.QuerySet):
+    def con_totales(self):
+        """Cantidad de productos y stock total por categoría en la misma consulta."""
+        visibles = Q(producto__borrando=False)
+        return self.annotate(
+            cantidad_productos=Count("producto", filter=visibles),
+            stock_total=Coalesce(
+                Sum("producto__cantidad_en_stock", filter=visibles), 0
+            ),
+        )
+
+
+class CategoriaManager(models.Manager.from_queryset(CategoriaQuerySet)):
+    def get_queryset(self):
+        # Las que se están borrando en segundo plano no se ven (productos.borrado).
+        return super().get_queryset().filter(borrando=False)
 
 
 # Create your models here.
 class Categoria(models.Model):
-    nombre = models.CharField(max_length=200)
+    nombre = models.CharField(max_length=200, unique=True)
     descripcion = models.TextField()
+    borrando = models.BooleanField(default=False)
+
+    objects = CategoriaManager()
+
+
+class ProductoQuerySet(models.QuerySet):
+    def con_precio_bolivares(self, tasa):
+        return self.annotate(precio_bolivares_tasa=precio_bolivares_con_tasa(tasa))
+
+    def sumar_stock(self, producto_id, cantidad):
+        """Incremento atómico en la BD, solo toca la columna de stock."""
+        return self.filter(id=producto_id).update(
+            cantidad_en_stock=F("cantidad_en_stock") + cantidad
+        )
+
+    def reintegrar_stock(self, cantidades):
+        """Suma ``{producto_id: cantidad}`` al stock en un solo UPDATE."""
+        cantidades = {id: c for id, c in cantidades.items() if c}
+        if not cantidades:
+            return 0
+        return self.filter(id__in=cantidades).update(
+            cantidad_en_stock=F("cantidad_en_stock")
+            + Case(
+                *[When(id=id, then=Value(c)) for id, c in cantidades.items()],
+                output_field=models.IntegerField(),
+            )
+        )
+
+    def descontar_stock(self, cantidades):
+        """
+        Descuenta ``{producto_id: cantidad}`` en un solo UPDATE atómico, solo en
+        los productos con stock suficiente. Retorna True si se descontaron
+        todos; si no, no modifica nada.
+        """
+        cantidades = {id: c for id, c in cantidades.items() if c}
+        if not cantidades:
+            return True
+        con_stock = Q()
+        for producto_id, cantidad in cantidades.items():
+            con_stock |= Q(id=producto_id, cantidad_en_stock__gte=cantidad)
+        descuento = Case(
+            *[When(id=id, then=Value(c)) for id, c in cantidades.items()],
+            output_field=models.IntegerField(),
+        )
+        with transaction.atomic():
+            # Bloqueo en orden de id: dos ventas con los mismos productos no
+            # pueden bloquearse mutuamente en el UPDATE.
+            list(
+                self.select_for_update()
+                .filter(id__in=cantidades)
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
+            actualizados = self.filter(con_stock).update(
+                cantidad_en_stock=F("cantidad_en_stock") - descuento
+            )
+            if actualizados != len(cantidades):
+                transaction.set_rollback(True)
+                return False
+        return True
+
+
+class ProductoManager(models.Manager.from_queryset(ProductoQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().filter(borrando=False)
 
 
 class Producto(models.Model):
-    nombre = models.CharField(max_length=200)
+    nombre = models.CharField(max_length=200, unique=True)
+    sku = models.CharField(max_length=50, unique=True, null=True, blank=True)
     descripcion = models.TextField()
     precio_dolares = models.DecimalField(max_digits=12, decimal_places=2)
     precio_bolivares = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     cantidad_en_stock = models.IntegerField(default=0)
     categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE)
+    borrando = models.BooleanField(default=False)
+
+    objects = ProductoManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["categoria", "id"]),
+            models.Index(fields=["precio_dolares"]),
+            models.Index(fields=["cantidad_en_stock"]),
+        ]
+
+
+def referencia_producto(datos, campo_id="id", campo_sku="sku", campo_nombre="nombre"):
+    """
+    Arma el filtro para ubicar un producto por id, SKU o nombre (en ese orden
+    de preferencia) a partir de un dict de la petición. Todos son índices únicos.
+    """
+    if datos.get(campo_id) not in (None, ""):
+        return {"id": datos[campo_id]}
+    if datos.get(campo_sku):
+        return {"sku": datos[campo_sku]}
+    if datos.get(campo_nombre):
+        return {"nombre": datos[campo_nombre]}
+    return None
+
+
+class ItemQuerySet(models.QuerySet):
+    def en_stock(self):
+        """
+        Items que se pueden vender: disponibles o apartados por una caja, de
+        un producto que no se está borrando. El producto se filtra con una
+        subconsulta y no con un JOIN, así SELECT ... FOR UPDATE
+        (bloquear_seriales) solo bloquea las filas de Item.
+        """
+        return self.filter(
+            estado__in=Item.EN_STOCK,
+            producto_id__in=Producto.objects.values("id"),
+        )
 
 
 class Item(models.Model):
+    DISPONIBLE = "disponible"
+    RESERVADO = "reservado"
+    VENDIDO = "vendido"
+    DEVUELTO = "devuelto"
+    ESTADOS = (
+        (DISPONIBLE, "Disponible"),
+        (RESERVADO, "Reservado"),
+        (VENDIDO, "Vendido"),
+        (DEVUELTO, "Devuelto"),
+    )
+    EN_STOCK = (DISPONIBLE, RESERVADO)
+
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
     numero_serial = models.CharField(max_length=30, unique=True)
+    estado = models.CharField(choices=ESTADOS, max_length=20, default=DISPONIBLE)
+    # Línea de factura de la última venta del serial.
+    detalle = models.ForeignKey(
+        "facturas_y_reportes.DetalleFactura",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="items",
+    )
+
+    objects = ItemQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["producto", "id"]),
+            # Solo los que están en stock (Item.EN_STOCK, la condición de
+            # en_stock()): el índice no crece con el historial de ventas.
+            models.Index(
+                fields=["producto", "id"],
+                condition=Q(estado__in=["disponible", "reservado"]),
+                name="item_en_stock_idx",
+            ),
+        ]
+
+
+class Reserva(models.Model):
+    """Serial apartado por una sesión de caja (POS) hasta ``expira_en``."""
+
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, related_name="reserva")
+    sesion = models.CharField(max_length=100)
+    expira_en = models.DateTimeField()
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["expira_en"]),
+            models.Index(fields=["sesion"]),
+        ]
+
+
+class Match(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class CampoFTS(models.TextField):
+    pass
+
+
+CampoFTS.register_lookup(Match)
+
+
+class ProductoBusqueda(models.Model):
+    """
+    Tabla FTS5 sombra de Producto (solo SQLite, creada y sincronizada por
+    triggers en la migración 0013). Ver productos.busqueda.
+    """
+
+    producto = models.OneToOneField(
+        Producto,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        related_name="busqueda",
+    )
+    # La columna oculta con el nombre de la tabla se usa para MATCH.
+    texto = CampoFTS(db_column="productos_producto_fts")
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "productos_producto_fts"
+
+
+class TasaCambio(models.Model):
+    tasa = models.DecimalField(max_digits=20, decimal_places=8)
+    fuente = models.CharField(max_length=50, default="bcv")
+    fecha_obtencion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["fuente", "fecha_obtencion"])]
+
+
+class TareaBorrado(models.Model):
+    """
+    Borrado en segundo plano de un registro y todo lo que depende de él
+    (productos.borrado). El registro queda oculto desde que se encola.
+    """
+
+    PENDIENTE = "pendiente"
+    EN_PROCESO = "en_proceso"
+    TERMINADA = "terminada"
+    ERROR = "error"
+    ESTADOS = (
+        (PENDIENTE, "Pendiente"),
+        (EN_PROCESO, "En proceso"),
+        (TERMINADA, "Terminada"),
+        (ERROR, "Error"),
+    )
+
+    # Etiqueta del modelo ("productos.Categoria") e id del registro.
+    modelo = models.CharField(max_length=100)
+    objeto_id = models.IntegerField()
+    descripcion = models.CharField(max_length=255)
+    estado = models.CharField(choices=ESTADOS, max_length=20, default=PENDIENTE)
+    filas_borradas = models.IntegerField(default=0)
+    # Filas borradas por modelo: {"facturas_y_reportes.DetalleFactura": 1200, ...}
+    detalle = models.JSONField(default=dict)
+    error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["estado", "id"])]
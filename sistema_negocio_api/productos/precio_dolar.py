@@ -1,41 +1,272 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Max, Min
 from pyDolarVenezuela.pages import AlCambio
 from pyDolarVenezuela import Monitor
-from .models import Producto
+from .models import Producto, TasaCambio, precio_bolivares_con_tasa
+
+CLAVE_CACHE_TASA = "productos:tasa_dolar"
+CLAVE_CACHE_REFRESCO = "productos:tasa_dolar:refrescando"
+FUENTE_BCV = "bcv"
+
+# Copia en memoria del proceso, para no ir a la cache compartida en cada request.
+_tasa_local = None
+_lock = threading.Lock()
+
+
+def _ttl():
+    return getattr(settings, "TASA_DOLAR_TTL", 60 * 60)
+
+
+def _ventana_stale():
+    return getattr(settings, "TASA_DOLAR_STALE", 24 * 60 * 60)
+
+
+def _timeout_consulta():
+    return getattr(settings, "TASA_DOLAR_TIMEOUT", 5)
+
+
+def consultar_monitor():
+    """Consulta el valor del dólar BCV directamente en el monitor (red)."""
+    monitor = Monitor(AlCambio, "USD")
+    bcv = monitor.get_value_monitors(FUENTE_BCV)
+    if bcv is None:
+        raise ValueError("No se pudo obtener el valor del dólar desde el monitor.")
+    return Decimal(str(bcv.price))
+
+
+def _consultar_con_timeout(timeout):
+    resultado = {}
 
+    def tarea():
+        try:
+            resultado["tasa"] = consultar_monitor()
+        except Exception as e:
+            resultado["error"] = e
 
-def obtener_precio_dolar():
+    hilo = threading.Thread(target=tarea, name="consulta_tasa_dolar", daemon=True)
+    hilo.start()
+    hilo.join(timeout)
+    if hilo.is_alive():
+        raise TimeoutError(f"El monitor no respondió en {timeout} segundos")
+    if "error" in resultado:
+        raise resultado["error"]
+    return resultado["tasa"]
+
+
+def _guardar_en_cache(registro):
+    global _tasa_local
+    entrada = {
+        "id": registro.id,
+        "tasa": registro.tasa,
+        "obtenida": registro.fecha_obtencion.timestamp(),
+    }
+    with _lock:
+        _tasa_local = entrada
+    cache.set(CLAVE_CACHE_TASA, entrada, timeout=_ttl() + _ventana_stale())
+    return entrada
+
+
+def _leer_entrada():
+    """
+    Busca la última tasa conocida: memoria del proceso, cache compartida y BD.
+    La copia en memoria solo se usa sola mientras está vigente; vencida, se
+    vuelve a leer la cache porque otro worker pudo haberla refrescado ya.
+    """
+    global _tasa_local
+    local = _tasa_local
+    if local is not None and time.time() - local["obtenida"] < _ttl():
+        return local
+
+    entrada = cache.get(CLAVE_CACHE_TASA)
+    if entrada is None:
+        ultima = (
+            TasaCambio.objects.filter(fuente=FUENTE_BCV)
+            .order_by("-fecha_obtencion")
+            .first()
+        )
+        if ultima is None:
+            return local
+        return _guardar_en_cache(ultima)
+
+    if local is not None and local["obtenida"] > entrada["obtenida"]:
+        return local
+    with _lock:
+        _tasa_local = entrada
+    return entrada
+
+
+def _refrescar():
     try:
-        monitor = Monitor(AlCambio, "USD")
-        bcv = monitor.get_value_monitors("bcv")
-        if bcv is None:
-            raise ValueError("No se pudo obtener el valor del dólar desde el monitor.")
-        precio_dolar = bcv.price
-        return precio_dolar
+        tasa = _consultar_con_timeout(_timeout_consulta())
     except Exception as e:
-        # Captura cualquier excepción que ocurra durante la obtención del precio
         print(f"Error al obtener el precio del dólar: {e}")
-        return None  # Retorna None en caso de error
+        return None
+
+    return _guardar_en_cache(TasaCambio.objects.create(tasa=tasa, fuente=FUENTE_BCV))
+
+
+def refrescar_tasa():
+    """
+    Consulta el monitor con un tiempo máximo de espera y registra la tasa en
+    TasaCambio y en la cache. Retorna None si la consulta falla.
+    """
+    entrada = _refrescar()
+    return entrada["tasa"] if entrada is not None else None
+
+
+def _refrescar_en_segundo_plano():
+    # cache.add es atómico: solo un worker refresca a la vez.
+    if not cache.add(CLAVE_CACHE_REFRESCO, True, timeout=_timeout_consulta() * 2):
+        return
+
+    def tarea():
+        try:
+            _refrescar()
+        finally:
+            cache.delete(CLAVE_CACHE_REFRESCO)
+            connection.close()
+
+    threading.Thread(target=tarea, name="refresco_tasa_dolar", daemon=True).start()
+
+
+def obtener_tasa_cambio(esperar=True):
+    """
+    Retorna la tasa BCV vigente como ``{"id", "tasa", "obtenida"}`` (``id`` es
+    el registro de TasaCambio) o None si nunca se ha podido obtener.
+
+    - Si la tasa en cache está vigente (TASA_DOLAR_TTL) se retorna sin ir a la red.
+    - Si está vencida pero dentro de TASA_DOLAR_STALE (también en la cache
+      compartida, que se vuelve a leer), se retorna igual y se refresca en
+      segundo plano.
+    - Si no hay tasa o está fuera de esa ventana y ``esperar`` es True, se
+      consulta el monitor (con timeout); si falla se usa el último valor conocido.
+      Con ``esperar=False`` nunca se bloquea en la red.
+    """
+    entrada = _leer_entrada()
+    if entrada is not None:
+        edad = time.time() - entrada["obtenida"]
+        if edad < _ttl():
+            return entrada
+        if edad < _ttl() + _ventana_stale() or not esperar:
+            _refrescar_en_segundo_plano()
+            return entrada
+    elif not esperar:
+        _refrescar_en_segundo_plano()
+        return None
+
+    return _refrescar() or entrada
+
+
+def obtener_precio_dolar(esperar=True):
+    """Retorna solo el valor (Decimal) de ``obtener_tasa_cambio``."""
+    entrada = obtener_tasa_cambio(esperar=esperar)
+    return entrada["tasa"] if entrada is not None else None
+
+
+def precios_en_lectura():
+    return getattr(settings, "PRECIOS_BS_EN_LECTURA", False)
+
+
+def anotar_precio_bolivares(productos):
+    """
+    Con PRECIOS_BS_EN_LECTURA activo, anota en el queryset el precio en
+    bolívares calculado con la tasa vigente (ver ProductoSerializer).
+    """
+    if not precios_en_lectura():
+        return productos
+    tasa = obtener_precio_dolar(esperar=False)
+    if tasa is None:
+        return productos
+    return productos.con_precio_bolivares(tasa)
+
+
+def invalidar_tasa():
+    global _tasa_local
+    with _lock:
+        _tasa_local = None
+    cache.delete(CLAVE_CACHE_TASA)
+
+
+def repreciar_productos(tasa, tamano_lote=None):
+    """
+    Recalcula ``precio_bolivares = precio_dolares * tasa`` para todo el
+    catálogo con UPDATEs sobre conjuntos (sin cargar productos en memoria),
+    dentro de una sola transacción. Con ``tamano_lote`` el UPDATE se hace por
+    rangos de id para no generar una sola sentencia gigante.
+
+    Retorna un resumen con las filas modificadas, la duración en segundos y
+    la variación mínima/máxima de precio.
+    """
+    tasa = Decimal(tasa)
+    inicio = time.perf_counter()
+    nuevo_precio = precio_bolivares_con_tasa(tasa)
+    delta = ExpressionWrapper(
+        nuevo_precio - F("precio_bolivares"),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+    with transaction.atomic():
+        pendientes = Producto.objects.exclude(precio_bolivares=nuevo_precio)
+        resumen = pendientes.aggregate(delta_min=Min(delta), delta_max=Max(delta))
+
+        if tamano_lote is None:
+            filas = pendientes.update(precio_bolivares=nuevo_precio)
+        else:
+            filas = 0
+            ultimo_id = 0
+            while True:
+                ids = list(
+                    Producto.objects.filter(id__gt=ultimo_id)
+                    .order_by("id")
+                    .values_list("id", flat=True)[:tamano_lote]
+                )
+                if not ids:
+                    break
+                filas += pendientes.filter(id__gte=ids[0], id__lte=ids[-1]).update(
+                    precio_bolivares=nuevo_precio
+                )
+                ultimo_id = ids[-1]
+
+    for clave in ("delta_min", "delta_max"):
+        if resumen[clave] is not None:
+            resumen[clave] = Decimal(resumen[clave]).quantize(Decimal("0.01"))
+    resumen.update(
+        tasa=tasa, filas=filas, duracion=round(time.perf_counter() - inicio, 3)
+    )
+    return resumen
+
+
+def formatear_resumen(resumen):
+    return (
+        f"Tasa {resumen['tasa']}: {resumen['filas']} productos actualizados en "
+        f"{resumen['duracion']}s (variación mínima {resumen['delta_min']}, "
+        f"máxima {resumen['delta_max']})"
+    )
 
 
 def actualizar_precios():
     try:
-        productos = Producto.objects.all()
-        precio_bolivares = obtener_precio_dolar()
+        # El cron corre cuando el BCV publica: se fuerza la consulta y, si
+        # falla, se usa el último valor conocido.
+        precio_bolivares = refrescar_tasa() or obtener_precio_dolar(esperar=False)
 
         if precio_bolivares is None:
             raise ValueError(
                 "No se pudo obtener el precio del dólar. No se actualizarán los precios."
             )
 
-        for producto in productos:
-            try:
-                nuevo_precio = producto.precio_dolares * precio_bolivares
-                producto.precio_bolivares = nuevo_precio
-                producto.save()
-            except Exception as e:
-                # Captura errores al actualizar un producto específico
-                print(f"Error al actualizar el producto {producto.id}: {e}")
-                continue  # Continúa con el siguiente producto si hay un error
+        if precios_en_lectura():
+            # Los precios se calculan al consultar: basta con registrar la tasa.
+            print(f"Tasa {precio_bolivares} registrada, no se reescriben precios.")
+            return
+
+        print(formatear_resumen(repreciar_productos(precio_bolivares)))
 
     except Exception as e:
         # Captura errores generales en la función
@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Item, Reserva
+
+
+def duracion_reserva(segundos=None):
+    """Normaliza el TTL pedido por la caja al rango permitido en settings."""
+    if segundos in (None, ""):
+        return settings.RESERVA_TTL
+    segundos = int(segundos)
+    if segundos <= 0:
+        raise ValueError("El ttl debe ser mayor que 0")
+    return min(segundos, settings.RESERVA_TTL_MAXIMO)
+
+
+def reservar_seriales(sesion, seriales, ttl=None):
+    """
+    Aparta ``seriales`` para la sesión de caja ``sesion`` durante ``ttl``
+    segundos con un número fijo de consultas, sin importar el tamaño del
+    carrito. Las reservas vencidas se reemplazan y las de la misma sesión se
+    renuevan. La unicidad de Reserva.item resuelve las carreras entre cajas
+    (IntegrityError para quien llegue de segundo).
+
+    Retorna ``(reservados, rechazados, expira_en)``.
+    """
+    ahora = timezone.now()
+    expira_en = ahora + timedelta(seconds=duracion_reserva(ttl))
+    seriales = list(dict.fromkeys(str(serial).strip() for serial in seriales))
+
+    with transaction.atomic():
+        items = dict(
+            Item.objects.en_stock()
+            .filter(numero_serial__in=seriales)
+            .values_list("numero_serial", "id")
+        )
+        Reserva.objects.filter(
+            item_id__in=items.values(), expira_en__lte=ahora
+        ).delete()
+        ocupados = dict(
+            Reserva.objects.filter(item_id__in=items.values()).values_list(
+                "item_id", "sesion"
+            )
+        )
+
+        reservados = []
+        rechazados = []
+        propios = []
+        nuevos = []
+        for serial in seriales:
+            item_id = items.get(serial)
+            if item_id is None:
+                rechazados.append(
+                    {"serial": serial, "motivo": "El serial no existe o ya fue vendido"}
+                )
+            elif item_id not in ocupados:
+                nuevos.append(
+                    Reserva(item_id=item_id, sesion=sesion, expira_en=expira_en)
+                )
+                reservados.append(serial)
+            elif ocupados[item_id] == sesion:
+                propios.append(item_id)
+                reservados.append(serial)
+            else:
+                rechazados.append(
+                    {
+                        "serial": serial,
+                        "motivo": "El serial está reservado por otra caja",
+                    }
+                )
+
+        if propios:
+            Reserva.objects.filter(item_id__in=propios).update(expira_en=expira_en)
+        Reserva.objects.bulk_create(nuevos)
+        Item.objects.filter(id__in=[r.item_id for r in nuevos]).update(
+            estado=Item.RESERVADO
+        )
+
+    return reservados, rechazados, expira_en
+
+
+def _liberar(reservas):
+    """Devuelve a disponible los items de ``reservas`` y las borra."""
+    with transaction.atomic():
+        Item.objects.filter(
+            id__in=reservas.values("item_id"), estado=Item.RESERVADO
+        ).update(estado=Item.DISPONIBLE)
+        borradas, _ = reservas.delete()
+    return borradas
+
+
+def liberar_reservas(sesion, seriales=None):
+    """Libera las reservas de una sesión (todas o solo ``seriales``)."""
+    reservas = Reserva.objects.filter(sesion=sesion)
+    if seriales:
+        reservas = reservas.filter(item__numero_serial__in=seriales)
+    return _liberar(reservas)
+
+
+def reservas_activas(seriales):
+    """``{serial: sesion}`` de las reservas vigentes sobre ``seriales``."""
+    return dict(
+        Reserva.objects.filter(
+            item__numero_serial__in=seriales, expira_en__gt=timezone.now()
+        ).values_list("item__numero_serial", "sesion")
+    )
+
+
+def borrar_reservas_vencidas():
+    """Borra las reservas vencidas (índice de expira_en) y libera sus items."""
+    return _liberar(Reserva.objects.filter(expira_en__lte=timezone.now()))
+
+
+def liberar_reservas_vencidas():
+    """Tarea periódica (CRONJOBS)."""
+    try:
+        print(f"Reservas vencidas liberadas: {borrar_reservas_vencidas()}")
+    except Exception as e:
+        print(f"Error en la función liberar_reservas_vencidas: {e}")
@@ -9,10 +9,23 @@ class CategoriaSerializer(serializers.ModelSerializer):
         fields = ("nombre", "descripcion")
 
 
+class CategoriaConTotalesSerializer(serializers.ModelSerializer):
+    """Categoria anotada con Categoria.objects.con_totales()."""
+
+    class Meta:
+        model = Categoria
+        fields = ("id", "nombre", "descripcion", "cantidad_productos", "stock_total")
+
+    cantidad_productos = serializers.IntegerField(read_only=True)
+    stock_total = serializers.IntegerField(read_only=True)
+
+
 class ProductoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Producto
         fields = (
+            "id",
+            "sku",
             "nombre",
             "descripcion",
             "precio_dolares",
@@ -23,10 +36,25 @@ class ProductoSerializer(serializers.ModelSerializer):
 
     categoria = CategoriaSerializer(read_only=True)
 
+    def validate_sku(self, value):
+        # "" se guarda como NULL para no chocar con el índice único.
+        return value or None
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Precio calculado con la tasa vigente (Producto.objects.con_precio_bolivares)
+        precio_bolivares = getattr(instance, "precio_bolivares_tasa", None)
+        if precio_bolivares is not None:
+            data["precio_bolivares"] = self.fields[
+                "precio_bolivares"
+            ].to_representation(precio_bolivares)
+        return data
+
 
 class ItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = Item
-        fields = ("numero_serial", "producto")
+        fields = ("numero_serial", "producto", "estado")
+        read_only_fields = ("estado",)
 
     producto = ProductoSerializer(read_only=True)
@@ -1,3 +1,837 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from io import StringIO
+from decimal import Decimal
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from clientes.models import Cliente
+from facturas_y_reportes.models import DetalleFactura, Factura, SerialVendido
+from . import borrado, precio_dolar, reservas
+from .busqueda import buscar_productos
+from .models import Categoria, Item, Producto, Reserva, TareaBorrado, TasaCambio
+from .serializers import ProductoSerializer
+
+
+@override_settings(TASA_DOLAR_TTL=60, TASA_DOLAR_STALE=120, TASA_DOLAR_TIMEOUT=1)
+class TestTasaDolar(TestCase):
+    def setUp(self):
+        precio_dolar.invalidar_tasa()
+        cache.delete(precio_dolar.CLAVE_CACHE_REFRESCO)
+
+    def tearDown(self):
+        precio_dolar.invalidar_tasa()
+
+    def guardar_tasa_vencida(self, tasa):
+        registro = TasaCambio.objects.create(tasa=tasa)
+        registro.fecha_obtencion -= timedelta(seconds=1000)
+        precio_dolar._guardar_en_cache(registro)
+
+    @patch("productos.precio_dolar.consultar_monitor", return_value=Decimal("36.5"))
+    def test_tasa_vigente_no_consulta_el_monitor(self, mock_monitor):
+        self.assertEqual(precio_dolar.obtener_precio_dolar(), Decimal("36.5"))
+        self.assertEqual(precio_dolar.obtener_precio_dolar(), Decimal("36.5"))
+        self.assertEqual(mock_monitor.call_count, 1)
+        self.assertEqual(TasaCambio.objects.count(), 1)
+
+    @patch("productos.precio_dolar.consultar_monitor", side_effect=ValueError)
+    def test_usa_ultimo_valor_conocido_de_la_bd(self, mock_monitor):
+        TasaCambio.objects.create(tasa=Decimal("40.1"))
+        self.assertEqual(precio_dolar.obtener_precio_dolar(), Decimal("40.1"))
+        mock_monitor.assert_not_called()
+
+    @patch("productos.precio_dolar.consultar_monitor", side_effect=ValueError)
+    def test_fuera_de_la_ventana_y_monitor_caido_retorna_ultimo_valor(
+        self, mock_monitor
+    ):
+        self.guardar_tasa_vencida(Decimal("38"))
+        self.assertEqual(precio_dolar.obtener_precio_dolar(), Decimal("38"))
+        self.assertEqual(mock_monitor.call_count, 1)
+
+    @patch("productos.precio_dolar._refrescar_en_segundo_plano")
+    @patch("productos.precio_dolar.consultar_monitor")
+    def test_sin_esperar_nunca_consulta_en_el_request(
+        self, mock_monitor, mock_refresco
+    ):
+        self.assertIsNone(precio_dolar.obtener_precio_dolar(esperar=False))
+        self.guardar_tasa_vencida(Decimal("38"))
+        self.assertEqual(
+            precio_dolar.obtener_precio_dolar(esperar=False), Decimal("38")
+        )
+        mock_monitor.assert_not_called()
+        self.assertEqual(mock_refresco.call_count, 2)
+
+    @patch("productos.precio_dolar._refrescar_en_segundo_plano")
+    @patch("productos.precio_dolar.consultar_monitor")
+    def test_copia_local_vencida_lee_la_cache_compartida(
+        self, mock_monitor, mock_refresco
+    ):
+        self.guardar_tasa_vencida(Decimal("38"))
+        # Otro worker ya refrescó la tasa en la cache compartida.
+        registro = TasaCambio.objects.create(tasa=Decimal("39"))
+        cache.set(
+            precio_dolar.CLAVE_CACHE_TASA,
+            {
+                "id": registro.id,
+                "tasa": registro.tasa,
+                "obtenida": registro.fecha_obtencion.timestamp(),
+            },
+        )
+        self.assertEqual(precio_dolar.obtener_precio_dolar(), Decimal("39"))
+        self.assertEqual(
+            precio_dolar.obtener_precio_dolar(esperar=False), Decimal("39")
+        )
+        mock_monitor.assert_not_called()
+        mock_refresco.assert_not_called()
+
+    @patch(
+        "productos.precio_dolar.consultar_monitor", side_effect=lambda: time.sleep(5)
+    )
+    def test_consulta_con_timeout(self, mock_monitor):
+        inicio = time.monotonic()
+        self.assertIsNone(precio_dolar.refrescar_tasa())
+        self.assertLess(time.monotonic() - inicio, 3)
+
+
+class TestRepreciarProductos(TestCase):
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre="Laptops", descripcion="")
+        Producto.objects.bulk_create(
+            Producto(
+                nombre=f"Producto {i}",
+                descripcion="",
+                precio_dolares=Decimal(i),
+                precio_bolivares=Decimal(i) * 10,
+                categoria=categoria,
+            )
+            for i in range(1, 11)
+        )
+
+    def test_un_solo_update(self):
+        with self.assertNumQueries(4):
+            resumen = precio_dolar.repreciar_productos(Decimal("36.5"))
+        self.assertEqual(resumen["filas"], 10)
+        self.assertEqual(resumen["delta_min"], Decimal("26.50"))
+        self.assertEqual(resumen["delta_max"], Decimal("265.00"))
+        producto = Producto.objects.get(nombre="Producto 3")
+        self.assertEqual(producto.precio_bolivares, Decimal("109.50"))
+
+    def test_por_lotes_y_sin_cambios(self):
+        resumen = precio_dolar.repreciar_productos(Decimal("36.5"), tamano_lote=3)
+        self.assertEqual(resumen["filas"], 10)
+        resumen = precio_dolar.repreciar_productos(Decimal("36.5"), tamano_lote=3)
+        self.assertEqual(resumen["filas"], 0)
+
+
+@override_settings(PRECIOS_BS_EN_LECTURA=True)
+class TestPrecioBolivaresEnLectura(TestCase):
+    def setUp(self):
+        precio_dolar.invalidar_tasa()
+        categoria = Categoria.objects.create(nombre="Laptops", descripcion="")
+        Producto.objects.create(
+            nombre="Laptop",
+            descripcion="",
+            precio_dolares=Decimal("10"),
+            precio_bolivares=Decimal("1"),
+            categoria=categoria,
+        )
+
+    def tearDown(self):
+        precio_dolar.invalidar_tasa()
+
+    def test_precio_calculado_con_la_ultima_tasa(self):
+        TasaCambio.objects.create(tasa=Decimal("36.5"))
+        productos = precio_dolar.anotar_precio_bolivares(Producto.objects.all())
+        self.assertEqual(
+            ProductoSerializer(productos[0]).data["precio_bolivares"], "365.00"
+        )
+
+    def test_actualizar_precios_no_reescribe_el_catalogo(self):
+        with patch(
+            "productos.precio_dolar.consultar_monitor", return_value=Decimal("40")
+        ):
+            precio_dolar.actualizar_precios()
+        self.assertEqual(TasaCambio.objects.get().tasa, Decimal("40"))
+        self.assertEqual(Producto.objects.get().precio_bolivares, Decimal("1"))
+
+
+class TestVerProductos(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="admin", password="clave123")
+        )
+        laptops = Categoria.objects.create(nombre="Laptops", descripcion="")
+        mouses = Categoria.objects.create(nombre="Mouses", descripcion="")
+        Producto.objects.bulk_create(
+            Producto(
+                nombre=f"Producto {i}",
+                descripcion="",
+                precio_dolares=Decimal(i),
+                cantidad_en_stock=i % 3,
+                categoria=laptops if i % 2 else mouses,
+            )
+            for i in range(1, 26)
+        )
+
+    def test_recorre_todas_las_paginas_con_consultas_constantes(self):
+        vistos = []
+        url = "/api/productos/?limit=10"
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            vistos += [p["id"] for p in response.data["productos"]]
+            cursor = response.data["siguiente_cursor"]
+            url = f"/api/productos/?limit=10&cursor={cursor}" if cursor else None
+        self.assertEqual(vistos, sorted(Producto.objects.values_list("id", flat=True)))
+
+    def test_filtros_y_total_opcional(self):
+        categoria = Categoria.objects.get(nombre="Laptops")
+        response = self.client.get(
+            "/api/productos/",
+            {
+                "categoria": categoria.id,
+                "stock_min": 1,
+                "precio_min": 5,
+                "precio_max": 20,
+                "total": "true",
+            },
+        )
+        esperados = Producto.objects.filter(
+            categoria=categoria,
+            cantidad_en_stock__gte=1,
+            precio_dolares__gte=5,
+            precio_dolares__lte=20,
+        )
+        self.assertEqual(response.data["total"], esperados.count())
+        self.assertEqual(
+            [p["nombre"] for p in response.data["productos"]],
+            [p.nombre for p in esperados.order_by("id")],
+        )
+        self.assertNotIn("total", self.client.get("/api/productos/").data)
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get("/api/productos/?limit=x").status_code, 400)
+        self.assertEqual(
+            self.client.get("/api/productos/?cursor=no-es-cursor").status_code, 400
+        )
+
+
+class TestVerCategorias(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="admin", password="clave123")
+        )
+        self.laptops = Categoria.objects.create(nombre="Laptops", descripcion="")
+        self.vacia = Categoria.objects.create(nombre="Vacia", descripcion="")
+        Producto.objects.bulk_create(
+            Producto(
+                nombre=f"Laptop {i}",
+                descripcion="",
+                precio_dolares=Decimal(100),
+                cantidad_en_stock=i,
+                categoria=self.laptops,
+            )
+            for i in range(1, 6)
+        )
+
+    def test_listado_con_totales_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/categorias/")
+        laptops, vacia = response.data["categorias"]
+        self.assertEqual(laptops["cantidad_productos"], 5)
+        self.assertEqual(laptops["stock_total"], 15)
+        self.assertEqual(vacia["cantidad_productos"], 0)
+        self.assertEqual(vacia["stock_total"], 0)
+
+    def test_detalle_paginado_con_consultas_constantes(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/categoria/{self.laptops.id}/?limit=2")
+        self.assertEqual(len(response.data["categoria"]["productos"]), 2)
+        self.assertIsNotNone(response.data["siguiente_cursor"])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/categoria/{self.vacia.id}/")
+        self.assertEqual(
+            response.data["categoria"]["productos"], "no hay ningun producto todavia"
+        )
+
+
+class TestVerSeriales(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="admin", password="clave123")
+        )
+        categoria = Categoria.objects.create(nombre="Laptops", descripcion="")
+        self.producto = Producto.objects.create(
+            nombre="Laptop",
+            descripcion="",
+            precio_dolares=Decimal(100),
+            cantidad_en_stock=30,
+            categoria=categoria,
+        )
+        Item.objects.bulk_create(
+            Item(producto=self.producto, numero_serial=f"SN-{i:03}") for i in range(30)
+        )
+
+    def test_producto_con_resumen_de_seriales(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/producto/{self.producto.id}/")
+        producto = response.data["producto"]
+        self.assertEqual(producto["cantidad_seriales"], 30)
+        self.assertEqual(
+            producto["url_seriales"], f"/api/producto/{self.producto.id}/seriales/"
+        )
+
+    def test_seriales_paginados(self):
+        url = f"/api/producto/{self.producto.id}/seriales/"
+        response = self.client.get(url, {"limit": 20})
+        self.assertEqual(response.data["total"], 30)
+        self.assertEqual(response.data["seriales"][0], "SN-000")
+        self.assertEqual(len(response.data["seriales"]), 20)
+        response = self.client.get(
+            url, {"limit": 20, "cursor": response.data["siguiente_cursor"]}
+        )
+        self.assertEqual(response.data["seriales"][-1], "SN-029")
+        self.assertIsNone(response.data["siguiente_cursor"])
+
+    def test_seriales_por_estado(self):
+        Item.objects.filter(numero_serial__in=["SN-000", "SN-001"]).update(
+            estado=Item.VENDIDO
+        )
+        url = f"/api/producto/{self.producto.id}/seriales/"
+        self.assertEqual(self.client.get(url).data["total"], 28)
+        response = self.client.get(url, {"estado": "vendido"})
+        self.assertEqual(response.data["seriales"], ["SN-000", "SN-001"])
+        self.assertEqual(self.client.get(url, {"estado": "otro"}).status_code, 400)
+        producto = self.client.get(f"/api/producto/{self.producto.id}/").data
+        self.assertEqual(producto["producto"]["cantidad_seriales"], 28)
+
+    def test_producto_inexistente(self):
+        self.assertEqual(
+            self.client.get("/api/producto/999/seriales/").status_code, 404
+        )
+
+
+class TestCargarSeriales(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="admin", password="clave123")
+        )
+        categoria = Categoria.objects.create(nombre="Laptops", descripcion="")
+        self.producto = Producto.objects.create(
+            nombre="Laptop",
+            descripcion="",
+            precio_dolares=Decimal(100),
+            cantidad_en_stock=1,
+            categoria=categoria,
+        )
+        Item.objects.create(producto=self.producto, numero_serial="SN-EXISTE")
+        self.url = f"/api/producto/{self.producto.id}/cargar_seriales/"
+
+    def test_carga_json_con_rechazos(self):
+        seriales = [f"SN-{i}" for i in range(2500)] + [
+            "SN-EXISTE",
+            "SN-1",
+            " ",
+            "X" * 31,
+        ]
+        # Por cada lote de 1000: una consulta de existentes y el bulk_create
+        # (que SQLite parte según su límite de parámetros).
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(self.url, {"seriales": seriales}, format="json")
+        self.assertLess(len(consultas), 25)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["creados"], 2500)
+        self.assertEqual(
+            [r["fila"] for r in response.data["rechazados"]], [2501, 2502, 2503, 2504]
+        )
+        self.assertEqual(response.data["cantidad_en_stock"], 2501)
+        self.assertEqual(Item.objects.filter(producto=self.producto).count(), 2501)
+
+    def test_carga_csv(self):
+        archivo = SimpleUploadedFile(
+            "seriales.csv", b"numero_serial\nSN-A\nSN-B\nSN-EXISTE\n", "text/csv"
+        )
+        response = self.client.post(self.url, {"archivo": archivo}, format="multipart")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["creados"], 2)
+        self.assertEqual(response.data["rechazados"][0]["numero_serial"], "SN-EXISTE")
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.cantidad_en_stock, 3)
+
+    def test_rechaza_seriales_vendidos(self):
+        cliente = Cliente.objects.create(
+            nombre="Juan", apellido="Pérez", correo="juan@example.com"
+        )
+        factura = Factura.objects.create(
+            cliente=cliente, metodo_pago="dolares", subtotal=100, total=116
+        )
+        detalle = DetalleFactura.objects.create(
+            factura=factura,
+            producto=self.producto,
+            cantidad=1,
+            precio_unitario=100,
+            total_producto=100,
+            seriales=["SN-VENDIDO"],
+        )
+        SerialVendido.objects.create(
+            numero_serial="SN-VENDIDO", detalle=detalle, factura=factura
+        )
+
+        response = self.client.post(
+            self.url, {"seriales": ["SN-A", "SN-VENDIDO"]}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["creados"], 1)
+        self.assertEqual(
+            response.data["rechazados"],
+            [
+                {
+                    "fila": 2,
+                    "numero_serial": "SN-VENDIDO",
+                    "motivo": "El serial ya fue vendido",
+                }
+            ],
+        )
+
+        response = self.client.post(
+            "/api/crear_item/",
+            {"producto_id": self.producto.id, "numero_serial": "SN-VENDIDO"},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Item.objects.filter(numero_serial="SN-VENDIDO").exists())
+
+        with patch("productos.precio_dolar._refrescar_en_segundo_plano"):
+            response = self.client.post(
+                "/api/crear_producto/",
+                {
+                    "nombre": "Laptop nueva",
+                    "descripcion": "Con un serial ya vendido",
+                    "precio_dolares": "100.00",
+                    "categoria": "Laptops",
+                    "seriales": [
+                        {"numero_serial": "SN-NUEVO"},
+                        {"numero_serial": "SN-VENDIDO"},
+                    ],
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("SN-VENDIDO", response.data["mensaje_de_error"])
+        self.assertFalse(Producto.objects.filter(nombre="Laptop nueva").exists())
+        self.assertFalse(Item.objects.filter(numero_serial="SN-NUEVO").exists())
+
+
+class TestStockAtomico(TestCase):
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre="Laptops", descripcion="")
+        self.a, self.b = Producto.objects.bulk_create(
+            Producto(
+                nombre=nombre,
+                descripcion="",
+                precio_dolares=Decimal(100),
+                cantidad_en_stock=5,
+                categoria=categoria,
+            )
+            for nombre in ("A", "B")
+        )
+
+    def stock(self, producto):
+        producto.refresh_from_db()
+        return producto.cantidad_en_stock
+
+    def test_descontar_varios_productos_en_un_update(self):
+        with self.assertNumQueries(4):  # SAVEPOINT, FOR UPDATE, UPDATE, RELEASE
+            self.assertTrue(
+                Producto.objects.descontar_stock({self.a.id: 2, self.b.id: 5})
+            )
+        self.assertEqual((self.stock(self.a), self.stock(self.b)), (3, 0))
+
+    def test_sin_stock_suficiente_no_descuenta_nada(self):
+        self.assertFalse(Producto.objects.descontar_stock({self.a.id: 2, self.b.id: 6}))
+        self.assertEqual((self.stock(self.a), self.stock(self.b)), (5, 5))
+
+    def test_sumar_stock(self):
+        Producto.objects.sumar_stock(self.a.id, 3)
+        self.assertEqual(self.stock(self.a), 8)
+
+
+class TestReferenciaProducto(TestCase):
+    def setUp(self):
+        refresco = patch("productos.precio_dolar._refrescar_en_segundo_plano")
+        refresco.start()
+        self.addCleanup(refresco.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="admin", password="clave123")
+        )
+        self.categoria = Categoria.objects.create(nombre="Laptops", descripcion="")
+        self.producto = Producto.objects.create(
+            nombre="Laptop",
+            sku="LAP-001",
+            descripcion="",
+            precio_dolares=Decimal(100),
+            categoria=self.categoria,
+        )
+
+    def test_crear_item_por_id_sku_o_nombre(self):
+        for i, referencia in enumerate(
+            [
+                {"producto_id": self.producto.id},
+                {"sku": "LAP-001"},
+                {"producto": "Laptop"},
+            ]
+        ):
+            response = self.client.post(
+                "/api/crear_item/", {**referencia, "numero_serial": f"SN-{i}"}
+            )
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.data["cantidad_en_stock"], i + 1)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.cantidad_en_stock, 3)
+
+    def test_nombres_unicos(self):
+        response = self.client.post(
+            "/api/crear_categoria/", {"nombre": "Laptops", "descripcion": ""}
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.put(
+            f"/api/editar_producto/{self.producto.id}/", {"sku": ""}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.producto.refresh_from_db()
+        self.assertIsNone(self.producto.sku)
+
+
+class TestBuscarProductos(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="admin", password="clave123")
+        )
+        categoria = Categoria.objects.create(nombre="Computación", descripcion="")
+        for nombre, descripcion in [
+            ("Laptop HP Pavilion", "Portátil de 15 pulgadas"),
+            ("Mouse inalámbrico", "Compatible con laptop HP"),
+            ("Monitor Dell", "Pantalla de 24 pulgadas"),
+        ]:
+            Producto.objects.create(
+                nombre=nombre,
+                descripcion=descripcion,
+                precio_dolares=Decimal(100),
+                categoria=categoria,
+            )
+
+    def buscar(self, **params):
+        response = self.client.get("/api/productos/buscar/", params)
+        self.assertEqual(response.status_code, 200)
+        return [p["nombre"] for p in response.data["productos"]]
+
+    def test_ranking_por_nombre_y_descripcion(self):
+        self.assertEqual(
+            self.buscar(q="laptop hp"), ["Laptop HP Pavilion", "Mouse inalámbrico"]
+        )
+        self.assertCountEqual(
+            self.buscar(q="pulg"), ["Laptop HP Pavilion", "Monitor Dell"]
+        )
+
+    def test_paginado(self):
+        response = self.client.get(
+            "/api/productos/buscar/", {"q": "pulgadas", "limit": 1}
+        )
+        cursor = response.data["siguiente_cursor"]
+        self.assertEqual(
+            len(self.buscar(q="pulgadas", limit=1))
+            + len(self.buscar(q="pulgadas", cursor=cursor)),
+            2,
+        )
+
+    def test_paginado_con_rangos_empatados(self):
+        # Productos idénticos empatan en rango: el corte de página cae en
+        # medio del empate y el cursor debe continuar por id sin saltar ni
+        # repetir filas.
+        categoria = Categoria.objects.get(nombre="Computación")
+        esperados = [
+            Producto.objects.create(
+                nombre=f"Cable USB {i}",
+                descripcion="Cable de carga",
+                precio_dolares=Decimal(5),
+                categoria=categoria,
+            ).id
+            for i in range(5)
+        ]
+        vistos = []
+        cursor = None
+        while True:
+            params = {"q": "cable", "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get("/api/productos/buscar/", params)
+            self.assertEqual(response.status_code, 200)
+            vistos += [p["id"] for p in response.data["productos"]]
+            cursor = response.data["siguiente_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(vistos, esperados)
+
+    def test_indice_sigue_los_cambios(self):
+        producto = Producto.objects.get(nombre="Monitor Dell")
+        producto.nombre = "Monitor Samsung"
+        producto.save()
+        self.assertEqual(self.buscar(q="dell"), [])
+        self.assertEqual(self.buscar(q="samsung"), ["Monitor Samsung"])
+        producto.delete()
+        self.assertEqual(self.buscar(q="samsung"), [])
+
+    def test_requiere_q(self):
+        self.assertEqual(self.client.get("/api/productos/buscar/").status_code, 400)
+
+    def test_indice_despues_de_todas_las_migraciones(self):
+        # La BD de pruebas se crea con todas las migraciones: si una posterior
+        # reconstruye productos_producto sin recrear los triggers, un producto
+        # nuevo no aparece en la búsqueda.
+        producto = Producto.objects.create(
+            nombre="Teclado mecánico",
+            descripcion="Switches rojos",
+            precio_dolares=Decimal(50),
+            categoria=Categoria.objects.get(),
+        )
+        self.assertEqual(list(buscar_productos("teclado")), [producto])
+        self.assertEqual(list(buscar_productos("switches")), [producto])
+
+
+class TestReservas(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="cajero", password="clave123")
+        )
+        categoria = Categoria.objects.create(nombre="Laptops", descripcion="")
+        self.producto = Producto.objects.create(
+            nombre="Laptop",
+            descripcion="",
+            precio_dolares=Decimal(100),
+            cantidad_en_stock=5,
+            categoria=categoria,
+        )
+        Item.objects.bulk_create(
+            Item(producto=self.producto, numero_serial=f"SN-{i}") for i in range(5)
+        )
+
+    def reservar(self, sesion, seriales, **extra):
+        return self.client.post(
+            "/api/crear_reserva/",
+            {"sesion": sesion, "seriales": seriales, **extra},
+            format="json",
+        )
+
+    def test_reserva_y_rechazos(self):
+        response = self.reservar("caja-1", ["SN-0", "SN-1", "NO-EXISTE"])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["reservados"], ["SN-0", "SN-1"])
+        self.assertEqual(response.data["rechazados"][0]["serial"], "NO-EXISTE")
+
+        response = self.reservar("caja-2", ["SN-1", "SN-2"])
+        self.assertEqual(response.data["reservados"], ["SN-2"])
+        self.assertEqual(response.data["rechazados"][0]["serial"], "SN-1")
+        self.assertEqual(self.reservar("caja-1", ["SN-0"], ttl="abc").status_code, 400)
+
+    def test_consultas_no_dependen_del_tamano_del_carrito(self):
+        Item.objects.bulk_create(
+            Item(producto=self.producto, numero_serial=f"X-{i}") for i in range(50)
+        )
+        with CaptureQueriesContext(connection) as una:
+            self.reservar("caja-1", ["SN-0"])
+        with CaptureQueriesContext(connection) as cincuenta:
+            self.reservar("caja-2", [f"X-{i}" for i in range(50)])
+        self.assertEqual(len(una), len(cincuenta))
+
+    def test_renovar_y_reemplazar_vencidas(self):
+        self.reservar("caja-1", ["SN-0"], ttl=60)
+        Reserva.objects.update(expira_en=timezone.now() - timedelta(seconds=1))
+        response = self.reservar("caja-2", ["SN-0"])
+        self.assertEqual(response.data["reservados"], ["SN-0"])
+        self.assertEqual(Reserva.objects.get().sesion, "caja-2")
+
+        anterior = Reserva.objects.get().expira_en
+        self.reservar("caja-2", ["SN-0"], ttl=10**6)
+        self.assertGreater(Reserva.objects.get().expira_en, anterior)
+
+    def test_liberar_y_barrer_vencidas(self):
+        self.reservar("caja-1", ["SN-0", "SN-1"])
+        self.reservar("caja-2", ["SN-2", "SN-3"])
+        response = self.client.delete(
+            "/api/borrar_reserva/caja-1/", {"seriales": ["SN-0"]}, format="json"
+        )
+        self.assertEqual(response.data["liberadas"], 1)
+
+        Reserva.objects.filter(sesion="caja-2").update(
+            expira_en=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(Item.objects.get(numero_serial="SN-2").estado, Item.RESERVADO)
+        self.assertEqual(reservas.borrar_reservas_vencidas(), 2)
+        self.assertEqual(
+            sorted(
+                Item.objects.filter(estado=Item.DISPONIBLE).values_list(
+                    "numero_serial", flat=True
+                )
+            ),
+            ["SN-0", "SN-2", "SN-3", "SN-4"],
+        )
+        self.assertEqual(
+            list(Reserva.objects.values_list("item__numero_serial", flat=True)),
+            ["SN-1"],
+        )
+
+    def test_producto_muestra_reservados_y_disponibles(self):
+        self.reservar("caja-1", ["SN-0", "SN-1"])
+        Reserva.objects.filter(item__numero_serial="SN-1").update(
+            expira_en=timezone.now() - timedelta(seconds=1)
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/producto/{self.producto.id}/")
+        producto = response.data["producto"]
+        self.assertEqual(producto["cantidad_reservados"], 1)
+        self.assertEqual(producto["cantidad_disponibles"], 4)
+
+
+class TestBorradoEnSegundoPlano(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="admin", password="clave123")
+        )
+        self.categoria = Categoria.objects.create(nombre="Laptops", descripcion="")
+        self.otra = Categoria.objects.create(nombre="Otra", descripcion="")
+        self.productos = Producto.objects.bulk_create(
+            Producto(
+                nombre=f"Laptop {i}",
+                sku=f"LAP-{i}",
+                descripcion="",
+                precio_dolares=Decimal(100),
+                categoria=self.otra if i == 4 else self.categoria,
+            )
+            for i in range(5)
+        )
+        Item.objects.bulk_create(
+            Item(producto=producto, numero_serial=f"SN-{producto.id}-{j}")
+            for producto in self.productos
+            for j in range(3)
+        )
+        cliente = Cliente.objects.create(
+            nombre="Juan",
+            apellido="Pérez",
+            correo="juan@example.com",
+            direccion="",
+            telefono="",
+        )
+        factura = Factura.objects.create(
+            cliente=cliente, metodo_pago="dolares", subtotal=100, total=116
+        )
+        self.detalle = DetalleFactura.objects.create(
+            factura=factura,
+            producto=self.productos[0],
+            cantidad=1,
+            precio_unitario=100,
+            total_producto=100,
+            seriales=[f"SN-{self.productos[0].id}-0"],
+        )
+        # Un serial de otra categoría apunta a la línea (SET_NULL).
+        Item.objects.filter(producto=self.productos[4]).update(detalle=self.detalle)
+
+    def test_se_oculta_al_instante_y_se_borra_por_lotes(self):
+        response = self.client.delete(f"/api/borrar_categoria/{self.categoria.id}/")
+        self.assertEqual(response.status_code, 202)
+        tarea_id = response.data["tarea_borrado"]
+
+        # Oculta con sus productos, y el nombre ya se puede reutilizar.
+        self.assertFalse(Categoria.objects.filter(id=self.categoria.id).exists())
+        self.assertEqual(Producto.objects.count(), 1)
+        self.assertEqual(
+            self.client.get(f"/api/producto/{self.productos[0].id}/").status_code, 404
+        )
+        Categoria.objects.create(nombre="Laptops", descripcion="")
+        self.assertEqual(
+            self.client.get(f"/api/borrado/{tarea_id}/").data["estado"], "pendiente"
+        )
+        # También los nombres y sku de sus productos.
+        with patch("productos.precio_dolar._refrescar_en_segundo_plano"):
+            response = self.client.post(
+                "/api/crear_producto/",
+                {
+                    "nombre": "Laptop 0",
+                    "sku": "LAP-0",
+                    "descripcion": "Nueva",
+                    "precio_dolares": "100.00",
+                    "categoria": "Laptops",
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        oculto = Producto._base_manager.get(id=self.productos[1].id)
+        self.assertEqual(oculto.nombre, f"Laptop 1 (borrado {oculto.id})")
+        self.assertIsNone(oculto.sku)
+
+        call_command("procesar_borrados", "--tamano-lote", "2", stdout=StringIO())
+        tarea = TareaBorrado.objects.get(id=tarea_id)
+        self.assertEqual(tarea.estado, TareaBorrado.TERMINADA)
+        self.assertEqual(
+            tarea.detalle,
+            {
+                "productos.Categoria": 1,
+                "productos.Producto": 4,
+                "productos.Item": 12,
+                "facturas_y_reportes.DetalleFactura": 1,
+            },
+        )
+        self.assertEqual(tarea.filas_borradas, 18)
+        self.assertFalse(Categoria._base_manager.filter(id=self.categoria.id).exists())
+        self.assertEqual(Item.objects.count(), 3)
+        self.assertFalse(Item.objects.filter(detalle__isnull=False).exists())
+        self.assertEqual(self.client.get(f"/api/borrado/{tarea_id}/").status_code, 200)
+
+    def test_producto_y_reintento(self):
+        response = self.client.delete(f"/api/borrar_producto/{self.productos[1].id}/")
+        self.assertEqual(response.status_code, 202)
+        self.assertIsNone(Producto._base_manager.get(id=self.productos[1].id).sku)
+        self.assertEqual(
+            self.client.delete(
+                f"/api/borrar_producto/{self.productos[1].id}/"
+            ).status_code,
+            404,
+        )
+        categorias = self.client.get("/api/categorias/").data["categorias"]
+        self.assertEqual(categorias[0]["cantidad_productos"], 3)
+        # Sus seriales ya no se pueden apartar ni vender.
+        serial = f"SN-{self.productos[1].id}-0"
+        self.assertFalse(Item.objects.en_stock().filter(numero_serial=serial).exists())
+        reservados, rechazados, _ = reservas.reservar_seriales("caja-1", [serial])
+        self.assertEqual((reservados, len(rechazados)), ([], 1))
+
+        with patch(
+            "django.db.models.query.QuerySet.delete", side_effect=RuntimeError("caída")
+        ):
+            (tarea,) = borrado.procesar_borrados()
+        self.assertEqual((tarea.estado, tarea.error), (TareaBorrado.ERROR, "caída"))
+        self.assertEqual(borrado.procesar_borrados(), [])
+
+        salida = StringIO()
+        call_command("procesar_borrados", "--reintentar", stdout=salida)
+        self.assertIn("terminado", salida.getvalue())
+        self.assertFalse(
+            Producto._base_manager.filter(id=self.productos[1].id).exists()
+        )
@@ -4,25 +4,29 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.core.exceptions import ValidationError
-from django.db import transaction
-from .models import Categoria, Producto, Item
-from .serializers import CategoriaSerializer, ProductoSerializer, ItemSerializer
-from pyDolarVenezuela.pages import AlCambio
-from pyDolarVenezuela import Monitor
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.urls import reverse
+from django.utils import timezone
+from .models import Categoria, Producto, Item, TareaBorrado, referencia_producto
+from .serializers import (
+    CategoriaSerializer,
+    CategoriaConTotalesSerializer,
+    ProductoSerializer,
+    ItemSerializer,
+)
+from .borrado import encolar_borrado
+from .busqueda import buscar_productos
+from .carga_seriales import cargar_seriales, leer_seriales_csv, seriales_vendidos
+from .precio_dolar import anotar_precio_bolivares, obtener_precio_dolar
+from .reservas import liberar_reservas, reservar_seriales
 from decimal import Decimal
-
-
-def obtener_precio_dolar():
-    try:
-        monitor = Monitor(AlCambio, "USD")
-        bcv = monitor.get_value_monitors("bcv")
-        if bcv is None:
-            raise ValueError("No se pudo obtener el valor del dólar desde el monitor.")
-        precio_dolar = bcv.price
-        return precio_dolar
-    except Exception as e:
-        print(f"Error al obtener el precio del dólar: {e}")
-        return None
+from sistema_negocio_api.paginacion import (
+    ParametroInvalido,
+    leer_parametro,
+    paginar_por_cursor,
+    respuesta_paginada,
+)
 
 
 class VerCategorias(APIView):
@@ -31,8 +35,8 @@ class VerCategorias(APIView):
 
     def get(self, request):
         try:
-            categorias = Categoria.objects.all()
-            serializer = CategoriaSerializer(categorias, many=True)
+            categorias = Categoria.objects.con_totales().order_by("id")
+            serializer = CategoriaConTotalesSerializer(categorias, many=True)
             return Response({"categorias": serializer.data}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
@@ -50,17 +54,30 @@ class VerCategoria(APIView):
 
     def get(self, request, id):
         try:
-            categoria = Categoria.objects.get(id=id)
-            serializer = CategoriaSerializer(categoria, many=False)
-            productos = Producto.objects.filter(categoria=categoria)
-            categoria_data = serializer.data
-            productos_data = ProductoSerializer(productos, many=True).data
+            categoria = Categoria.objects.con_totales().get(id=id)
+            categoria_data = CategoriaConTotalesSerializer(categoria).data
 
-            if not productos or len(productos_data) == 0:
+            if categoria.cantidad_productos == 0:
                 categoria_data["productos"] = "no hay ningun producto todavia"
-            else:
-                categoria_data["productos"] = productos_data
-            return Response({"categoria": categoria_data}, status=status.HTTP_200_OK)
+                return Response(
+                    {"categoria": categoria_data}, status=status.HTTP_200_OK
+                )
+
+            productos = anotar_precio_bolivares(
+                Producto.objects.filter(categoria=categoria).select_related("categoria")
+            )
+            productos, siguiente_cursor, total = paginar_por_cursor(productos, request)
+            categoria_data["productos"] = ProductoSerializer(productos, many=True).data
+            return Response(
+                respuesta_paginada(
+                    "categoria", categoria_data, siguiente_cursor, total
+                ),
+                status=status.HTTP_200_OK,
+            )
+        except ParametroInvalido as e:
+            return Response(
+                {"mensaje_de_error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
         except Categoria.DoesNotExist:
             return Response(
                 {"mensaje_de_error": "El producto no existe"},
@@ -132,10 +149,19 @@ class BorrarCategoria(APIView):
     def delete(self, request, id):
         try:
             categoria = Categoria.objects.get(id=id)
-            categoria.delete()
+            # Se oculta ya y sus dependientes se borran por lotes en segundo plano.
+            tarea = encolar_borrado(categoria)
             return Response(
-                {"mensaje": "La categoria ha sido borrada correctamente"},
-                status=status.HTTP_204_NO_CONTENT,
+                {
+                    "mensaje": "La categoria se está borrando",
+                    "tarea_borrado": tarea.id,
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
+        except Categoria.DoesNotExist:
+            return Response(
+                {"mensaje_de_error": "La categoria no existe"},
+                status=status.HTTP_404_NOT_FOUND,
             )
         except Exception as e:
             return Response(
@@ -150,9 +176,35 @@ class VerProductos(APIView):
 
     def get(self, request):
         try:
-            productos = Producto.objects.all()
+            productos = anotar_precio_bolivares(
+                Producto.objects.select_related("categoria")
+            )
+
+            categoria = leer_parametro(request, "categoria", int)
+            if categoria is not None:
+                productos = productos.filter(categoria_id=categoria)
+            stock_min = leer_parametro(request, "stock_min", int)
+            if stock_min is not None:
+                productos = productos.filter(cantidad_en_stock__gte=stock_min)
+            precio_min = leer_parametro(request, "precio_min", Decimal)
+            if precio_min is not None:
+                productos = productos.filter(precio_dolares__gte=precio_min)
+            precio_max = leer_parametro(request, "precio_max", Decimal)
+            if precio_max is not None:
+                productos = productos.filter(precio_dolares__lte=precio_max)
+
+            productos, siguiente_cursor, total = paginar_por_cursor(productos, request)
             serializer = ProductoSerializer(productos, many=True)
-            return Response({"productos": serializer.data}, status=status.HTTP_200_OK)
+            return Response(
+                respuesta_paginada(
+                    "productos", serializer.data, siguiente_cursor, total
+                ),
+                status=status.HTTP_200_OK,
+            )
+        except ParametroInvalido as e:
+            return Response(
+                {"mensaje_de_error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {
@@ -163,21 +215,72 @@ class VerProductos(APIView):
             )
 
 
+class BuscarProductos(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request):
+        try:
+            texto = request.query_params.get("q", "").strip()
+            if not texto:
+                return Response(
+                    {"mensaje_de_error": "Se requiere el parámetro q"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            productos = anotar_precio_bolivares(
+                buscar_productos(texto).select_related("categoria")
+            )
+            productos, siguiente_cursor, total = paginar_por_cursor(
+                productos, request, orden=("-rango", "id")
+            )
+            serializer = ProductoSerializer(productos, many=True)
+            return Response(
+                respuesta_paginada(
+                    "productos", serializer.data, siguiente_cursor, total
+                ),
+                status=status.HTTP_200_OK,
+            )
+        except ParametroInvalido as e:
+            return Response(
+                {"mensaje_de_error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {
+                    "mensaje_de_error": "No se pudo realizar la búsqueda",
+                    "excepcion": str(e),
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
 class VerProducto(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
 
     def get(self, request, id):
         try:
-            producto = Producto.objects.get(id=id)
+            producto = (
+                anotar_precio_bolivares(Producto.objects.select_related("categoria"))
+                .annotate(
+                    cantidad_seriales=Count(
+                        "item", filter=Q(item__estado__in=Item.EN_STOCK)
+                    ),
+                    cantidad_reservados=Count(
+                        "item__reserva",
+                        filter=Q(item__reserva__expira_en__gt=timezone.now()),
+                    ),
+                )
+                .get(id=id)
+            )
             producto_data = ProductoSerializer(producto).data
-            seriales = Item.objects.filter(producto=producto)
-            seriales_data = ItemSerializer(seriales, many=True).data
-
-            if seriales_data:
-                producto_data["seriales"] = seriales_data
-            else:
-                producto_data["seriales"] = "No hay ningún serial todavía"
+            # Los seriales se listan paginados en /api/producto/<id>/seriales/
+            producto_data["cantidad_seriales"] = producto.cantidad_seriales
+            producto_data["cantidad_reservados"] = producto.cantidad_reservados
+            producto_data["cantidad_disponibles"] = (
+                producto.cantidad_seriales - producto.cantidad_reservados
+            )
+            producto_data["url_seriales"] = reverse("ver_seriales", args=[producto.id])
             return Response({"producto": producto_data}, status=status.HTTP_200_OK)
 
         except Producto.DoesNotExist:
@@ -196,6 +299,54 @@ class VerProducto(APIView):
             )
 
 
+class VerSeriales(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request, id):
+        try:
+            if not Producto.objects.filter(id=id).exists():
+                raise Producto.DoesNotExist
+            # Por defecto solo los disponibles (índice parcial item_en_stock_idx).
+            estado = leer_parametro(request, "estado", por_defecto=Item.DISPONIBLE)
+            if estado not in dict(Item.ESTADOS):
+                raise ParametroInvalido(f"Valor no válido para 'estado': {estado}")
+            items = Item.objects.filter(producto_id=id, estado=estado)
+            total = items.count()
+            items, siguiente_cursor, _ = paginar_por_cursor(
+                items.values("id", "numero_serial"), request, limite_maximo=5000
+            )
+            return Response(
+                respuesta_paginada(
+                    "seriales",
+                    [item["numero_serial"] for item in items],
+                    siguiente_cursor,
+                    total,
+                ),
+                status=status.HTTP_200_OK,
+            )
+
+        except ParametroInvalido as e:
+            return Response(
+                {"mensaje_de_error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        except Producto.DoesNotExist:
+            return Response(
+                {"mensaje_de_error": "El producto no existe"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        except Exception as e:
+            return Response(
+                {
+                    "mensaje_de_error": "Ha ocurrido un error al procesar la solicitud",
+                    "excepcion": str(e),
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
 class CrearProducto(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
@@ -205,6 +356,17 @@ class CrearProducto(APIView):
         try:
             data = request.data
             seriales_data = request.data.get("seriales", [])
+            vendidos = seriales_vendidos(
+                [s.get("numero_serial") for s in seriales_data if isinstance(s, dict)]
+            )
+            if vendidos:
+                return Response(
+                    {
+                        "mensaje_de_error": "Algunos seriales ya fueron vendidos: "
+                        + ", ".join(sorted(vendidos))
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
             categoria = Categoria.objects.get(nombre=data["categoria"])
             serializer = ProductoSerializer(data=data)
             if serializer.is_valid():
@@ -225,7 +387,7 @@ class CrearProducto(APIView):
                     raise ValidationError(seriales_serializer.errors)
 
             productos.cantidad_en_stock = len(seriales)
-            precio_dolar = obtener_precio_dolar()
+            precio_dolar = obtener_precio_dolar(esperar=False)
             if precio_dolar is not None:
                 productos.precio_bolivares = productos.precio_dolares * Decimal(
                     precio_dolar
@@ -261,12 +423,12 @@ class EditarProducto(APIView):
             serializer = ProductoSerializer(producto, data=data, partial=True)
             if serializer.is_valid():
                 serializer.save(categoria=categoria)
-                precio_dolar = obtener_precio_dolar()
+                precio_dolar = obtener_precio_dolar(esperar=False)
                 if precio_dolar is not None:
                     producto.precio_bolivares = producto.precio_dolares * Decimal(
                         precio_dolar
                     )
-                    producto.save()
+                    producto.save(update_fields=["precio_bolivares"])
                 return Response(
                     {"producto_editado": serializer.data}, status=status.HTTP_200_OK
                 )
@@ -289,10 +451,19 @@ class BorrarProducto(APIView):
     def delete(self, request, id):
         try:
             producto = Producto.objects.get(id=id)
-            producto.delete()
+            # Se oculta ya y sus dependientes se borran por lotes en segundo plano.
+            tarea = encolar_borrado(producto)
             return Response(
-                {"mensaje": "El producto ha sido borrado correctamente"},
-                status=status.HTTP_204_NO_CONTENT,
+                {
+                    "mensaje": "El producto se está borrando",
+                    "tarea_borrado": tarea.id,
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
+        except Producto.DoesNotExist:
+            return Response(
+                {"mensaje_de_error": "El producto no existe"},
+                status=status.HTTP_404_NOT_FOUND,
             )
         except Exception as e:
             return Response(
@@ -308,15 +479,19 @@ class CrearItem(APIView):
     def post(self, request):
         try:
             data = request.data
-            producto_nombre = data.get("producto")
+            referencia = referencia_producto(
+                data, campo_id="producto_id", campo_nombre="producto"
+            )
             serializer = ItemSerializer(data=data)
-            if not producto_nombre:
+            if referencia is None:
                 return Response(
-                    {"mensaje_de_error": "Se requiere el nombre del producto"},
+                    {
+                        "mensaje_de_error": "Se requiere el id, sku o nombre del producto"
+                    },
                     status=status.HTTP_400_BAD_REQUEST,
                 )
             try:
-                producto = Producto.objects.get(nombre=producto_nombre)
+                producto = Producto.objects.get(**referencia)
             except Producto.DoesNotExist:
                 return Response(
                     {"mensaje_de_error": "El producto no existe"},
@@ -324,18 +499,83 @@ class CrearItem(APIView):
                 )
 
             if serializer.is_valid():
-                item = Item(**serializer.validated_data, producto=producto)
-                item.save()
-                producto.cantidad_en_stock += 1
-                producto.save()
+                if seriales_vendidos([serializer.validated_data["numero_serial"]]):
+                    return Response(
+                        {"mensaje_de_error": "El serial ya fue vendido"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                with transaction.atomic():
+                    item = Item(**serializer.validated_data, producto=producto)
+                    item.save()
+                    Producto.objects.sumar_stock(producto.id, 1)
+                producto.refresh_from_db(fields=["cantidad_en_stock"])
             else:
                 raise ValidationError(serializer.errors)
 
             return Response(
-                {"item_creado": ItemSerializer(item).data},
+                {
+                    "item_creado": ItemSerializer(item).data,
+                    "cantidad_en_stock": producto.cantidad_en_stock,
+                },
+                status=status.HTTP_201_CREATED,
+            )
+
+        except Exception as e:
+            return Response(
+                {"mensaje_de_error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class CargarSeriales(APIView):
+    """
+    Carga masiva de seriales para un producto. Acepta JSON
+    ``{"seriales": [...]}`` o un archivo CSV en el campo ``archivo``.
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def post(self, request, id):
+        try:
+            producto = Producto.objects.get(id=id)
+            archivo = request.FILES.get("archivo")
+            if archivo is not None:
+                seriales = leer_seriales_csv(archivo.file)
+            else:
+                seriales = request.data.get("seriales")
+                if not isinstance(seriales, list) or not seriales:
+                    return Response(
+                        {"mensaje_de_error": "Se requiere una lista de seriales"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+
+            creados, rechazados = cargar_seriales(producto, seriales)
+            producto.refresh_from_db(fields=["cantidad_en_stock"])
+            return Response(
+                {
+                    "creados": creados,
+                    "rechazados": rechazados,
+                    "cantidad_en_stock": producto.cantidad_en_stock,
+                },
                 status=status.HTTP_201_CREATED,
             )
 
+        except Producto.DoesNotExist:
+            return Response(
+                {"mensaje_de_error": "El producto no existe"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        except IntegrityError:
+            # Otra carga registró alguno de los seriales al mismo tiempo.
+            return Response(
+                {
+                    "mensaje_de_error": "Algunos seriales fueron registrados por otra carga, intente de nuevo"
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+
         except Exception as e:
             return Response(
                 {"mensaje_de_error": str(e)},
@@ -381,12 +621,18 @@ class BorrarItem(APIView):
     def delete(self, request, id):
         try:
             item = Item.objects.get(id=id)
-            producto = item.producto
+            if item.estado == Item.VENDIDO:
+                return Response(
+                    {
+                        "mensaje_de_error": "El serial ya fue vendido, no se puede borrar"
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
             item.delete()
-            if producto.cantidad_en_stock > 0:
-                producto.cantidad_en_stock -= 1
-                producto.save()
-            else:
+            # Los devueltos sin reintegrar ya no cuentan en el stock.
+            if item.estado in Item.EN_STOCK and not Producto.objects.descontar_stock(
+                {item.producto_id: 1}
+            ):
                 return Response(
                     {"mensaje_de_error": "El stock ya es 0, no se puede reducir más"},
                     status=status.HTTP_400_BAD_REQUEST,
@@ -416,3 +662,118 @@ class BorrarItem(APIView):
                 {"mensaje_de_error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+class CrearReserva(APIView):
+    """
+    Aparta seriales para una sesión de caja mientras se arma el carrito:
+    ``{"sesion": "caja-1", "seriales": [...], "ttl": 900}``. El ttl es opcional
+    y en segundos. Repetir la petición renueva las reservas de la sesión.
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def post(self, request):
+        try:
+            sesion = str(request.data.get("sesion") or "").strip()
+            seriales = request.data.get("seriales")
+            if not sesion:
+                return Response(
+                    {"mensaje_de_error": "Se requiere la sesión de caja"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if not isinstance(seriales, list) or not seriales:
+                return Response(
+                    {"mensaje_de_error": "Se requiere una lista de seriales"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            reservados, rechazados, expira_en = reservar_seriales(
+                sesion, seriales, request.data.get("ttl")
+            )
+            return Response(
+                {
+                    "sesion": sesion,
+                    "reservados": reservados,
+                    "rechazados": rechazados,
+                    "expira_en": expira_en,
+                },
+                status=status.HTTP_201_CREATED,
+            )
+
+        except (TypeError, ValueError) as e:
+            return Response(
+                {"mensaje_de_error": f"ttl inválido: {e}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        except IntegrityError:
+            # Otra caja reservó alguno de los seriales al mismo tiempo.
+            return Response(
+                {
+                    "mensaje_de_error": "Algunos seriales fueron reservados por otra caja, intente de nuevo",
+                    "conflicto": "reservado",
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        except Exception as e:
+            return Response(
+                {"mensaje_de_error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class BorrarReserva(APIView):
+    """Libera las reservas de una sesión; ``seriales`` limita a algunos."""
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def delete(self, request, sesion):
+        try:
+            liberadas = liberar_reservas(sesion, request.data.get("seriales"))
+            return Response({"liberadas": liberadas}, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response(
+                {"mensaje_de_error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class VerBorrado(APIView):
+    """Avance de un borrado en segundo plano (BorrarCategoria, BorrarProducto, BorrarCliente)."""
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request, id):
+        try:
+            tarea = TareaBorrado.objects.get(id=id)
+            return Response(
+                {
+                    "id": tarea.id,
+                    "modelo": tarea.modelo,
+                    "objeto_id": tarea.objeto_id,
+                    "descripcion": tarea.descripcion,
+                    "estado": tarea.estado,
+                    "filas_borradas": tarea.filas_borradas,
+                    "detalle": tarea.detalle,
+                    "error": tarea.error or None,
+                    "fecha_creacion": tarea.fecha_creacion,
+                    "fecha_fin": tarea.fecha_fin,
+                },
+                status=status.HTTP_200_OK,
+            )
+        except TareaBorrado.DoesNotExist:
+            return Response(
+                {"mensaje_de_error": "El borrado no existe"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except Exception as e:
+            return Response(
+                {"mensaje_de_error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
@@ -0,0 +1,127 @@
+"""
+Paginación por cursor (keyset) compartida por las vistas de listado.
+
+El cursor es opaco para el cliente: codifica los valores de las columnas de
+orden del último elemento de la página, y la página siguiente se obtiene con
+``WHERE (orden) > (valores)`` sobre un índice en vez de un OFFSET.
+"""
+
+import base64
+import json
+from decimal import InvalidOperation
+
+from django.db.models import Q
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 500
+
+
+class ParametroInvalido(ValueError):
+    pass
+
+
+def leer_parametro(request, nombre, tipo=str, por_defecto=None):
+    """Lee un query param y lo convierte a ``tipo`` (int, Decimal, date...)."""
+    valor = request.query_params.get(nombre)
+    if valor in (None, ""):
+        return por_defecto
+    try:
+        return tipo(valor)
+    except (TypeError, ValueError, InvalidOperation):
+        raise ParametroInvalido(f"Valor no válido para '{nombre}': {valor}")
+
+
+def leer_booleano(request, nombre):
+    return request.query_params.get(nombre, "").lower() in ("1", "true", "si")
+
+
+def leer_campos(request, permitidos, por_defecto=None):
+    """
+    Lee ``?fields=a,b`` (campos a devolver) validando contra ``permitidos``.
+    Sin el parámetro retorna ``por_defecto`` (o todos los permitidos).
+    """
+    valor = request.query_params.get("fields")
+    if not valor:
+        return tuple(por_defecto or permitidos)
+    campos = tuple(dict.fromkeys(c.strip() for c in valor.split(",") if c.strip()))
+    desconocidos = [campo for campo in campos if campo not in permitidos]
+    if desconocidos or not campos:
+        raise ParametroInvalido(
+            f"Campos no válidos en 'fields': {', '.join(desconocidos) or valor}"
+        )
+    return campos
+
+
+def _codificar_cursor(valores):
+    texto = json.dumps(valores, default=str)
+    return base64.urlsafe_b64encode(texto.encode()).decode()
+
+
+def _decodificar_cursor(cursor, cantidad):
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ParametroInvalido("Cursor no válido")
+    if not isinstance(valores, list) or len(valores) != cantidad:
+        raise ParametroInvalido("Cursor no válido")
+    return valores
+
+
+def _filtro_keyset(orden, valores):
+    # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y)
+    filtro = Q()
+    iguales = Q()
+    for campo, valor in zip(orden, valores):
+        nombre = campo.lstrip("-")
+        operador = "lt" if campo.startswith("-") else "gt"
+        filtro |= iguales & Q(**{f"{nombre}__{operador}": valor})
+        iguales &= Q(**{nombre: valor})
+    return filtro
+
+
+def _valor(elemento, campo):
+    if isinstance(elemento, dict):
+        return elemento[campo]
+    return getattr(elemento, campo)
+
+
+def paginar_por_cursor(
+    queryset,
+    request,
+    orden=("id",),
+    limite_por_defecto=LIMITE_POR_DEFECTO,
+    limite_maximo=LIMITE_MAXIMO,
+):
+    """
+    Retorna ``(elementos, siguiente_cursor, total)`` para ``?cursor=&limit=``.
+
+    ``orden`` debe identificar cada fila de forma única (terminar en id).
+    ``total`` solo se calcula si se pide con ``?total=true``; si no, es None.
+    """
+    limite = leer_parametro(request, "limit", int, limite_por_defecto)
+    if limite < 1:
+        raise ParametroInvalido("'limit' debe ser mayor que 0")
+    limite = min(limite, limite_maximo)
+
+    total = queryset.count() if leer_booleano(request, "total") else None
+
+    cursor = request.query_params.get("cursor")
+    if cursor:
+        valores = _decodificar_cursor(cursor, len(orden))
+        queryset = queryset.filter(_filtro_keyset(orden, valores))
+
+    elementos = list(queryset.order_by(*orden)[: limite + 1])
+    siguiente_cursor = None
+    if len(elementos) > limite:
+        elementos = elementos[:limite]
+        siguiente_cursor = _codificar_cursor(
+            [_valor(elementos[-1], campo.lstrip("-")) for campo in orden]
+        )
+    return elementos, siguiente_cursor, total
+
+
+def respuesta_paginada(clave, datos, siguiente_cursor, total):
+    respuesta = {clave: datos, "siguiente_cursor": siguiente_cursor}
+    if total is not None:
+        respuesta["total"] = total
+    return respuesta
@@ -105,6 +105,21 @@ DATABASES = {
 
 DATABASES["default"] = DATABASES["dev" if DEBUG else "production"]
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# En producción se puede compartir entre workers, p. ej.
+# CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache y
+# CACHE_LOCATION=cache_negocio (requiere "python manage.py createcachetable").
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", "sistema_negocio_api"),
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -179,7 +194,39 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 CRONJOBS = [
     ("0 18 * * *", "productos.precio_dolar.actualizar_precios"),
+    ("*/5 * * * *", "productos.reservas.liberar_reservas_vencidas"),
+    ("* * * * *", "productos.borrado.borrar_pendientes"),
 ]
 CRONTAB_COMMAND_SUFFIX = "2>&1"
 
-DEEPSEEK_API_KEY = str(os.getenv("DEEPSEEK_API_KEY"))
\ No newline at end of file
+# Tasa del dólar (segundos): vigencia en cache, ventana en la que se sirve
+# vencida mientras se refresca en segundo plano y tiempo máximo de consulta.
+TASA_DOLAR_TTL = int(os.getenv("TASA_DOLAR_TTL", 60 * 60))
+TASA_DOLAR_STALE = int(os.getenv("TASA_DOLAR_STALE", 24 * 60 * 60))
+TASA_DOLAR_TIMEOUT = int(os.getenv("TASA_DOLAR_TIMEOUT", 5))
+
+# Si está activo, el precio en bolívares se calcula al consultar con la última
+# TasaCambio en vez de reescribir precio_bolivares en todo el catálogo.
+PRECIOS_BS_EN_LECTURA = os.getenv("PRECIOS_BS_EN_LECTURA", "False") == "True"
+
+# Bloqueo de seriales al facturar: "nowait" y "skip_locked" responden 409 de
+# inmediato si otra venta tiene los seriales; "espera" hace cola.
+FACTURA_BLOQUEO_SERIALES = os.getenv("FACTURA_BLOQUEO_SERIALES", "nowait")
+
+# Vigencia (segundos) de la representación cacheada de cada factura.
+FACTURA_CACHE_TTL = int(os.getenv("FACTURA_CACHE_TTL", 30 * 24 * 60 * 60))
+
+# Filas que se leen de la BD por vez al exportar facturas a CSV.
+EXPORTACION_TAMANO_LOTE = int(os.getenv("EXPORTACION_TAMANO_LOTE", 2000))
+
+# Filas por lote (y por transacción) en los borrados en segundo plano.
+BORRADO_TAMANO_LOTE = int(os.getenv("BORRADO_TAMANO_LOTE", 500))
+
+# Máximo de facturas por lote en la sincronización de cajas sin conexión.
+SINCRONIZACION_MAXIMO_FACTURAS = int(os.getenv("SINCRONIZACION_MAXIMO_FACTURAS", 500))
+
+# Reservas de seriales desde caja (segundos): duración por defecto y máxima.
+RESERVA_TTL = int(os.getenv("RESERVA_TTL", 15 * 60))
+RESERVA_TTL_MAXIMO = int(os.getenv("RESERVA_TTL_MAXIMO", 2 * 60 * 60))
+
+DEEPSEEK_API_KEY = str(os.getenv("DEEPSEEK_API_KEY"))
@@ -24,6 +24,8 @@ from rest_framework_simplejwt.views import (
 
 from clientes.views import (
     VerClientes,
+    BuscarClientes,
+    ImportarClientes,
     VerCliente,
     CrearCliente,
     EditarCliente,
@@ -37,24 +39,52 @@ from productos.views import (
     EditarCategoria,
     BorrarCategoria,
     VerProductos,
+    BuscarProductos,
     VerProducto,
+    VerSeriales,
     CrearProducto,
     EditarProducto,
     BorrarProducto,
     CrearItem,
+    CargarSeriales,
     EditarItem,
     BorrarItem,
+    CrearReserva,
+    BorrarReserva,
+    VerBorrado,
 )
 
-from facturas_y_reportes.views import CrearFactura, VerFacturas, VerFactura
+from facturas_y_reportes.views import (
+    CrearFactura,
+    SincronizarFacturas,
+    VerFacturas,
+    VerFacturasCliente,
+    VerFactura,
+    VerVentasPorDia,
+    VerVentasPorProducto,
+    ExportarFacturas,
+    BuscarSerialesVendidos,
+    DevolverSeriales,
+)
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("api/clientes/", VerClientes.as_view(), name="clientes"),
+    path("api/clientes/buscar/", BuscarClientes.as_view(), name="buscar_clientes"),
     path("api/cliente/<int:id>/", VerCliente.as_view(), name="ver_cliente"),
+    path(
+        "api/cliente/<int:id>/facturas/",
+        VerFacturasCliente.as_view(),
+        name="facturas_cliente",
+    ),
     path("api/crear_cliente/", CrearCliente.as_view(), name="crear_cliente"),
+    path(
+        "api/importar_clientes/",
+        ImportarClientes.as_view(),
+        name="importar_clientes",
+    ),
     path(
         "api/editar_cliente/<int:id>/", EditarCliente.as_view(), name="editar_cliente"
     ),
@@ -75,7 +105,17 @@ urlpatterns = [
         name="borrar_categoria",
     ),
     path("api/productos/", VerProductos.as_view(), name="productos"),
+    path(
+        "api/productos/buscar/",
+        BuscarProductos.as_view(),
+        name="buscar_productos",
+    ),
     path("api/producto/<int:id>/", VerProducto.as_view(), name="ver_producto"),
+    path(
+        "api/producto/<int:id>/seriales/",
+        VerSeriales.as_view(),
+        name="ver_seriales",
+    ),
     path("api/crear_producto/", CrearProducto.as_view(), name="crear_producto"),
     path(
         "api/editar_producto/<int:id>/",
@@ -87,10 +127,44 @@ urlpatterns = [
         BorrarProducto.as_view(),
         name="borrar_producto",
     ),
+    path("api/borrado/<int:id>/", VerBorrado.as_view(), name="ver_borrado"),
     path("api/crear_item/", CrearItem.as_view(), name="crear_item"),
+    path(
+        "api/producto/<int:id>/cargar_seriales/",
+        CargarSeriales.as_view(),
+        name="cargar_seriales",
+    ),
     path("api/editar_item/<int:id>/", EditarItem.as_view(), name="editar_item"),
     path("api/borrar_item/<int:id>/", BorrarItem.as_view(), name="borrar_item"),
+    path("api/crear_reserva/", CrearReserva.as_view(), name="crear_reserva"),
+    path(
+        "api/borrar_reserva/<str:sesion>/",
+        BorrarReserva.as_view(),
+        name="borrar_reserva",
+    ),
     path("api/crear_factura/", CrearFactura.as_view(), name="crear_factura"),
+    path(
+        "api/sincronizar_facturas/",
+        SincronizarFacturas.as_view(),
+        name="sincronizar_facturas",
+    ),
     path("api/facturas/", VerFacturas.as_view(), name="facturas"),
     path("api/factura/<int:factura_id>/", VerFactura.as_view(), name="ver_factura"),
+    path("api/ventas_por_dia/", VerVentasPorDia.as_view(), name="ventas_por_dia"),
+    path(
+        "api/ventas_por_producto/",
+        VerVentasPorProducto.as_view(),
+        name="ventas_por_producto",
+    ),
+    path(
+        "api/exportar_facturas/", ExportarFacturas.as_view(), name="exportar_facturas"
+    ),
+    path(
+        "api/seriales_vendidos/",
+        BuscarSerialesVendidos.as_view(),
+        name="seriales_vendidos",
+    ),
+    path(
+        "api/devolver_seriales/", DevolverSeriales.as_view(), name="devolver_seriales"
+    ),
 ]